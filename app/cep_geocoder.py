@@ -0,0 +1,131 @@
+# app/cep_geocoder.py
+
+"""
+Geocodificador local por prefixo de CEP.
+
+Para a irradiação, a precisão do CEP basta. O índice (CEP_INDEX_PATH, gerado por
+`flask build-cep-index`) guarda o centroide de cada prefixo de CEP com
+PREFIX_LENGTHS dígitos, calculado a partir de uma lista de CEPs com coordenadas.
+Um CEP é resolvido pelo prefixo mais longo que existir no índice: '50050' (setor),
+depois '5005' e '500' (subregião). Prefixos de 2 dígitos (região) não entram: o
+centroide de uma região pode ficar a centenas de km do endereço, e aí é melhor
+cair no Nominatim.
+
+Arquivo: cabeçalho fixo e três arrays do mesmo tamanho, com as chaves em ordem
+crescente (uint64: prefixo * 10 + número de dígitos), latitudes e longitudes
+(float32). Ele é aberto com mmap e a busca é um bisect direto sobre as chaves,
+sem carregar nada na memória: microssegundos por consulta.
+"""
+
+import bisect
+import csv
+import mmap
+import os
+import re
+import struct
+import threading
+from array import array
+
+MAGIC = b'CEPIDX01'
+HEADER = struct.Struct('<8sI4x') # magic, quantidade de prefixos (16 bytes, mantém os arrays alinhados)
+PREFIX_LENGTHS = (5, 4, 3) # Do mais preciso para o menos preciso
+
+
+def _key(prefix):
+    return int(prefix) * 10 + len(prefix)
+
+
+class CepIndex:
+    """Índice aberto com mmap. Use `open_index` para reaproveitar o mesmo em todo o processo."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            magic, self.count = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f'{path} não é um índice de CEPs.')
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)[HEADER.size:]
+        n = self.count
+        self.keys = view[:8 * n].cast('Q')
+        self.latitudes = view[8 * n:12 * n].cast('f')
+        self.longitudes = view[12 * n:16 * n].cast('f')
+
+    def lookup(self, cep):
+        """(lat, lon) do prefixo mais longo do CEP que está no índice, ou None."""
+        digits = re.sub(r'\D', '', cep or '')
+        if len(digits) != 8:
+            return None
+        for length in PREFIX_LENGTHS:
+            key = _key(digits[:length])
+            i = bisect.bisect_left(self.keys, key)
+            if i < self.count and self.keys[i] == key:
+                return float(self.latitudes[i]), float(self.longitudes[i])
+        return None
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def open_index(path):
+    """Índice do arquivo, aberto uma vez por processo; None se o arquivo não existir."""
+    index = _indexes.get(path)
+    if index is None and path and os.path.exists(path):
+        with _lock:
+            index = _indexes.get(path) or CepIndex(path)
+            _indexes[path] = index
+    return index
+
+
+def lookup_cep(path, cep):
+    """Atalho: coordenadas do CEP pelo índice em `path`, ou None (sem índice ou sem prefixo)."""
+    index = open_index(path)
+    return index.lookup(cep) if index is not None else None
+
+
+def build_index(source_csv, output_path):
+    """
+    Gera o índice a partir de um CSV com as colunas cep, latitude e longitude (ou lat e lon).
+    O centroide de cada prefixo é a média das coordenadas dos CEPs que começam com ele.
+    Retorna a quantidade de prefixos gravados.
+    """
+    sums = {}
+    with open(source_csv, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+        lat_col = columns.get('latitude') or columns.get('lat')
+        lon_col = columns.get('longitude') or columns.get('lon')
+        if 'cep' not in columns or not lat_col or not lon_col:
+            raise ValueError('O CSV precisa das colunas cep, latitude e longitude.')
+        for row in reader:
+            digits = re.sub(r'\D', '', row[columns['cep']] or '')
+            try:
+                lat, lon = float(row[lat_col]), float(row[lon_col])
+            except (TypeError, ValueError):
+                continue
+            if len(digits) != 8:
+                continue
+            for length in PREFIX_LENGTHS:
+                total = sums.setdefault(_key(digits[:length]), [0.0, 0.0, 0])
+                total[0] += lat
+                total[1] += lon
+                total[2] += 1
+    if not sums:
+        raise ValueError('O CSV não tem CEPs com coordenadas.')
+
+    keys = array('Q', sorted(sums))
+    latitudes = array('f', (sums[k][0] / sums[k][2] for k in keys))
+    longitudes = array('f', (sums[k][1] / sums[k][2] for k in keys))
+
+    # Grava num arquivo temporário e troca no fim: os workers com o índice antigo aberto não são afetados
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(keys)))
+        keys.tofile(f)
+        latitudes.tofile(f)
+        longitudes.tofile(f)
+    os.replace(tmp_path, output_path)
+    with _lock:
+        _indexes.pop(output_path, None)
+    return len(keys)
@@ -0,0 +1,202 @@
+# app/chart_cache.py
+
+"""
+Cache dos gráficos e cálculos compartilhados pelos dois desenhos (app/utils.py com
+matplotlib e app/charts_svg.py em SVG). Este módulo não importa o matplotlib nem o
+NumPy, então o backend SVG não paga a importação deles.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from itertools import accumulate
+
+from flask import current_app, has_app_context
+
+
+# --- CACHE DOS GRÁFICOS ---
+# Os gráficos dependem só de alguns números. Guardamos a imagem pronta, indexada
+# pelos parâmetros normalizados: primeiro num LRU em memória e, se CHART_CACHE_DIR
+# estiver configurado, também em disco (compartilhado entre os processos), com no
+# máximo CHART_CACHE_MAX_BYTES (os arquivos usados há mais tempo são removidos).
+
+# Aumente quando o visual dos gráficos mudar, para descartar as imagens antigas
+CHART_CACHE_VERSION = '1'
+
+
+class ChartCache:
+    """LRU em memória com uma segunda camada opcional em disco, também LRU e com limite de tamanho."""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key):
+        if not has_app_context() or not current_app.config.get('CHART_CACHE_DIR'):
+            return None
+        return os.path.join(current_app.config['CHART_CACHE_DIR'], f'{key}.b64')
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        path = self._disk_path(key)
+        value = self._read_disk(path) if path else None
+        if value is not None:
+            self._remember(key, value)
+            with self._lock:
+                self.disk_hits += 1
+            return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._remember(key, value)
+        path = self._disk_path(key)
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+            self._evict_disk(os.path.dirname(path), current_app.config.get('CHART_CACHE_MAX_BYTES'))
+
+    @staticmethod
+    def _read_disk(path):
+        try:
+            with open(path) as f:
+                value = f.read()
+            os.utime(path, None) # A data de modificação marca o último uso (remoção LRU)
+        except FileNotFoundError:
+            return None
+        return value
+
+    @staticmethod
+    def _evict_disk(directory, max_bytes):
+        """Remove os gráficos usados há mais tempo até o diretório caber no limite (como o PdfCache)."""
+        if not max_bytes:
+            return
+        entries = []
+        total = 0
+        for entry in os.scandir(directory):
+            if not entry.name.endswith('.b64'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _remember(self, key, value):
+        if has_app_context():
+            self.max_entries = current_app.config.get('CHART_CACHE_SIZE', self.max_entries)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+chart_cache = ChartCache()
+
+
+def _normalize(value):
+    """Arredonda números (e listas de números) para que entradas equivalentes gerem a mesma chave."""
+    if hasattr(value, 'tolist'):
+        value = value.tolist() # Arrays e números do NumPy, sem precisar importá-lo aqui
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, float):
+        # 6 algarismos significativos: diferenças menores não aparecem no gráfico
+        return float(f'{value:.6g}')
+    return value
+
+
+def _as_float(value):
+    if isinstance(value, list):
+        return [_as_float(v) for v in value]
+    if isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def cached_chart(fn):
+    """Decorador: devolve o gráfico do cache quando os parâmetros normalizados já foram vistos."""
+    signature = inspect.signature(fn)
+
+    def lookup(*args, **kwargs):
+        """Retorna (chave, parâmetros normalizados, imagem do cache ou None)."""
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        params = {name: _normalize(value) for name, value in bound.arguments.items()}
+
+        # Na chave, 20000 e 20000.0 são o mesmo valor
+        key_params = {name: _as_float(value) for name, value in params.items()}
+        payload = json.dumps([CHART_CACHE_VERSION, fn.__module__, fn.__name__, key_params], sort_keys=True)
+        key = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        return key, params, chart_cache.get(key)
+
+    def store(key, image):
+        if image is not None:
+            chart_cache.put(key, image)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key, params, image = lookup(*args, **kwargs)
+        if image is None:
+            image = fn(**params)
+            store(key, image)
+        return image
+
+    # Usados pelo pool de gráficos (app/chart_pool.py), que desenha em outro processo
+    wrapper.lookup = lookup
+    wrapper.store = store
+    return wrapper
+
+
+def chart_cache_stats():
+    """Contadores de acertos/erros do cache de gráficos."""
+    return chart_cache.stats()
+
+
+def cumulative_cost_series(investment, annual_bills_without, annual_bills_with):
+    """Custo acumulado ano a ano sem e com o sistema solar (o ano 0 já inclui o investimento)."""
+    cost_without_solar = [float(cost) for cost in accumulate(annual_bills_without, initial=0)]
+    cost_with_solar = [float(investment + cost) for cost in accumulate(annual_bills_with, initial=0)]
+    return cost_without_solar, cost_with_solar
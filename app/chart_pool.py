@@ -0,0 +1,130 @@
+# app/chart_pool.py
+
+"""
+Pool de processos para desenhar os gráficos do PDF em paralelo.
+
+Os três gráficos e os cálculos financeiros não dependem uns dos outros e gastam
+CPU. Em vez de rodar um depois do outro, cada um vai para um processo do pool, e
+o PDF espera só pelo mais lento. Os processos são criados uma vez e já importam
+o matplotlib e desenham um gráfico de aquecimento ao iniciar, então cada
+chamada não paga esse custo.
+
+O pool vem desativado (CHART_WORKERS = 0): cada worker do gunicorn teria o seu,
+e os processos somados disputariam a CPU com as próprias requisições. Ative só
+com poucos workers web. Se o pool falhar, tudo roda na própria requisição, como
+antes. Se ele demorar mais que CHART_POOL_TIMEOUT (está sobrecarregado), o
+gráfico não é desenhado de novo na requisição, o que só somaria mais espera: o
+resultado vem como None e o PDF sai sem ele.
+"""
+
+import importlib
+import inspect
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _warm_up():
+    """Executado uma vez em cada processo do pool: deixa o matplotlib pronto para uso."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import io
+
+    plt.style.use('seaborn-v0_8-whitegrid')
+    fig, ax = plt.subplots(figsize=(2, 1))
+    ax.plot([0, 1], [0, 1])
+    ax.set_title('R$')
+    fig.savefig(io.BytesIO(), format='png')
+    plt.close(fig)
+
+
+def _call(module_name, function_name, kwargs):
+    """Roda no processo do pool: chama a função original (sem o cache de gráficos)."""
+    function = getattr(importlib.import_module(module_name), function_name)
+    function = getattr(function, '__wrapped__', function)
+    return function(**kwargs)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=current_app.config['CHART_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_warm_up,
+            )
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def run_in_parallel(calls):
+    """
+    Executa várias funções ao mesmo tempo no pool e devolve ({nome: resultado}, nomes que estouraram
+    o tempo). `calls` é {nome: (função, args, kwargs)}. Gráficos já presentes no cache não vão
+    para o pool; os que forem desenhados lá são guardados no cache deste processo. Quem estourou
+    CHART_POOL_TIMEOUT fica com None e não é guardado.
+    """
+    results = {}
+    timed_out = []
+    pending = {}
+    use_pool = current_app.config['CHART_WORKERS'] > 0
+
+    for name, (function, args, kwargs) in calls.items():
+        if hasattr(function, 'lookup'):
+            key, params, image = function.lookup(*args, **kwargs)
+            if image is not None:
+                results[name] = image
+                continue
+        else:
+            key, params = None, dict(inspect.signature(function).bind(*args, **kwargs).arguments)
+
+        if use_pool:
+            try:
+                future = _get_executor().submit(_call, function.__module__, function.__name__, params)
+                pending[name] = (function, key, params, future)
+                continue
+            except Exception as e:
+                current_app.logger.warning('Pool de gráficos indisponível (%s); desenhando na requisição.', e)
+                _reset_executor()
+                use_pool = False
+        pending[name] = (function, key, params, None)
+
+    timeout = current_app.config['CHART_POOL_TIMEOUT']
+    for name, (function, key, params, future) in pending.items():
+        result = None
+        if future is not None:
+            try:
+                result = future.result(timeout=timeout)
+            except TimeoutError:
+                current_app.logger.warning('Pool de gráficos demorou mais de %ss; "%s" fica de fora.', timeout, name)
+                future.cancel()
+                results[name] = None
+                timed_out.append(name)
+                continue
+            except Exception as e:
+                current_app.logger.warning('Falha no pool de gráficos (%s); desenhando "%s" na requisição.', e, name)
+                if isinstance(e, BrokenProcessPool):
+                    _reset_executor()
+                future = None
+        if future is None:
+            result = _call(function.__module__, function.__name__, params)
+        if key is not None:
+            function.store(key, result)
+        results[name] = result
+
+    return results, timed_out
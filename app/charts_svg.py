@@ -0,0 +1,202 @@
+# app/charts_svg.py
+
+"""
+Gráficos do PDF desenhados direto em SVG, sem matplotlib.
+
+Gera os mesmos três gráficos de app/utils.py (produção mensal, payback e custo
+acumulado) como texto SVG em base64. O WeasyPrint desenha o SVG como vetor, então
+o PDF fica nítido em qualquer zoom e bem menor do que com as imagens PNG.
+Ative com CHART_BACKEND = 'svg'.
+"""
+
+import base64
+import math
+from xml.sax.saxutils import escape
+
+from app.chart_cache import cached_chart, cumulative_cost_series
+
+WIDTH, HEIGHT = 1000, 500
+MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, MARGIN_BOTTOM = 110, 30, 70, 60
+FONT = "font-family=\"Inter, DejaVu Sans, sans-serif\""
+
+GREEN = '#28a745'
+RED = '#dc3545'
+GREY = '#808080'
+GRID = '#d9d9d9'
+TEXT = '#262626'
+
+
+# --- FUNÇÕES AUXILIARES ---
+
+def _nice_ticks(vmax, count=5):
+    """Marcações 'redondas' do eixo Y entre 0 e vmax (ex: 0, 2000, 4000...)."""
+    if vmax <= 0:
+        return [0]
+    raw_step = vmax / count
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw_step)
+    return [i * step for i in range(int(math.ceil(vmax / step)) + 1)]
+
+
+def _text(x, y, content, size=13, anchor='middle', weight='normal', color=TEXT, baseline='auto'):
+    return (f'<text x="{x:.1f}" y="{y:.1f}" font-size="{size}" text-anchor="{anchor}" '
+            f'font-weight="{weight}" fill="{color}" dominant-baseline="{baseline}" {FONT}>{escape(str(content))}</text>')
+
+
+def _line(x1, y1, x2, y2, color, width=1.5, dash=None):
+    dash_attr = f' stroke-dasharray="{dash}"' if dash else ''
+    return f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" stroke="{color}" stroke-width="{width}"{dash_attr}/>'
+
+
+def _polyline(points, color, width=2.5, dash=None):
+    coords = ' '.join(f'{x:.1f},{y:.1f}' for x, y in points)
+    dash_attr = f' stroke-dasharray="{dash}"' if dash else ''
+    return f'<polyline points="{coords}" fill="none" stroke="{color}" stroke-width="{width}"{dash_attr}/>'
+
+
+class _Axes:
+    """Converte valores dos dados para coordenadas do desenho e desenha grade, eixos e títulos."""
+
+    def __init__(self, xmin, xmax, ymax):
+        self.xmin, self.xmax = xmin, xmax
+        self.ticks = _nice_ticks(ymax)
+        self.ymax = self.ticks[-1] or 1
+        self.left, self.right = MARGIN_LEFT, WIDTH - MARGIN_RIGHT
+        self.top, self.bottom = MARGIN_TOP, HEIGHT - MARGIN_BOTTOM
+
+    def x(self, value):
+        return self.left + (value - self.xmin) / ((self.xmax - self.xmin) or 1) * (self.right - self.left)
+
+    def y(self, value):
+        return self.bottom - value / self.ymax * (self.bottom - self.top)
+
+    def frame(self, title, ylabel, xlabel, y_format):
+        parts = [_text(WIDTH / 2, 35, title, size=20, weight='bold')]
+        for tick in self.ticks:
+            y = self.y(tick)
+            parts.append(_line(self.left, y, self.right, y, GRID, width=1, dash='5,4'))
+            parts.append(_text(self.left - 10, y, y_format(tick), anchor='end', baseline='middle'))
+        parts.append(_line(self.left, self.top, self.left, self.bottom, TEXT, width=1))
+        parts.append(_line(self.left, self.bottom, self.right, self.bottom, TEXT, width=1))
+        parts.append(f'<text transform="translate(25,{(self.top + self.bottom) / 2:.1f}) rotate(-90)" font-size="14" '
+                     f'text-anchor="middle" fill="{TEXT}" {FONT}>{escape(ylabel)}</text>')
+        if xlabel:
+            parts.append(_text((self.left + self.right) / 2, HEIGHT - 12, xlabel, size=14))
+        return parts
+
+    def year_ticks(self, first, last, step=5):
+        parts = []
+        for year in range(first, last + 1, step):
+            parts.append(_text(self.x(year), self.bottom + 20, year))
+        return parts
+
+
+def _legend(entries, x=MARGIN_LEFT + 20, y=MARGIN_TOP + 10):
+    """Legenda no canto superior esquerdo. entries: lista de (texto, cor, tipo de traço ou 'area')."""
+    parts = []
+    for i, (label, color, style) in enumerate(entries):
+        row_y = y + i * 22
+        if style == 'area':
+            parts.append(f'<rect x="{x}" y="{row_y - 6}" width="28" height="12" fill="{color}" fill-opacity="0.15"/>')
+        else:
+            parts.append(_line(x, row_y, x + 28, row_y, color, width=2.5, dash=style))
+        parts.append(_text(x + 36, row_y, label, anchor='start', baseline='middle'))
+    width = 36 + max(len(label) for label, _, _ in entries) * 7.5
+    box = (f'<rect x="{x - 10}" y="{y - 14}" width="{width + 20:.0f}" height="{len(entries) * 22 + 6}" '
+           f'fill="white" fill-opacity="0.85" stroke="{GRID}" rx="4"/>')
+    return [box] + parts
+
+
+def _encode(parts):
+    svg = (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {WIDTH} {HEIGHT}" '
+           f'width="{WIDTH}" height="{HEIGHT}"><rect width="100%" height="100%" fill="white"/>'
+           + ''.join(parts) + '</svg>')
+    return base64.b64encode(svg.encode('utf-8')).decode('utf-8')
+
+
+def _brl(value):
+    return f'R$ {int(value):,}'.replace(',', '.')
+
+
+# --- GRÁFICOS ---
+
+@cached_chart
+def generate_monthly_production_chart(data):
+    """Gráfico de barras da produção mensal, em SVG (base64)."""
+    if not data or len(data) != 12:
+        return None
+
+    meses = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+    axes = _Axes(0, 12, max(data) * 1.1)
+    parts = axes.frame('Produção Mensal Estimada (kWh)', 'Produção (kWh)', None, lambda v: f'{int(v)}')
+
+    slot = (axes.right - axes.left) / 12
+    for i, value in enumerate(data):
+        x = axes.left + i * slot + slot * 0.1
+        y = axes.y(value)
+        parts.append(f'<rect x="{x:.1f}" y="{y:.1f}" width="{slot * 0.8:.1f}" height="{axes.bottom - y:.1f}" fill="{GREEN}"/>')
+        parts.append(_text(x + slot * 0.4, y - 6, int(value)))
+        parts.append(_text(x + slot * 0.4, axes.bottom + 20, meses[i]))
+    return _encode(parts)
+
+
+@cached_chart
+def generate_payback_chart(investment, annual_savings, years=30):
+    """Gráfico de linha do payback, em SVG (base64)."""
+    if not investment or not annual_savings or investment <= 0 or annual_savings <= 0:
+        return None
+
+    cumulative_savings = [annual_savings * year for year in range(1, years + 1)]
+    payback_year = investment / annual_savings
+
+    axes = _Axes(1, years, max(cumulative_savings[-1], investment) * 1.05)
+    parts = axes.frame('Análise de Retorno do Investimento (Payback)', 'Valor (R$)', 'Anos', _brl)
+    parts += axes.year_ticks(5, years)
+
+    y_investment = axes.y(investment)
+    parts.append(_line(axes.left, y_investment, axes.right, y_investment, RED, width=2, dash='8,5'))
+    if 1 <= payback_year <= years:
+        x_payback = axes.x(payback_year)
+        parts.append(_line(x_payback, axes.top, x_payback, axes.bottom, GREY, width=2, dash='2,4'))
+
+    points = [(axes.x(year), axes.y(value)) for year, value in enumerate(cumulative_savings, start=1)]
+    parts.append(_polyline(points, GREEN))
+    parts += [f'<circle cx="{x:.1f}" cy="{y:.1f}" r="4" fill="{GREEN}"/>' for x, y in points]
+
+    parts += _legend([
+        ('Economia Acumulada', GREEN, None),
+        ('Investimento Inicial', RED, '8,5'),
+        (f'Payback em {payback_year:.1f} anos', GREY, '2,4'),
+    ])
+    return _encode(parts)
+
+
+@cached_chart
+def generate_cumulative_cost_chart(investment, annual_bills_without, annual_bills_with):
+    """Gráfico do custo acumulado com e sem energia solar, em SVG (base64)."""
+    if not investment or not annual_bills_without:
+        return None
+
+    years = len(annual_bills_without)
+    cost_without_solar, cost_with_solar = cumulative_cost_series(investment, annual_bills_without, annual_bills_with)
+
+    axes = _Axes(0, years, max(max(cost_without_solar), max(cost_with_solar)) * 1.05)
+    parts = axes.frame('Projeção de Custo Acumulado em 25 Anos', 'Custo Total (R$)', 'Anos',
+                       lambda v: f'R$ {int(v / 1000)}k' if v > 0 else 'R$ 0')
+    parts += axes.year_ticks(0, years)
+
+    # Área de economia entre as duas curvas
+    upper = [(axes.x(year), axes.y(value)) for year, value in enumerate(cost_without_solar)]
+    lower = [(axes.x(year), axes.y(value)) for year, value in enumerate(cost_with_solar)]
+    area = ' '.join(f'{x:.1f},{y:.1f}' for x, y in upper + lower[::-1])
+    parts.append(f'<polygon points="{area}" fill="{GREEN}" fill-opacity="0.1" stroke="none"/>')
+
+    parts.append(_polyline(upper, RED, dash='10,6'))
+    parts.append(_polyline(lower, GREEN))
+
+    parts += _legend([
+        ('Custo Sem Energia Solar', RED, '10,6'),
+        ('Custo Com Energia Solar (Incluso Investimento)', GREEN, None),
+        ('Economia Gerada', GREEN, 'area'),
+    ])
+    return _encode(parts)
@@ -0,0 +1,256 @@
+# app/finance.py
+
+"""
+Motor financeiro vetorizado (NumPy).
+
+Todas as funções aceitam escalares ou arrays e seguem as regras de broadcasting
+do NumPy: dá para calcular milhares de propostas de uma vez (arrays de
+investimento e economia) ou uma proposta com várias taxas (grade de
+sensibilidade), sempre numa única passada, sem laços em Python por proposta.
+
+O fluxo de caixa segue a regra usada desde o início nas propostas: ano 0 é o
+investimento (negativo) e no ano i a economia é `economia_anual * (1 + inflação) ** i`.
+"""
+
+import time
+
+import numpy as np
+
+DEFAULT_YEARS = 25
+DEFAULT_ENERGY_INFLATION = 0.08
+DEFAULT_DISCOUNT_RATE = 0.06
+
+# Precisão e limites da busca da TIR
+IRR_TOLERANCE = 1e-12
+IRR_MAX_ITERATIONS = 100
+
+
+def cash_flows(investment, annual_savings, years=DEFAULT_YEARS, energy_inflation_rate=DEFAULT_ENERGY_INFLATION):
+    """Fluxo de caixa anual com formato (..., years + 1). O ano 0 é o investimento."""
+    investment = np.asarray(investment, dtype=float)
+    annual_savings = np.asarray(annual_savings, dtype=float)
+    inflation = np.asarray(energy_inflation_rate, dtype=float)
+
+    growth = (1 + inflation[..., None]) ** np.arange(1, years + 1)
+    savings = annual_savings[..., None] * growth
+    initial = np.broadcast_to(-investment[..., None], savings.shape[:-1] + (1,))
+    return np.concatenate([initial, savings], axis=-1)
+
+
+def npv(flows, discount_rate):
+    """Valor presente líquido de cada fluxo (último eixo), como o npf.npv."""
+    rate = np.asarray(discount_rate, dtype=float)
+    discount = (1 + rate[..., None]) ** -np.arange(flows.shape[-1])
+    return np.sum(flows * discount, axis=-1)
+
+
+def irr(flows):
+    """
+    TIR de cada fluxo (último eixo), em fração (0.25 = 25% a.a.).
+
+    Os fluxos das propostas são convencionais (um único investimento e depois só
+    entradas), então o VPL cai monotonicamente com a taxa e existe uma raiz
+    única. Ela é encontrada por Newton com intervalo de segurança: quando o passo
+    de Newton sai do intervalo [lo, hi], usa-se a bisseção. Fluxos sem troca de
+    sinal retornam NaN.
+    """
+    flows = np.asarray(flows, dtype=float)
+    periods = np.arange(flows.shape[-1])
+    shape = flows.shape[:-1]
+
+    def npv_and_derivative(rate):
+        discount = (1 + rate[..., None]) ** -periods
+        value = np.sum(flows * discount, axis=-1)
+        derivative = np.sum(-periods * flows * discount / (1 + rate[..., None]), axis=-1)
+        return value, derivative
+
+    valid = (flows[..., 0] < 0) & (np.sum(flows[..., 1:], axis=-1) > 0) & np.all(flows[..., 1:] >= 0, axis=-1)
+
+    # Intervalo inicial: o VPL é positivo perto de -100% e negativo para taxas grandes
+    lo = np.full(shape, -0.99)
+    hi = np.ones(shape)
+    for _ in range(64):
+        value, _ = npv_and_derivative(hi)
+        grow = valid & (value > 0)
+        if not grow.any():
+            break
+        lo = np.where(grow, hi, lo)
+        hi = np.where(grow, hi * 2, hi)
+
+    # Chute inicial: retorno do primeiro ano (economia / investimento), dentro do intervalo
+    with np.errstate(divide='ignore', invalid='ignore'):
+        guess = flows[..., 1] / -flows[..., 0]
+    rate = np.where(valid & (guess > lo) & (guess < hi), guess, (lo + hi) / 2)
+    rate = np.where(valid, rate, 0.0)
+    converged = ~valid
+    for _ in range(IRR_MAX_ITERATIONS):
+        value, derivative = npv_and_derivative(rate)
+        lo = np.where(value > 0, rate, lo)
+        hi = np.where(value > 0, hi, rate)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = rate - value / derivative
+        inside = np.isfinite(newton) & (newton >= lo) & (newton <= hi)
+        new_rate = np.where(inside, newton, (lo + hi) / 2)
+
+        converged |= np.abs(new_rate - rate) <= IRR_TOLERANCE * np.maximum(1, np.abs(rate))
+        rate = np.where(converged, rate, new_rate)
+        if converged.all():
+            break
+
+    return np.where(valid, rate, np.nan)
+
+
+def payback_years(flows):
+    """
+    Anos até o fluxo acumulado ficar positivo, com fração de ano (interpolação
+    linear dentro do ano em que isso acontece). NaN se não se paga no horizonte.
+    """
+    cumulative = np.cumsum(flows, axis=-1)
+    paid = cumulative >= 0
+    ever = paid.any(axis=-1)
+    year = np.argmax(paid, axis=-1)
+
+    previous = np.take_along_axis(cumulative, np.maximum(year - 1, 0)[..., None], axis=-1)[..., 0]
+    inflow = np.take_along_axis(flows, year[..., None], axis=-1)[..., 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(year > 0, -previous / inflow, 0.0)
+    return np.where(ever, np.maximum(year - 1, 0) + fraction, np.nan)
+
+
+def evaluate(investment, annual_savings, years=DEFAULT_YEARS,
+             energy_inflation_rate=DEFAULT_ENERGY_INFLATION, discount_rate=DEFAULT_DISCOUNT_RATE):
+    """
+    Calcula as métricas de um lote de propostas numa só passada.
+
+    Os argumentos podem ser escalares ou arrays (com broadcasting entre si).
+    Retorna um dicionário de arrays: npv, irr (fração), payback_years,
+    total_savings, profit e cumulative_savings (formato (..., years)).
+    """
+    return evaluate_cash_flows(cash_flows(investment, annual_savings, years, energy_inflation_rate), discount_rate)
+
+
+def evaluate_cash_flows(flows, discount_rate=DEFAULT_DISCOUNT_RATE):
+    """Mesmas métricas de `evaluate` para fluxos já montados (ex: o extrato de app/ledger.py)."""
+    flows = np.asarray(flows, dtype=float)
+    cumulative_savings = np.cumsum(flows[..., 1:], axis=-1)
+    total_savings = cumulative_savings[..., -1]
+    npv_values = npv(flows, discount_rate)
+
+    # TIR e payback não dependem da taxa de desconto: expande só no final
+    shape = npv_values.shape
+    return {
+        'npv': npv_values,
+        'irr': np.broadcast_to(irr(flows), shape),
+        'payback_years': np.broadcast_to(payback_years(flows), shape),
+        'total_savings': np.broadcast_to(total_savings, shape),
+        'profit': np.broadcast_to(total_savings + flows[..., 0], shape),
+        'cumulative_savings': cumulative_savings,
+    }
+
+
+def sensitivity_grid(investment, annual_savings, energy_inflation_rates, discount_rates, years=DEFAULT_YEARS):
+    """
+    Grade de sensibilidade de uma proposta: linhas = inflação energética,
+    colunas = taxa de desconto. Retorna as taxas usadas e matrizes de VPL, TIR e payback.
+    """
+    inflation = np.asarray(energy_inflation_rates, dtype=float)
+    discount = np.asarray(discount_rates, dtype=float)
+    result = evaluate(investment, annual_savings, years, inflation[:, None], discount[None, :])
+    return {
+        'energy_inflation_rates': inflation,
+        'discount_rates': discount,
+        'npv': result['npv'],
+        'irr': result['irr'],
+        'payback_years': result['payback_years'],
+    }
+
+
+# --- SIMULAÇÃO DE MONTE CARLO ---
+# Incertezas sorteadas em cada cenário. Os valores centrais batem com o cálculo
+# determinístico (8% de inflação energética); a degradação dos painéis é sempre aplicada.
+RISK_ASSUMPTIONS = {
+    'energy_inflation_mean': DEFAULT_ENERGY_INFLATION, # Inflação energética média (por cenário)
+    'energy_inflation_std': 0.02,
+    'irradiance_std': 0.06,                # Variação da produção de um ano para outro (clima)
+    'degradation_min': 0.003,              # Perda de eficiência dos painéis por ano
+    'degradation_max': 0.008,
+    'tariff_shock_probability': 0.08,      # Chance, por ano, de um reajuste extraordinário
+    'tariff_shock_mean': 0.05,
+    'tariff_shock_std': 0.10,
+}
+
+MONTE_CARLO_CHUNK = 2500
+PERCENTILES = (10, 50, 90)
+
+
+def _simulate_flows(rng, count, investment, annual_savings, years, assumptions):
+    """Fluxos de caixa de `count` cenários sorteados, formato (count, years + 1)."""
+    a = assumptions
+    t = np.arange(1, years + 1)
+
+    inflation = np.clip(rng.normal(a['energy_inflation_mean'], a['energy_inflation_std'], (count, 1)), -0.02, 0.25)
+    degradation = rng.uniform(a['degradation_min'], a['degradation_max'], (count, 1))
+    weather = np.clip(rng.normal(1, a['irradiance_std'], (count, years)), 0.7, 1.3)
+
+    shocks = np.where(
+        rng.random((count, years)) < a['tariff_shock_probability'],
+        np.clip(rng.normal(a['tariff_shock_mean'], a['tariff_shock_std'], (count, years)), -0.5, 1),
+        0.0,
+    )
+    tariff = np.cumprod(1 + shocks, axis=1) # Um reajuste extraordinário vale dali em diante
+
+    savings = annual_savings * (1 + inflation) ** t * tariff * weather * (1 - degradation) ** (t - 1)
+    return np.concatenate([np.full((count, 1), -float(investment)), savings], axis=1)
+
+
+def _bands(values, **kwargs):
+    p10, p50, p90 = np.percentile(values, PERCENTILES, axis=0, **kwargs)
+    return {'p10': p10, 'p50': p50, 'p90': p90}
+
+
+def monte_carlo(investment, annual_savings, scenarios=10000, time_budget_ms=None, seed=None,
+                years=DEFAULT_YEARS, discount_rate=DEFAULT_DISCOUNT_RATE, assumptions=None):
+    """
+    Simula `scenarios` futuros possíveis de uma proposta e devolve as faixas P10/P50/P90
+    de VPL, TIR (fração) e payback, além das faixas do fluxo acumulado ano a ano.
+
+    Os cenários são gerados em blocos de arrays. Com `time_budget_ms`, a simulação
+    para no fim do bloco em que o tempo estourou (o primeiro bloco sempre roda) e
+    `scenarios` no resultado informa quantos foram de fato simulados. A mesma
+    `seed` gera sempre os mesmos cenários.
+    """
+    assumptions = dict(RISK_ASSUMPTIONS, **(assumptions or {}))
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+
+    npv_values, irr_values, payback_values, cumulative = [], [], [], []
+    done = 0
+    while done < scenarios:
+        count = min(MONTE_CARLO_CHUNK, scenarios - done)
+        flows = _simulate_flows(rng, count, investment, annual_savings, years, assumptions)
+        npv_values.append(npv(flows, discount_rate))
+        irr_values.append(irr(flows))
+        payback_values.append(payback_years(flows))
+        cumulative.append(np.cumsum(flows, axis=1))
+        done += count
+        if time_budget_ms and (time.perf_counter() - start) * 1000 > time_budget_ms:
+            break
+
+    npv_values = np.concatenate(npv_values)
+    irr_values = np.concatenate(irr_values)
+    payback_values = np.concatenate(payback_values)
+
+    # Cenários que não se pagam no horizonte contam como "payback infinito"
+    never = np.isnan(payback_values)
+    payback_bands = _bands(np.where(never, np.inf, payback_values), method='higher')
+
+    return {
+        'scenarios': done,
+        'elapsed_ms': (time.perf_counter() - start) * 1000,
+        'npv': _bands(npv_values),
+        'irr': _bands(irr_values[~np.isnan(irr_values)]) if (~np.isnan(irr_values)).any() else None,
+        'payback_years': payback_bands,
+        'payback_probability': float(1 - never.mean()),
+        'cumulative_cash_flow': _bands(np.concatenate(cumulative)),
+    }
@@ -118,6 +118,7 @@ class ProductForm(FlaskForm):
         ('Outros', 'Outros')
     ])
     manufacturer = StringField('Fabricante')
-    power_wp = IntegerField('Potência (Wp)', validators=[Optional()])
+    power_wp = IntegerField('Potência (Wp / W)', validators=[Optional()])
     warranty_years = IntegerField('Garantia (Anos)', validators=[Optional()])
+    price = FloatField('Preço Unitário (R$)', validators=[Optional()])
     submit = SubmitField('Salvar Produto')
\ No newline at end of file
@@ -0,0 +1,196 @@
+# app/geocoding.py
+
+"""
+Geocodificação dos endereços dos clientes, com cache persistente.
+
+O Nominatim aceita no máximo uma consulta por segundo e costuma demorar mais de
+um segundo para responder, então ele só é consultado quando não há outro jeito:
+1. o próprio cliente já tem as coordenadas gravadas;
+2. o CEP do cliente está no índice local de prefixos (app/cep_geocoder.py);
+3. o endereço (normalizado) já foi encontrado antes, para este ou outro cliente,
+   e está na tabela geocode_cache;
+4. só então o Nominatim é consultado, e o resultado vai para o cliente e para o cache.
+   A consulta passa pelo cliente HTTP compartilhado (app/providers.py). Se o
+   endereço não for encontrado, isso fica gravado no cliente (geocode_failed_at)
+   e ele só é consultado de novo depois de GEOCODE_RETRY_DAYS dias.
+
+As coordenadas do cliente (e a falha gravada) são apagadas automaticamente
+quando os campos do endereço usados na busca mudam. O cache não precisa ser invalidado: um endereço
+diferente tem outra chave.
+"""
+
+import re
+import unicodedata
+from datetime import datetime, timedelta
+
+from geopy.adapters import BaseSyncAdapter
+from flask import current_app
+from geopy.geocoders import Nominatim
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import IntegrityError
+
+from app import db, providers
+from app.cep_geocoder import lookup_cep
+from app.models import Client, GeocodeCache
+
+USER_AGENT = 'solucao_solar_app_v1'
+
+# Campos do cliente que entram no endereço consultado (o CEP, no índice local)
+ADDRESS_FIELDS = ('cep', 'address', 'city', 'state')
+
+# Contadores do processo (desde que o servidor subiu)
+_stats = {'client_hits': 0, 'cep_hits': 0, 'cache_hits': 0, 'misses': 0, 'not_found': 0, 'known_failures': 0}
+_geolocator = None
+
+
+def normalize_address(address):
+    """Minúsculas, sem acentos e com os espaços colapsados: 'Rua  São João' e 'rua sao joao' são o mesmo endereço."""
+    text = unicodedata.normalize('NFKD', address or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    text = re.sub(r'\s*,\s*', ', ', text)
+    return re.sub(r'\s+', ' ', text).strip(' ,')
+
+
+def has_address(client):
+    """True se o cliente tem CEP ou endereço suficiente para ser geocodificado."""
+    return bool(client.cep or (client.address and client.city and client.state))
+
+
+def retry_cutoff(retry_days):
+    """Falhas gravadas antes deste momento já podem ser consultadas de novo."""
+    return datetime.utcnow() - timedelta(days=retry_days)
+
+
+def client_address(client):
+    """Endereço do cliente no formato enviado ao Nominatim."""
+    return f"{client.address}, {client.city}, {client.state}, Brazil"
+
+
+class _ProviderAdapter(BaseSyncAdapter):
+    """Faz o geopy usar o provedor Nominatim de app/providers.py (pool, tentativas e disjuntor)."""
+
+    def get_text(self, url, *, timeout, headers):
+        # O timeout do geopy é ignorado: vale o do provedor
+        return providers.nominatim.get(url, headers=headers).text
+
+    def get_json(self, url, *, timeout, headers):
+        return providers.nominatim.get(url, headers=headers).json()
+
+
+def _get_geolocator():
+    global _geolocator
+    if _geolocator is None:
+        _geolocator = Nominatim(user_agent=USER_AGENT, adapter_factory=_ProviderAdapter)
+    return _geolocator
+
+
+def nominatim_lookup(address):
+    """Consulta o Nominatim (sem cache). Retorna (lat, lon) ou None; pode ser chamada de várias threads."""
+    location = _get_geolocator().geocode(address)
+    return (location.latitude, location.longitude) if location is not None else None
+
+
+def store_geocode(address, latitude, longitude):
+    """Grava o endereço no cache, se outra requisição ainda não o gravou."""
+    try:
+        with db.session.begin_nested():
+            db.session.add(GeocodeCache(address_key=normalize_address(address), latitude=latitude, longitude=longitude))
+    except IntegrityError:
+        pass
+
+
+def cached_geocodes(addresses):
+    """Coordenadas já guardadas para os endereços: {chave normalizada: (lat, lon)}, numa consulta só."""
+    keys = {normalize_address(address) for address in addresses}
+    rows = db.session.query(GeocodeCache.address_key, GeocodeCache.latitude, GeocodeCache.longitude) \
+        .filter(GeocodeCache.address_key.in_(keys)).all()
+    return {row.address_key: (row.latitude, row.longitude) for row in rows}
+
+
+def geocode_address(address):
+    """
+    Coordenadas (lat, lon) de um endereço, usando o cache antes do Nominatim.
+    Retorna None se o endereço não for encontrado; erros de rede são propagados.
+    """
+    key = normalize_address(address)
+    cached = GeocodeCache.query.filter_by(address_key=key).first()
+    if cached is not None:
+        _stats['cache_hits'] += 1
+        cached.hits = (cached.hits or 0) + 1
+        cached.last_hit_at = datetime.utcnow()
+        return cached.latitude, cached.longitude
+
+    _stats['misses'] += 1
+    coordinates = nominatim_lookup(address)
+    if coordinates is None:
+        _stats['not_found'] += 1
+        return None
+
+    # Outra requisição pode ter gravado o mesmo endereço enquanto esperávamos o Nominatim
+    store_geocode(address, *coordinates)
+    return coordinates
+
+
+def locate_client(client):
+    """
+    Coordenadas (lat, lon) do cliente, gravando-as nele quando precisam ser buscadas.
+    Retorna None se o endereço não for encontrado; erros de rede são propagados.
+    """
+    if client.latitude is not None and client.longitude is not None:
+        _stats['client_hits'] += 1
+        return client.latitude, client.longitude
+
+    config = current_app.config
+    coordinates = lookup_cep(config['CEP_INDEX_PATH'], client.cep)
+    if coordinates is not None:
+        _stats['cep_hits'] += 1
+    elif client.geocode_failed_at and client.geocode_failed_at > retry_cutoff(config['GEOCODE_RETRY_DAYS']):
+        _stats['known_failures'] += 1 # O Nominatim não encontrou este endereço há pouco
+        return None
+    elif client.address and client.city and client.state:
+        coordinates = geocode_address(client_address(client))
+        if coordinates is None:
+            client.geocode_failed_at = datetime.utcnow()
+    if coordinates is not None:
+        client.latitude, client.longitude = coordinates
+        client.geocoded_at = datetime.utcnow()
+        client.geocode_failed_at = None
+    db.session.commit()
+    return coordinates
+
+
+def geocode_cache_stats():
+    """Acertos e consultas ao Nominatim desde que o servidor subiu, e o tamanho do cache gravado."""
+    hits = _stats['client_hits'] + _stats['cep_hits'] + _stats['cache_hits']
+    lookups = hits + _stats['misses']
+    return {
+        **_stats,
+        'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+        'entries': GeocodeCache.query.count(),
+        'stored_hits': db.session.query(db.func.coalesce(db.func.sum(GeocodeCache.hits), 0)).scalar(),
+    }
+
+
+# --- INVALIDAÇÃO AO MUDAR O ENDEREÇO ---
+# Se um campo do endereço do cliente muda, as coordenadas gravadas nele deixam de valer.
+
+def _address_changed(state, name):
+    history = state.attrs[name].history
+    if not history.added:
+        return False
+    # O formulário grava todos os campos de novo; só conta se o valor mudou de fato
+    old = history.deleted[0] if history.deleted else None
+    return normalize_address(old) != normalize_address(history.added[0])
+
+
+@event.listens_for(db.session, 'before_flush')
+def _forget_moved_clients(session, flush_context, instances):
+    for obj in session.dirty:
+        if not isinstance(obj, Client):
+            continue
+        state = inspect(obj)
+        if any(_address_changed(state, name) for name in ADDRESS_FIELDS):
+            # Coordenadas informadas junto com o novo endereço são mantidas
+            if not state.attrs.latitude.history.has_changes():
+                obj.latitude = obj.longitude = obj.geocoded_at = None
+            obj.geocode_failed_at = None # Endereço novo: vale uma nova consulta
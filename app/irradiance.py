@@ -0,0 +1,233 @@
+# app/irradiance.py
+
+"""
+Irradiação solar por localidade, com armazenamento local por célula da grade da NASA.
+
+A NASA POWER entrega os dados numa grade de 0,5° de latitude por 0,625° de
+longitude (cerca de 50 km), com os pontos da grade nos múltiplos desses passos.
+Cada célula aqui é o entorno de um ponto da grade: o ponto consultado é
+arredondado para o ponto da grade mais próximo, que é o que a NASA usa para
+responder. Clientes na mesma célula recebem, na prática, a mesma resposta (nas
+bordas a NASA pode escolher o ponto vizinho), então ela é baixada uma vez e
+guardada na tabela irradiance_cell (média anual e médias mensais), valendo por
+IRRADIANCE_TTL_DAYS dias.
+
+As células também ficam num índice em memória, por (linha, coluna) da grade.
+Uma consulta é respondida, em ordem:
+0. pela grade pré-calculada do Brasil (app/irradiance_grid.py), se o arquivo
+   existir e o ponto estiver dentro dela;
+1. pela célula do ponto, no índice em memória (microssegundos);
+2. pela célula do ponto, no banco (gravada por outro processo);
+3. pela célula vizinha mais próxima já baixada, se o centro dela estiver a até
+   IRRADIANCE_NEIGHBOR_KM do ponto (só as 8 vizinhas são olhadas);
+4. pela API da NASA (via app/providers.py). Se a API falhar, ou estiver com o
+   disjuntor aberto, e houver dados vencidos da célula, eles são usados.
+"""
+
+import math
+import threading
+from datetime import datetime, timedelta
+
+import requests
+from flask import current_app
+
+from app import db, providers
+from app.irradiance_grid import open_grid
+from app.models import IrradianceCell
+
+# Resolução da grade MERRA-2 usada pela NASA POWER para irradiação
+CELL_LAT_DEG = 0.5
+CELL_LON_DEG = 0.625
+
+NASA_POWER_URL = 'https://power.larc.nasa.gov/api/temporal/daily/point'
+EARTH_RADIUS_KM = 6371.0
+
+
+class NoIrradianceData(Exception):
+    """A NASA não tem dados válidos para a localidade."""
+
+
+def cell_of(latitude, longitude):
+    """(linha, coluna) do ponto da grade mais próximo: latitude ≈ linha * 0,5° e longitude ≈ coluna * 0,625°."""
+    # floor(x + 0.5) em vez de round(): o round do Python arredonda 0,5 para o par
+    return int(math.floor(latitude / CELL_LAT_DEG + 0.5)), int(math.floor(longitude / CELL_LON_DEG + 0.5))
+
+
+def cell_center(row, col):
+    """Coordenadas do ponto da grade da célula (o centro dela)."""
+    return row * CELL_LAT_DEG, col * CELL_LON_DEG
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Distância em km entre dois pontos (fórmula de haversine)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+# --- ÍNDICE EM MEMÓRIA ---
+class _CellIndex:
+    """Células já baixadas, por (linha, coluna). Carregado do banco no primeiro uso."""
+
+    def __init__(self):
+        self._cells = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.stats = {'grid_hits': 0, 'memory_hits': 0, 'database_hits': 0, 'neighbor_hits': 0, 'fetches': 0, 'stale_hits': 0}
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        rows = db.session.query(IrradianceCell.cell_row, IrradianceCell.cell_col, IrradianceCell.annual_mean,
+                                IrradianceCell.monthly_means, IrradianceCell.fetched_at).all()
+        with self._lock:
+            for row in rows:
+                self._cells[(row.cell_row, row.cell_col)] = (row.annual_mean, row.monthly_means, row.fetched_at)
+            self._loaded = True
+
+    def get(self, cell):
+        self._ensure_loaded()
+        return self._cells.get(cell)
+
+    def put(self, cell, annual_mean, monthly_means, fetched_at):
+        with self._lock:
+            self._cells[cell] = (annual_mean, monthly_means, fetched_at)
+
+    def nearest(self, latitude, longitude, max_km, fresh_after):
+        """Célula vizinha válida mais próxima do ponto, ou None."""
+        self._ensure_loaded()
+        row, col = cell_of(latitude, longitude)
+        best, best_km = None, max_km
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                entry = self._cells.get((row + dr, col + dc))
+                if (dr or dc) and entry is not None and entry[2] >= fresh_after:
+                    km = distance_km(latitude, longitude, *cell_center(row + dr, col + dc))
+                    if km <= best_km:
+                        best, best_km = ((row + dr, col + dc), entry), km
+        return best
+
+    def __len__(self):
+        return len(self._cells)
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+            self._loaded = False
+
+
+_index = _CellIndex()
+
+
+# --- API DA NASA ---
+def fetch_nasa_irradiance(latitude, longitude):
+    """
+    Baixa o último ano de irradiação diária (kWh/m²/dia) da NASA POWER para o ponto.
+    Retorna (média anual, lista com as 12 médias mensais, de janeiro a dezembro).
+    """
+    end_date = datetime.now() - timedelta(days=1)
+    start_date = end_date - timedelta(days=365)
+    response = providers.nasa_power.get(NASA_POWER_URL, params={
+        'parameters': 'ALLSKY_SFC_SW_DWN', 'community': 'RE', 'latitude': latitude, 'longitude': longitude,
+        'format': 'JSON', 'start': start_date.strftime('%Y%m%d'), 'end': end_date.strftime('%Y%m%d'),
+    })
+    daily = response.json()['properties']['parameter']['ALLSKY_SFC_SW_DWN']
+
+    # A API usa -999 para dados ausentes; as chaves são datas AAAAMMDD
+    by_month = [[] for _ in range(12)]
+    for day, value in daily.items():
+        if value is not None and value >= 0:
+            by_month[int(day[4:6]) - 1].append(value)
+    valid = [v for values in by_month for v in values]
+    if not valid:
+        raise NoIrradianceData('A API da NASA não retornou dados válidos para esta localidade.')
+
+    annual_mean = sum(valid) / len(valid)
+    monthly_means = [sum(values) / len(values) if values else annual_mean for values in by_month]
+    return annual_mean, monthly_means
+
+
+def fresh_cells(cells, ttl_days):
+    """Quais das células já têm dados dentro da validade, numa consulta só."""
+    fresh_after = datetime.utcnow() - timedelta(days=ttl_days)
+    rows = db.session.query(IrradianceCell.cell_row, IrradianceCell.cell_col) \
+        .filter(IrradianceCell.fetched_at >= fresh_after).all()
+    return {(row.cell_row, row.cell_col) for row in rows} & set(cells)
+
+
+def _result(annual_mean, monthly_means, cell, source):
+    return {
+        'irradiance': round(annual_mean, 2),
+        'monthly_irradiance': [round(v, 2) for v in monthly_means],
+        'cell': list(cell),
+        'source': source,
+    }
+
+
+def save_cell(cell, annual_mean, monthly_means):
+    """Grava (ou renova) os dados da célula no banco e no índice em memória."""
+    now = datetime.utcnow()
+    stored = IrradianceCell.query.filter_by(cell_row=cell[0], cell_col=cell[1]).first()
+    if stored is None:
+        latitude, longitude = cell_center(*cell)
+        stored = IrradianceCell(cell_row=cell[0], cell_col=cell[1], latitude=latitude, longitude=longitude)
+        db.session.add(stored)
+    stored.annual_mean, stored.monthly_means, stored.fetched_at = annual_mean, monthly_means, now
+    db.session.commit()
+    _index.put(cell, annual_mean, monthly_means, now)
+
+
+def get_irradiance(latitude, longitude):
+    """
+    Irradiação do ponto: dicionário com irradiance (média anual, kWh/m²/dia),
+    monthly_irradiance (12 médias), cell (linha, coluna) e source (de onde veio).
+    Erros de rede só são propagados se não houver nenhum dado guardado para a célula.
+    """
+    config = current_app.config
+    fresh_after = datetime.utcnow() - timedelta(days=config['IRRADIANCE_TTL_DAYS'])
+    cell = cell_of(latitude, longitude)
+
+    grid = open_grid(config['IRRADIANCE_GRID_PATH'])
+    found = grid.lookup(latitude, longitude) if grid is not None else None
+    if found is not None:
+        _index.stats['grid_hits'] += 1
+        return _result(*found, cell, 'grid')
+
+    entry = _index.get(cell)
+    if entry is not None and entry[2] >= fresh_after:
+        _index.stats['memory_hits'] += 1
+        return _result(entry[0], entry[1], cell, 'memory')
+
+    stored = IrradianceCell.query.filter_by(cell_row=cell[0], cell_col=cell[1]).first()
+    if stored is not None and stored.fetched_at >= fresh_after:
+        _index.stats['database_hits'] += 1
+        _index.put(cell, stored.annual_mean, stored.monthly_means, stored.fetched_at)
+        return _result(stored.annual_mean, stored.monthly_means, cell, 'database')
+
+    neighbor = _index.nearest(latitude, longitude, config['IRRADIANCE_NEIGHBOR_KM'], fresh_after)
+    if neighbor is not None:
+        _index.stats['neighbor_hits'] += 1
+        neighbor_cell, (annual_mean, monthly_means, _) = neighbor
+        return _result(annual_mean, monthly_means, neighbor_cell, 'neighbor')
+
+    try:
+        annual_mean, monthly_means = fetch_nasa_irradiance(latitude, longitude)
+    except requests.exceptions.RequestException:
+        if stored is None:
+            raise
+        # Melhor um dado vencido do que nenhum
+        _index.stats['stale_hits'] += 1
+        return _result(stored.annual_mean, stored.monthly_means, cell, 'stale')
+    _index.stats['fetches'] += 1
+    save_cell(cell, annual_mean, monthly_means)
+    return _result(annual_mean, monthly_means, cell, 'nasa')
+
+
+def irradiance_cache_stats():
+    """Contadores do processo e quantas células estão no índice em memória."""
+    stats = dict(_index.stats)
+    lookups = sum(stats.values())
+    stats['hit_rate'] = round((lookups - stats['fetches']) / lookups, 4) if lookups else 0.0
+    stats['cells_in_memory'] = len(_index)
+    return stats
@@ -0,0 +1,133 @@
+# app/irradiance_grid.py
+
+"""
+Grade pré-calculada de irradiação média mensal do território brasileiro, num arquivo binário.
+
+O arquivo (IRRADIANCE_GRID_PATH, gerado por `flask build-irradiance-grid`) tem um
+cabeçalho fixo seguido de um array float32 (linhas, colunas, 13): as 12 médias
+mensais e a média anual (kWh/m²/dia) de cada ponto da grade, do sul para o norte
+e do oeste para o leste. Pontos sem dado ficam como NaN.
+
+O arquivo é aberto com mmap: os workers compartilham as páginas do arquivo pelo
+cache do sistema operacional, sem carregar a grade na memória de cada processo.
+A irradiação de um ponto é a interpolação bilinear dos 4 pontos da grade ao redor
+(microssegundos). Fora da grade, `lookup` retorna None e quem chamou usa a NASA.
+"""
+
+import csv
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+MAGIC = b'IRRGRID1'
+# magic, latitude e longitude do primeiro ponto, passo em latitude e longitude, linhas, colunas
+HEADER = struct.Struct('<8sddddII')
+VALUES = 13 # 12 meses + média anual
+MONTHS = ('JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC')
+MISSING = -999 # Valor usado pela NASA para dados ausentes
+
+
+class IrradianceGrid:
+    """Grade aberta com mmap. Use `open_grid` para reaproveitar a mesma em todo o processo."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            magic, self.lat0, self.lon0, self.dlat, self.dlon, self.rows, self.cols = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f'{path} não é uma grade de irradiação.')
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        # Um ndarray comum sobre o mmap: fatiar np.memmap é bem mais lento numa consulta de poucos valores
+        self.values = np.frombuffer(self._mmap, dtype='<f4', count=self.rows * self.cols * VALUES,
+                                    offset=HEADER.size).reshape(self.rows, self.cols, VALUES)
+        self.lat_max = self.lat0 + (self.rows - 1) * self.dlat
+        self.lon_max = self.lon0 + (self.cols - 1) * self.dlon
+
+    def lookup(self, latitude, longitude):
+        """(média anual, 12 médias mensais) interpoladas no ponto, ou None se ele estiver fora da grade."""
+        if not (self.lat0 <= latitude <= self.lat_max and self.lon0 <= longitude <= self.lon_max):
+            return None
+        y = (latitude - self.lat0) / self.dlat
+        x = (longitude - self.lon0) / self.dlon
+        r, c = min(int(y), self.rows - 2), min(int(x), self.cols - 2)
+        fy, fx = y - r, x - c
+
+        corners = self.values[r:r + 2, c:c + 2].reshape(4, VALUES)
+        weights = np.array([(1 - fy) * (1 - fx), (1 - fy) * fx, fy * (1 - fx), fy * fx])
+        # Pontos sem dado (mar, bordas) ficam de fora e os pesos dos outros são reescalados
+        valid = ~np.isnan(corners[:, 0])
+        if not valid.any() or weights[valid].sum() <= 0:
+            return None
+        values = weights[valid] @ corners[valid] / weights[valid].sum()
+        return float(values[12]), values[:12].tolist()
+
+
+_grids = {}
+_lock = threading.Lock()
+
+
+def open_grid(path):
+    """Grade do arquivo, aberta uma vez por processo; None se o arquivo não existir."""
+    grid = _grids.get(path)
+    if grid is None and path and os.path.exists(path):
+        with _lock:
+            grid = _grids.get(path) or IrradianceGrid(path)
+            _grids[path] = grid
+    return grid
+
+
+def build_grid(source_csv, output_path):
+    """
+    Gera o arquivo da grade a partir de um CSV com as colunas LAT, LON, JAN..DEC e,
+    opcionalmente, ANN (o formato da climatologia regional da NASA POWER; linhas de
+    outros parâmetros e o cabeçalho de comentários antes da tabela são ignorados).
+    Os pontos precisam formar uma grade regular. Retorna (linhas, colunas, pontos com dado).
+    """
+    points = []
+    with open(source_csv, newline='', encoding='utf-8') as f:
+        lines = iter(f)
+        # A NASA coloca um bloco de comentários antes da tabela, terminado por "-END HEADER-"
+        for line in lines:
+            if line.strip().upper().startswith(('LAT,', 'PARAMETER,')):
+                header = [name.strip().upper() for name in line.split(',')]
+                break
+        else:
+            raise ValueError('Cabeçalho com LAT, LON e os meses não encontrado no CSV.')
+        for row in csv.DictReader(lines, fieldnames=header):
+            if row.get('PARAMETER') and row['PARAMETER'].strip().upper() != 'ALLSKY_SFC_SW_DWN':
+                continue
+            data = np.array([float(row[month]) for month in MONTHS]
+                            + [float(row['ANN']) if row.get('ANN') not in (None, '') else np.nan])
+            data[data <= MISSING] = np.nan
+            if np.isnan(data[12]) and not np.isnan(data[:12]).all():
+                data[12] = np.nanmean(data[:12])
+            points.append((float(row['LAT']), float(row['LON']), data))
+    if not points:
+        raise ValueError('O CSV não tem pontos de irradiação.')
+
+    lats = np.unique([p[0] for p in points])
+    lons = np.unique([p[1] for p in points])
+    dlat = float(np.diff(lats).min()) if len(lats) > 1 else 1.0
+    dlon = float(np.diff(lons).min()) if len(lons) > 1 else 1.0
+    rows = int(round((lats[-1] - lats[0]) / dlat)) + 1
+    cols = int(round((lons[-1] - lons[0]) / dlon)) + 1
+    if rows < 2 or cols < 2:
+        raise ValueError('A grade precisa de pelo menos 2 latitudes e 2 longitudes.')
+
+    values = np.full((rows, cols, VALUES), np.nan, dtype='<f4')
+    for lat, lon, data in points:
+        values[int(round((lat - lats[0]) / dlat)), int(round((lon - lons[0]) / dlon))] = data
+
+    # Grava num arquivo temporário e troca no fim: os workers com a grade antiga aberta não são afetados
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, float(lats[0]), float(lons[0]), dlat, dlon, rows, cols))
+        f.write(values.tobytes())
+    os.replace(tmp_path, output_path)
+    with _lock:
+        _grids.pop(output_path, None)
+    return rows, cols, int((~np.isnan(values[..., 12])).sum())
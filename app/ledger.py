@@ -0,0 +1,162 @@
+# app/ledger.py
+
+"""
+Extrato mês a mês da compensação de energia (net metering) durante a vida útil do sistema.
+
+Para cada um dos 300 meses (25 anos) calcula produção, consumo, energia
+consumida na hora, energia injetada na rede, créditos usados, guardados e
+vencidos, e as faturas com e sem o sistema. As regras seguidas:
+
+- a fatura nunca fica abaixo do custo de disponibilidade (consumo mínimo do
+  tipo de rede), então os créditos só abatem o que passar desse mínimo;
+- os créditos valem CREDIT_EXPIRY_MONTHS meses e são usados do mais antigo
+  para o mais novo;
+- a energia compensada paga o Fio B da concessionária, na proporção da regra
+  de transição da Lei 14.300 (FIO_B_SCHEDULE) para o ano em questão.
+
+Tudo é vetorizado: as contas por mês são feitas em arrays (..., 300) e várias
+propostas são processadas juntas. Só o saldo de créditos, que depende do mês
+anterior, anda mês a mês, e mesmo assim com uma conta de poucos arrays por mês
+para todas as propostas de uma vez.
+"""
+
+from datetime import date
+
+import numpy as np
+
+from app.finance import DEFAULT_ENERGY_INFLATION, DEFAULT_YEARS
+
+LEDGER_MONTHS = DEFAULT_YEARS * 12
+CREDIT_EXPIRY_MONTHS = 60 # Validade dos créditos de energia
+SIMULTANEITY = 0.30 # Fração da produção consumida na hora, sem passar pelo medidor
+DEFAULT_DEGRADATION = 0.005 # Perda de eficiência dos painéis por ano
+
+# Custo de disponibilidade: consumo mínimo cobrado pela concessionária (kWh/mês)
+GRID_AVAILABILITY_KWH = {'monofasica': 30, 'bifasica': 50, 'trifasica': 100}
+DEFAULT_GRID_AVAILABILITY_KWH = 50
+
+# Parcela do Fio B cobrada sobre a energia compensada, por ano (Lei 14.300)
+FIO_B_SCHEDULE = {2023: 0.15, 2024: 0.30, 2025: 0.45, 2026: 0.60, 2027: 0.75, 2028: 0.90}
+FIO_B_FULL_FROM = 2029
+
+
+def grid_availability_kwh(grid_type):
+    """Consumo mínimo mensal (kWh) para cada tipo de rede; tipos desconhecidos usam o da bifásica."""
+    grid_type = np.asarray(grid_type)
+    values = [GRID_AVAILABILITY_KWH.get(str(g), DEFAULT_GRID_AVAILABILITY_KWH) for g in grid_type.ravel()]
+    return np.asarray(values, dtype=float).reshape(grid_type.shape)
+
+
+def fio_b_share(years):
+    """Parcela do Fio B cobrada em cada ano civil."""
+    years = np.asarray(years)
+    share = np.where(years >= FIO_B_FULL_FROM, 1.0, 0.0)
+    for year, value in FIO_B_SCHEDULE.items():
+        share[years == year] = value
+    return share
+
+
+def simulate(monthly_production_kwh, consumption_kwh, grid_type='bifasica', kwh_price=0, fio_b_price=0,
+             public_lighting_fee=0, start_year=None, months=LEDGER_MONTHS,
+             energy_inflation_rate=DEFAULT_ENERGY_INFLATION, degradation_rate=DEFAULT_DEGRADATION,
+             simultaneity=SIMULTANEITY, credit_expiry_months=CREDIT_EXPIRY_MONTHS):
+    """
+    Simula o extrato de uma ou várias propostas.
+
+    `monthly_production_kwh`: produção de janeiro a dezembro do primeiro ano, formato (..., 12).
+    `consumption_kwh`: consumo médio mensal, formato (...). Os demais argumentos por
+    proposta também aceitam arrays. A tarifa e o Fio B sobem com a inflação energética
+    a cada ano; o primeiro mês é janeiro de `start_year` (por padrão, o ano atual).
+
+    Retorna um dicionário de arrays com formato (..., months): production, consumption,
+    self_consumed, injected, compensated, credits_expired, credit_balance, billed_kwh,
+    fio_b_cost, bill_without_solar, bill_with_solar e savings; e, por ano (..., years):
+    annual_bill_without_solar, annual_bill_with_solar e annual_savings.
+    """
+    production_year = np.asarray(monthly_production_kwh, dtype=float)
+    consumption = np.nan_to_num(np.asarray(consumption_kwh, dtype=float))
+    availability = grid_availability_kwh(grid_type)
+    kwh_price = np.nan_to_num(np.asarray(kwh_price, dtype=float))
+    fio_b_price = np.nan_to_num(np.asarray(fio_b_price, dtype=float))
+    fee = np.nan_to_num(np.asarray(public_lighting_fee, dtype=float))
+    start_year = np.asarray(date.today().year if start_year is None else start_year)
+
+    shape = np.broadcast_shapes(production_year.shape[:-1], consumption.shape, availability.shape,
+                                kwh_price.shape, fio_b_price.shape, fee.shape, start_year.shape)
+    year = np.arange(months) // 12
+    inflation = (1 + energy_inflation_rate) ** year
+    degradation = (1 - degradation_rate) ** year
+
+    # 1. Balanço de energia de cada mês, sem depender do saldo de créditos
+    production = np.broadcast_to(np.nan_to_num(production_year)[..., np.arange(months) % 12] * degradation, shape + (months,))
+    consumption = np.broadcast_to(consumption[..., None], shape + (months,))
+    self_consumed = np.minimum(production * simultaneity, consumption)
+    injected = production - self_consumed
+    grid_draw = consumption - self_consumed
+    compensable = np.maximum(grid_draw - availability[..., None], 0)
+
+    # Os créditos do próprio mês abatem primeiro; a sobra vai para o saldo
+    from_month = np.minimum(injected, compensable)
+    deposits = injected - from_month
+    demand = compensable - from_month
+    deposited = np.cumsum(deposits, axis=-1)
+
+    # 2. Saldo de créditos: anda mês a mês, para todas as propostas ao mesmo tempo.
+    # Como os créditos saem sempre do mais antigo (usados ou vencidos), basta comparar
+    # o total depositado com o total que já saiu: os créditos de um mês vencem se ainda
+    # não saíram CREDIT_EXPIRY_MONTHS meses depois.
+    # (Os arrays do laço ficam com o mês no primeiro eixo: cada mês é um bloco contíguo na memória.)
+    deposited_by_month = np.ascontiguousarray(np.moveaxis(deposited, -1, 0))
+    demand_by_month = np.ascontiguousarray(np.moveaxis(demand, -1, 0))
+    used = np.empty((months,) + shape)
+    expired = np.zeros((months,) + shape)
+    removed_until = np.empty((months,) + shape)
+    removed = np.zeros(shape)
+    for m in range(months):
+        available = np.maximum((deposited_by_month[m - 1] if m else 0) - removed, 0)
+        used[m] = np.minimum(demand_by_month[m], available)
+        removed = removed + used[m]
+        if m >= credit_expiry_months - 1:
+            expired[m] = np.maximum(deposited_by_month[m - credit_expiry_months + 1] - removed, 0)
+            removed = removed + expired[m]
+        removed_until[m] = removed
+    used, expired, removed_until = (np.moveaxis(a, 0, -1) for a in (used, expired, removed_until))
+
+    compensated = from_month + used
+    balance = np.maximum(deposited - removed_until, 0)
+
+    # 3. Faturas
+    tariff = kwh_price[..., None] * inflation
+    fio_b = fio_b_price[..., None] * inflation * fio_b_share(start_year[..., None] + year)
+    billed_kwh = np.maximum(grid_draw - compensated, availability[..., None])
+    fio_b_cost = compensated * fio_b
+    bill_without = np.maximum(consumption, availability[..., None]) * tariff + fee[..., None]
+    bill_with = billed_kwh * tariff + fio_b_cost + fee[..., None]
+
+    def by_year(monthly):
+        return monthly.reshape(monthly.shape[:-1] + (-1, 12)).sum(axis=-1)
+
+    return {
+        'production': production,
+        'consumption': consumption,
+        'self_consumed': self_consumed,
+        'injected': injected,
+        'compensated': compensated,
+        'credits_expired': expired,
+        'credit_balance': balance,
+        'billed_kwh': billed_kwh,
+        'fio_b_cost': fio_b_cost,
+        'bill_without_solar': bill_without,
+        'bill_with_solar': bill_with,
+        'savings': bill_without - bill_with,
+        'annual_bill_without_solar': by_year(bill_without),
+        'annual_bill_with_solar': by_year(bill_with),
+        'annual_savings': by_year(bill_without - bill_with),
+    }
+
+
+def cash_flows(investment, result):
+    """Fluxo de caixa anual (..., years + 1) a partir do extrato: ano 0 é o investimento."""
+    savings = result['annual_savings']
+    initial = np.broadcast_to(-np.asarray(investment, dtype=float)[..., None], savings.shape[:-1] + (1,))
+    return np.concatenate([initial, savings], axis=-1)
@@ -0,0 +1,205 @@
+# app/lookups.py
+
+"""
+Consulta de CEP e CNPJ (BrasilAPI) pelo servidor, com cache persistente.
+
+O formulário de clientes consultava a BrasilAPI direto do navegador, a cada CEP ou
+CNPJ digitado. Agora as consultas passam por aqui:
+- as respostas ficam na tabela lookup_cache, cada uma com a sua validade
+  (LOOKUP_CEP_TTL_DAYS, LOOKUP_CNPJ_TTL_DAYS);
+- códigos que não existem também são guardados (cache negativo), por
+  LOOKUP_NEGATIVE_TTL_HOURS, para não repetir a consulta a cada tentativa;
+- consultas simultâneas ao mesmo código, no mesmo processo, viram uma só: as
+  outras esperam o resultado da primeira;
+- se a BrasilAPI falhar, uma resposta vencida do cache é usada.
+
+A rede passa pelo provedor `brasilapi` de app/providers.py.
+"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from app import db, providers
+from app.models import LookupCache
+
+BRASILAPI_URLS = {
+    'cep': 'https://brasilapi.com.br/api/cep/v1/{code}',
+    'cnpj': 'https://brasilapi.com.br/api/cnpj/v1/{code}',
+}
+CODE_LENGTHS = {'cep': 8, 'cnpj': 14}
+NOT_FOUND_STATUS = {400, 404} # A BrasilAPI responde 400 para CNPJ inválido e 404 para código inexistente
+INFLIGHT_TIMEOUT = 30 # Segundos esperando a consulta de outra requisição
+
+_stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'coalesced': 0, 'stale_hits': 0}
+
+
+def normalize_code(kind, code):
+    """Só os dígitos do código, ou None se não tiver o tamanho certo."""
+    digits = re.sub(r'\D', '', code or '')
+    return digits if len(digits) == CODE_LENGTHS[kind] else None
+
+
+# --- CONSULTAS SIMULTÂNEAS AO MESMO CÓDIGO ---
+class _InFlight:
+    """Uma consulta em andamento: quem chega depois espera o resultado de quem chegou primeiro."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _fetch(kind, code):
+    """Consulta a BrasilAPI. Retorna (encontrado, dados). Erros de rede são propagados."""
+    try:
+        response = providers.brasilapi.get(BRASILAPI_URLS[kind].format(code=code))
+    except requests.exceptions.HTTPError as e:
+        if e.response is not None and e.response.status_code in NOT_FOUND_STATUS:
+            return False, None
+        raise
+    return True, response.json()
+
+
+def fetch_coalesced(kind, code):
+    """
+    `_fetch`, mas consultas simultâneas ao mesmo código (de várias threads) fazem uma chamada só.
+    Não usa o banco: pode ser chamada de qualquer thread.
+    """
+    key = (kind, code)
+    with _inflight_lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = _InFlight()
+
+    if not leader:
+        _stats['coalesced'] += 1
+        if not flight.done.wait(INFLIGHT_TIMEOUT):
+            raise requests.exceptions.Timeout(f'Consulta de {kind} {code} demorou demais.')
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = _fetch(kind, code)
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        flight.done.set()
+
+
+# --- CACHE PERSISTENTE ---
+def _expires_at(kind, found, now):
+    config = current_app.config
+    if not found:
+        return now + timedelta(hours=config['LOOKUP_NEGATIVE_TTL_HOURS'])
+    days = config['LOOKUP_CEP_TTL_DAYS'] if kind == 'cep' else config['LOOKUP_CNPJ_TTL_DAYS']
+    return now + timedelta(days=days)
+
+
+def _store(kind, code, found, data, entry=None):
+    now = datetime.utcnow()
+    if entry is None:
+        entry = LookupCache(kind=kind, code=code, hits=0)
+    entry.found, entry.data, entry.fetched_at = found, data, now
+    entry.expires_at = _expires_at(kind, found, now)
+    try:
+        with db.session.begin_nested():
+            db.session.add(entry)
+    except IntegrityError:
+        pass # Outro processo gravou o mesmo código enquanto consultávamos
+
+
+def _answer(found, data, source):
+    return {'found': found, 'data': data, 'source': source}
+
+
+def lookup(kind, code):
+    """
+    Dados do CEP/CNPJ: {'found': bool, 'data': resposta da BrasilAPI ou None, 'source': ...}.
+    `code` já normalizado (normalize_code). Erros de rede só são propagados sem cache nenhum.
+    """
+    now = datetime.utcnow()
+    entry = LookupCache.query.filter_by(kind=kind, code=code).first()
+    if entry is not None and entry.expires_at > now:
+        _stats['hits' if entry.found else 'negative_hits'] += 1
+        entry.hits = (entry.hits or 0) + 1
+        db.session.commit()
+        return _answer(entry.found, entry.data, 'cache')
+
+    _stats['misses'] += 1
+    try:
+        result = fetch_coalesced(kind, code)
+    except requests.exceptions.RequestException:
+        if entry is None:
+            raise
+        _stats['stale_hits'] += 1
+        return _answer(entry.found, entry.data, 'stale')
+    _store(kind, code, *result, entry=entry)
+    db.session.commit()
+    return _answer(*result, 'brasilapi')
+
+
+def lookup_many(kind, codes, workers=8):
+    """
+    Vários códigos de uma vez (importações): uma consulta ao banco para todos e as faltas
+    buscadas em paralelo. Retorna {código: resposta de `lookup`, ou {'error': ...}}.
+    """
+    now = datetime.utcnow()
+    codes = list(dict.fromkeys(codes))
+    entries = {entry.code: entry for entry in LookupCache.query.filter(
+        LookupCache.kind == kind, LookupCache.code.in_(codes)).all()}
+
+    results, missing = {}, []
+    for code in codes:
+        entry = entries.get(code)
+        if entry is not None and entry.expires_at > now:
+            _stats['hits' if entry.found else 'negative_hits'] += 1
+            entry.hits = (entry.hits or 0) + 1
+            results[code] = _answer(entry.found, entry.data, 'cache')
+        else:
+            missing.append(code)
+
+    if missing:
+        _stats['misses'] += len(missing)
+        with ThreadPoolExecutor(max_workers=min(workers, len(missing))) as pool:
+            futures = {code: pool.submit(fetch_coalesced, kind, code) for code in missing}
+        # As gravações ficam na thread da requisição
+        for code, future in futures.items():
+            try:
+                result = future.result()
+            except requests.exceptions.RequestException as e:
+                entry = entries.get(code)
+                if entry is None:
+                    results[code] = {'error': str(e)}
+                    continue
+                _stats['stale_hits'] += 1
+                results[code] = _answer(entry.found, entry.data, 'stale')
+                continue
+            _store(kind, code, *result, entry=entries.get(code))
+            results[code] = _answer(*result, 'brasilapi')
+    db.session.commit()
+    return results
+
+
+def lookup_cache_stats():
+    lookups = _stats['hits'] + _stats['negative_hits'] + _stats['misses']
+    return {
+        **_stats,
+        'hit_rate': round((_stats['hits'] + _stats['negative_hits']) / lookups, 4) if lookups else 0.0,
+        'entries': LookupCache.query.count(),
+    }
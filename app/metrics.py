@@ -0,0 +1,221 @@
+# app/metrics.py
+
+"""
+Métricas financeiras derivadas das propostas, gravadas na tabela proposal_metrics.
+
+VPL, TIR, lucro em 25 anos e as faturas com e sem o sistema saem do extrato de
+créditos (app/ledger.py) e do motor financeiro (app/finance.py). Em vez de
+refazer essas contas a cada visualização ou PDF, elas ficam gravadas junto com a
+versão do cálculo e um hash das entradas, e só são refeitas quando:
+- a proposta muda (na hora de salvar; alterar itens muda o investimento);
+- o Fio B da concessionária muda (na hora de salvar a concessionária, para todas as propostas dela);
+- CALCULATION_VERSION aumenta.
+
+Várias propostas são calculadas juntas, em arrays, pelo comando `flask refresh-metrics`.
+"""
+
+import hashlib
+import json
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import joinedload
+
+from app import db, finance, ledger, sizing
+from app.models import Concessionaria, Proposal, ProposalMetrics
+
+# Aumente sempre que as contas mudarem, para recalcular as métricas gravadas
+CALCULATION_VERSION = 1
+
+
+def _number(value):
+    return None if value is None else float(value)
+
+
+def metrics_inputs(proposal):
+    """
+    Tudo o que entra no cálculo das métricas de uma proposta. Os valores são normalizados
+    (20000 e 20000.0 são a mesma entrada; os padrões das colunas ainda não aplicados no flush
+    de uma proposta nova entram como ficarão gravados).
+    """
+    # Pelo id, não pelo relacionamento: numa proposta nova, ou com concessionaria_id trocado
+    # antes do flush, `proposal.concessionaria` ainda não foi carregado (ou é a antiga)
+    concessionaria = db.session.get(Concessionaria, proposal.concessionaria_id) if proposal.concessionaria_id else None
+    return {
+        'total_investment': _number(proposal.total_investment),
+        'estimated_savings_per_year': _number(proposal.estimated_savings_per_year),
+        'monthly_production_kwh': [_number(v) for v in proposal.monthly_production_kwh or []],
+        'consumption_input_type': proposal.consumption_input_type or 'kwh',
+        'avg_consumption_kwh': _number(proposal.avg_consumption_kwh),
+        'avg_bill_brl': _number(proposal.avg_bill_brl),
+        'kwh_price': _number(proposal.kwh_price),
+        'public_lighting_fee': _number(proposal.public_lighting_fee),
+        'grid_type': proposal.grid_type,
+        'fio_b_price': _number(concessionaria.fio_b_price) if concessionaria else None,
+        'start_year': (proposal.creation_date or datetime.utcnow()).year,
+    }
+
+
+def inputs_hash(inputs):
+    payload = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def is_stale(proposal, digest=None):
+    """True se a proposta ainda não tem métricas ou se elas foram calculadas com outras entradas."""
+    metrics = proposal.metrics
+    return (metrics is None or metrics.calculation_version != CALCULATION_VERSION
+            or metrics.inputs_hash != (digest or inputs_hash(metrics_inputs(proposal))))
+
+
+def _column(rows, key, default=np.nan):
+    return np.array([default if row[key] is None else row[key] for row in rows], dtype=float)
+
+
+def compute_metrics(rows):
+    """
+    Calcula as métricas de várias propostas de uma vez, a partir de `metrics_inputs`.
+    Retorna uma lista de dicionários com os valores das colunas de ProposalMetrics.
+    """
+    results = [dict.fromkeys([
+        'npv', 'irr', 'profit_in_25_years', 'total_savings_in_25_years', 'old_annual_bill', 'new_annual_bill',
+        'credits_expired_kwh', 'fio_b_cost', 'annual_bill_without_solar', 'annual_bill_with_solar', 'annual_savings',
+    ]) for _ in rows]
+    if not rows:
+        return results
+
+    investment = _column(rows, 'total_investment')
+    savings = _column(rows, 'estimated_savings_per_year')
+    # Sem produção mensal ou tarifa não há extrato: o fluxo usa a economia anual corrigida pela inflação
+    flows = finance.cash_flows(np.nan_to_num(investment), np.nan_to_num(savings))
+
+    # 1. Extrato de créditos das propostas que têm produção mensal e tarifa
+    with_ledger = [i for i, row in enumerate(rows)
+                   if row['monthly_production_kwh'] and len(row['monthly_production_kwh']) == 12 and row['kwh_price']]
+    if with_ledger:
+        subset = [rows[i] for i in with_ledger]
+        kwh_price = _column(subset, 'kwh_price')
+        by_bill = np.array([row['consumption_input_type'] == 'brl' and bool(row['avg_bill_brl']) for row in subset])
+        consumption = np.where(
+            by_bill,
+            sizing.consumption_from_bill(_column(subset, 'avg_bill_brl'), kwh_price, _column(subset, 'public_lighting_fee', 0)),
+            _column(subset, 'avg_consumption_kwh', 0),
+        )
+        statement = ledger.simulate(
+            np.array([row['monthly_production_kwh'] for row in subset], dtype=float),
+            consumption,
+            np.array([row['grid_type'] or 'bifasica' for row in subset]),
+            kwh_price,
+            _column(subset, 'fio_b_price', 0),
+            public_lighting_fee=_column(subset, 'public_lighting_fee', 0),
+            start_year=np.array([row['start_year'] for row in subset]),
+        )
+        flows[with_ledger, 1:] = statement['annual_savings']
+        expired = statement['credits_expired'].sum(axis=-1)
+        fio_b_cost = statement['fio_b_cost'].sum(axis=-1)
+        for k, i in enumerate(with_ledger):
+            without, with_solar = statement['annual_bill_without_solar'][k], statement['annual_bill_with_solar'][k]
+            results[i].update({
+                'old_annual_bill': float(without[0]),
+                'new_annual_bill': float(with_solar[0]),
+                'credits_expired_kwh': float(expired[k]),
+                'fio_b_cost': float(fio_b_cost[k]),
+                'annual_bill_without_solar': without.tolist(),
+                'annual_bill_with_solar': with_solar.tolist(),
+                'annual_savings': statement['annual_savings'][k].tolist(),
+            })
+
+    # 2. VPL, TIR, lucro e economia em 25 anos, todos numa passada
+    evaluated = finance.evaluate_cash_flows(flows)
+    valid = (investment > 0) & (savings > 0)
+    for i in np.flatnonzero(valid):
+        results[i].update({
+            'npv': float(evaluated['npv'][i]),
+            'irr': float(evaluated['irr'][i]) * 100 if np.isfinite(evaluated['irr'][i]) else None, # Em porcentagem
+            'profit_in_25_years': float(evaluated['profit'][i]),
+            'total_savings_in_25_years': float(evaluated['total_savings'][i]),
+        })
+    return results
+
+
+def refresh_metrics(proposals, force=False):
+    """
+    Recalcula (em lote) as métricas das propostas desatualizadas. Não faz commit.
+    Retorna quantas propostas foram recalculadas.
+    """
+    stale = []
+    for proposal in proposals:
+        inputs = metrics_inputs(proposal)
+        digest = inputs_hash(inputs)
+        if force or is_stale(proposal, digest):
+            stale.append((proposal, inputs, digest))
+
+    values = compute_metrics([inputs for _, inputs, _ in stale])
+    for (proposal, _, digest), columns in zip(stale, values):
+        metrics = proposal.metrics or ProposalMetrics()
+        for name, value in columns.items():
+            setattr(metrics, name, value)
+        metrics.calculation_version = CALCULATION_VERSION
+        metrics.inputs_hash = digest
+        metrics.computed_at = datetime.utcnow()
+        proposal.metrics = metrics
+    return len(stale)
+
+
+def get_metrics(proposal):
+    """
+    Métricas gravadas da proposta, só para leitura (telas e PDF): não recalcula nem grava.
+    Elas são mantidas em dia quando a proposta ou a concessionária é gravada. Uma proposta
+    ainda sem métricas (antes de `flask refresh-metrics`) recebe um cálculo avulso, que não é gravado.
+    """
+    if proposal.metrics is not None:
+        return proposal.metrics
+    inputs = metrics_inputs(proposal)
+    return ProposalMetrics(calculation_version=CALCULATION_VERSION, inputs_hash=inputs_hash(inputs),
+                           **compute_metrics([inputs])[0])
+
+
+def refresh_all_metrics(force=False, batch_size=500):
+    """
+    Percorre todas as propostas em lotes, recalculando as desatualizadas (ou todas, com `force`).
+    Gera (verificadas, recalculadas) após cada lote, para mostrar o progresso.
+    """
+    checked = updated = 0
+    last_id = 0
+    while True:
+        batch = (Proposal.query
+                 .options(joinedload(Proposal.concessionaria), joinedload(Proposal.metrics))
+                 .filter(Proposal.id > last_id).order_by(Proposal.id).limit(batch_size).all())
+        if not batch:
+            break
+        updated += refresh_metrics(batch, force=force)
+        db.session.commit()
+        checked += len(batch)
+        last_id = batch[-1].id
+        db.session.expunge_all()
+        yield checked, updated
+
+
+# --- RECÁLCULO AO SALVAR ---
+# Propostas novas ou alteradas, e as propostas de uma concessionária cujo Fio B mudou,
+# têm as métricas recalculadas no mesmo flush que as grava.
+
+def _fio_b_changed(concessionaria):
+    history = inspect(concessionaria).attrs.fio_b_price.history
+    if not history.added or not history.deleted:
+        return False
+    return _number(history.added[0]) != _number(history.deleted[0])
+
+
+@event.listens_for(db.session, 'before_flush')
+def _refresh_changed_proposals(session, flush_context, instances):
+    changed = {obj for obj in list(session.new) + list(session.dirty)
+               if isinstance(obj, Proposal) and obj not in session.deleted}
+    repriced = [obj.id for obj in session.dirty if isinstance(obj, Concessionaria) and _fio_b_changed(obj)]
+    with session.no_autoflush:
+        if repriced:
+            changed.update(Proposal.query.options(joinedload(Proposal.metrics))
+                           .filter(Proposal.concessionaria_id.in_(repriced)).all())
+        if changed:
+            refresh_metrics(list(changed))
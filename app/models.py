@@ -16,8 +16,9 @@ class Product(db.Model):
     name = db.Column(db.String(150), nullable=False)
     category = db.Column(db.String(50), index=True) # Ex: Módulo, Inversor, Estrutura, Mão de Obra
     manufacturer = db.Column(db.String(100))
-    power_wp = db.Column(db.Integer) # Potência em Watts, para módulos
+    power_wp = db.Column(db.Integer) # Potência em Watts: Wp para módulos, potência nominal (AC) para inversores
     warranty_years = db.Column(db.Integer) # Garantia em anos
+    price = db.Column(db.Float) # Preço unitário de referência em R$ (usado pelo otimizador)
 
     def __repr__(self):
         return f'<Product {self.name}>'
@@ -66,6 +67,12 @@ class Client(db.Model):
     city = db.Column(db.String(100))
     state = db.Column(db.String(2)) # UF
 
+    # Coordenadas do endereço (app/geocoding.py); apagadas quando o endereço muda
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geocoded_at = db.Column(db.DateTime)
+    geocode_failed_at = db.Column(db.DateTime) # Última vez que o endereço não foi encontrado
+
     timestamp = db.Column(db.DateTime, index=True, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     proposals = db.relationship('Proposal', backref='client', lazy='dynamic', cascade="all, delete-orphan")
@@ -114,6 +121,9 @@ class Proposal(db.Model):
     monthly_production_kwh = db.Column(db.JSON) # Armazenará os 12 valores de produção
     payback_years = db.Column(db.Float) # Payback em anos
 
+    # Última alteração da proposta ou dos seus itens (usada no Last-Modified do PDF)
+    last_modified = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
     # Relacionamento: Uma proposta pertence a UM cliente
     client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
     
@@ -123,6 +133,9 @@ class Proposal(db.Model):
     # Relacionamento: Uma proposta tem VÁRIOS itens
     items = db.relationship('ProposalItem', backref='proposal', lazy='dynamic', cascade="all, delete-orphan")
 
+    # Métricas financeiras já calculadas (ver app/metrics.py)
+    metrics = db.relationship('ProposalMetrics', backref='proposal', uselist=False, cascade="all, delete-orphan")
+
     def __repr__(self):
         return f'<Proposal {self.title}>'
     
@@ -134,6 +147,94 @@ class Proposal(db.Model):
 
 
 
+# --- MÉTRICAS FINANCEIRAS DA PROPOSTA (calculadas em app/metrics.py) ---
+class ProposalMetrics(db.Model):
+    proposal_id = db.Column(db.Integer, db.ForeignKey('proposal.id'), primary_key=True)
+    calculation_version = db.Column(db.Integer, nullable=False) # CALCULATION_VERSION usada no cálculo
+    inputs_hash = db.Column(db.String(64), nullable=False) # Hash das entradas: muda quando algo precisa ser recalculado
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    npv = db.Column(db.Float) # VPL em R$
+    irr = db.Column(db.Float) # TIR em % a.a.
+    profit_in_25_years = db.Column(db.Float)
+    total_savings_in_25_years = db.Column(db.Float)
+
+    # Faturas do primeiro ano e extrato resumido por ano (ver app/ledger.py)
+    old_annual_bill = db.Column(db.Float)
+    new_annual_bill = db.Column(db.Float)
+    credits_expired_kwh = db.Column(db.Float)
+    fio_b_cost = db.Column(db.Float)
+    annual_bill_without_solar = db.Column(db.JSON)
+    annual_bill_with_solar = db.Column(db.JSON)
+    annual_savings = db.Column(db.JSON)
+
+    def financials(self):
+        """VPL, TIR, lucro e economia em 25 anos no formato usado pelo template do PDF."""
+        if self.npv is None:
+            return {}
+        return {
+            'npv': self.npv,
+            'irr': self.irr,
+            'profit_in_25_years': self.profit_in_25_years,
+            'total_savings_in_25_years': self.total_savings_in_25_years,
+        }
+
+    def __repr__(self):
+        return f'<ProposalMetrics {self.proposal_id} v{self.calculation_version}>'
+
+
+
+# --- CACHE DE GEOCODIFICAÇÃO (usado em app/geocoding.py) ---
+class GeocodeCache(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    address_key = db.Column(db.String(400), index=True, unique=True, nullable=False) # Endereço normalizado
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    hits = db.Column(db.Integer, default=0) # Quantas vezes o cache evitou uma consulta ao Nominatim
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_hit_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<GeocodeCache {self.address_key}>'
+
+
+
+# --- IRRADIAÇÃO POR CÉLULA DA GRADE DA NASA POWER (usado em app/irradiance.py) ---
+class IrradianceCell(db.Model):
+    __table_args__ = (db.UniqueConstraint('cell_row', 'cell_col'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    cell_row = db.Column(db.Integer, nullable=False) # Latitude do ponto da grade / 0,5°
+    cell_col = db.Column(db.Integer, nullable=False) # Longitude do ponto da grade / 0,625°
+    latitude = db.Column(db.Float) # Centro da célula
+    longitude = db.Column(db.Float)
+    annual_mean = db.Column(db.Float, nullable=False) # kWh/m²/dia
+    monthly_means = db.Column(db.JSON, nullable=False) # 12 médias, de janeiro a dezembro
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<IrradianceCell {self.cell_row},{self.cell_col}>'
+
+
+
+# --- CACHE DAS CONSULTAS DE CEP E CNPJ (usado em app/lookups.py) ---
+class LookupCache(db.Model):
+    __table_args__ = (db.UniqueConstraint('kind', 'code'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False) # 'cep' ou 'cnpj'
+    code = db.Column(db.String(14), nullable=False) # Só os dígitos
+    found = db.Column(db.Boolean, nullable=False) # False: código inexistente (cache negativo)
+    data = db.Column(db.JSON) # Resposta da BrasilAPI
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    hits = db.Column(db.Integer, default=0)
+
+    def __repr__(self):
+        return f'<LookupCache {self.kind} {self.code}>'
+
+
+
 # --- CLASSE ATUALIZADA PARA OS ITENS DA PROPOSTA ---
 # --- CLASSE ATUALIZADA PARA OS ITENS DA PROPOSTA ---
 class ProposalItem(db.Model):
@@ -0,0 +1,202 @@
+# app/optimizer.py
+
+"""
+Otimizador de configurações a partir do catálogo de produtos.
+
+Procura as combinações de módulo, quantidade de módulos e inversor (um ou mais
+aparelhos iguais) que melhor atendem o consumo de um cliente, e devolve as N
+melhores por VPL ou por custo do kWh gerado.
+
+Em vez de testar todas as combinações, a busca é podada em três pontos:
+- módulos com a mesma potência e preço maior são descartados (produzem o mesmo
+  e custam mais);
+- para cada módulo só entram as quantidades que cobrem entre MIN_COVERAGE e
+  MAX_COVERAGE do consumo;
+- para cada potência instalada só o inversor mais barato dentro da faixa de
+  carregamento (DC/AC) é considerado, já que a produção estimada não depende
+  do inversor. Essa escolha é uma consulta de mínimo em intervalo (sparse
+  table) feita para todos os candidatos de uma vez.
+
+Depois disso, produção e custo de todos os candidatos restantes são calculados
+em arrays (app/sizing.py). O extrato de créditos (app/ledger.py), que é a parte
+cara, só depende da potência instalada: com muitas potências distintas, ele roda
+para LEDGER_SAMPLES potências, o valor presente da economia das demais é
+interpolado, e só os SHORTLIST_SIZE melhores candidatos passam pelo extrato
+exato para o ranking final. Os valores devolvidos são sempre os do extrato exato.
+"""
+
+import numpy as np
+
+from app import finance, ledger, sizing
+
+MIN_COVERAGE = 0.7 # Fração do consumo anual coberta pelo menor sistema avaliado
+MAX_COVERAGE = 1.3
+MIN_DC_AC_RATIO = 0.8 # Potência dos módulos / potência do inversor aceitável
+MAX_DC_AC_RATIO = 1.35
+MAX_INVERTER_UNITS = 4 # Até quantos inversores iguais podem ser combinados
+
+LEDGER_SAMPLES = 48 # Acima disso, potências simuladas para estimar o VPL das demais
+SHORTLIST_SIZE = 50 # Candidatos reavaliados com o extrato exato antes do ranking por VPL
+
+RANKINGS = ('npv', 'cost_per_kwh')
+
+
+def _cheapest_modules(modules):
+    """Para cada potência, fica só o módulo mais barato."""
+    best = {}
+    for module in modules:
+        if not module.get('power_wp') or not module.get('price') or module['power_wp'] <= 0 or module['price'] <= 0:
+            continue
+        current = best.get(module['power_wp'])
+        if current is None or module['price'] < current['price']:
+            best[module['power_wp']] = module
+    return list(best.values())
+
+
+def _inverter_options(inverters):
+    """Todas as opções (inversor, unidades), ordenadas pela potência AC total."""
+    valid = [(index, inverter['power_w'], inverter['price']) for index, inverter in enumerate(inverters)
+             if inverter.get('power_w') and inverter.get('price') and inverter['power_w'] > 0 and inverter['price'] > 0]
+    if not valid:
+        return np.array([]), np.array([]), np.array([], dtype=int), np.array([], dtype=int)
+    index, power_w, price = (np.array(column) for column in zip(*valid))
+    units = np.arange(1, MAX_INVERTER_UNITS + 1)
+    ac_kw = (power_w[:, None] * units / 1000).ravel()
+    cost = (price[:, None] * units).astype(float).ravel()
+    index = np.repeat(index, MAX_INVERTER_UNITS)
+    units = np.tile(units, len(valid))
+    order = np.lexsort((units, index, cost, ac_kw)) # Mesma ordem da tupla (ac_kw, custo, índice, unidades)
+    return ac_kw[order].astype(float), cost[order], index[order], units[order]
+
+
+def _best(score, n):
+    """Posições dos `n` menores valores de `score`, do menor para o maior."""
+    n = min(n, len(score))
+    best = np.argpartition(score, n - 1)[:n]
+    return best[np.argsort(score[best], kind='stable')]
+
+
+def _range_argmin(values, start, stop):
+    """
+    Posição do menor valor em values[start:stop] para cada par (start, stop), usando
+    uma sparse table: O(n log n) para montar e O(1) por consulta. Intervalos vazios dão -1.
+    """
+    n = len(values)
+    if n == 0:
+        return np.full(len(start), -1)
+    levels = [np.arange(n)]
+    width = 1
+    while width * 2 <= n:
+        previous = levels[-1]
+        left, right = previous[:n - width * 2 + 1], previous[width:n - width + 1]
+        levels.append(np.where(values[left] <= values[right], left, right))
+        width *= 2
+    table = np.full((len(levels), n), n - 1)
+    for k, level in enumerate(levels):
+        table[k, :len(level)] = level
+
+    length = stop - start
+    empty = length <= 0
+    k = np.floor(np.log2(np.maximum(length, 1))).astype(int)
+    first = table[k, np.minimum(start, n - 1)]
+    second = table[k, np.clip(stop - (1 << k), 0, n - 1)]
+    best = np.where(values[first] <= values[second], first, second)
+    return np.where(empty, -1, best)
+
+
+def optimize(consumption_kwh, irradiance, modules, inverters, grid_type='bifasica', kwh_price=0,
+             fio_b_price=0, bos_cost_per_kwp=0, rank_by='npv', top_n=5, latitude=np.nan,
+             years=finance.DEFAULT_YEARS, discount_rate=finance.DEFAULT_DISCOUNT_RATE):
+    """
+    Retorna as `top_n` melhores configurações (lista de dicionários), da melhor para a pior.
+
+    `modules`: dicionários com id, name, power_wp e price (por módulo).
+    `inverters`: dicionários com id, name, power_w (potência AC) e price.
+    `bos_cost_per_kwp`: estrutura, cabos e mão de obra por kWp instalado.
+    `latitude`: quando informada, a produção vem da simulação horária (app/solar_sim.py).
+    """
+    if rank_by not in RANKINGS:
+        raise ValueError(f'rank_by deve ser um de {RANKINGS}')
+    if not consumption_kwh or not irradiance or consumption_kwh <= 0 or irradiance <= 0:
+        return []
+
+    modules = _cheapest_modules(modules)
+    ac_kw, inverter_cost, inverter_index, inverter_units = _inverter_options(inverters)
+    if not modules or len(ac_kw) == 0:
+        return []
+
+    # 1. Candidatos (módulo, quantidade) que cobrem a faixa de consumo
+    monthly_yield = sizing.specific_monthly_yield(irradiance, latitude) # kWh/mês por kWp
+    annual_yield = float(monthly_yield.sum())
+    required_kwp = consumption_kwh * 12 / annual_yield
+    module_kw = np.array([m['power_wp'] for m in modules], dtype=float) / 1000
+    module_price = np.array([m['price'] for m in modules], dtype=float)
+    q_min = np.maximum(1, np.ceil(required_kwp * MIN_COVERAGE / module_kw)).astype(int)
+    q_max = np.maximum(q_min, np.ceil(required_kwp * MAX_COVERAGE / module_kw)).astype(int)
+    counts = q_max - q_min + 1
+    module_of = np.repeat(np.arange(len(modules)), counts)
+    quantity = np.repeat(q_min, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+
+    # 2. Inversor mais barato dentro da faixa de carregamento, para cada candidato
+    power_kwp = quantity * module_kw[module_of]
+    start = np.searchsorted(ac_kw, power_kwp / MAX_DC_AC_RATIO, side='left')
+    stop = np.searchsorted(ac_kw, power_kwp / MIN_DC_AC_RATIO, side='right')
+    option = _range_argmin(inverter_cost, start, stop)
+    feasible = option >= 0
+    if not feasible.any():
+        return []
+    module_of, quantity, power_kwp, option = module_of[feasible], quantity[feasible], power_kwp[feasible], option[feasible]
+
+    # 3. Avaliação de todos os candidatos de uma vez
+    investment = quantity * module_price[module_of] + inverter_cost[option] + power_kwp * bos_cost_per_kwp
+    production = power_kwp * annual_yield
+    cost_per_kwh = investment / (production * years)
+    discount = (1 + discount_rate) ** -np.arange(1, years + 1)
+
+    def simulate(powers):
+        """Economia anual (potências x anos) pelo extrato de créditos."""
+        statement = ledger.simulate(powers[:, None] * monthly_yield, consumption_kwh, grid_type, kwh_price,
+                                    fio_b_price, months=years * 12)
+        return statement['annual_savings']
+
+    # 4. Lista curta: o extrato exato só roda para os candidatos que podem ficar entre os melhores
+    powers = np.unique(np.round(power_kwp, 6))
+    if rank_by == 'cost_per_kwh':
+        shortlist = _best(cost_per_kwh, top_n) # Não depende do extrato
+    elif len(powers) <= LEDGER_SAMPLES + SHORTLIST_SIZE: # Poucas potências: simular todas sai mais barato
+        shortlist = np.arange(len(power_kwp))
+    else:
+        # O valor presente da economia varia suavemente com a potência: simula algumas
+        # potências, interpola para as demais e reavalia só os melhores com o extrato exato
+        samples = np.linspace(powers[0], powers[-1], LEDGER_SAMPLES)
+        present_value = np.interp(power_kwp, samples, simulate(samples) @ discount)
+        shortlist = _best(investment - present_value, max(top_n, SHORTLIST_SIZE))
+
+    powers, same_power = np.unique(np.round(power_kwp[shortlist], 6), return_inverse=True)
+    yearly_savings = simulate(powers)[same_power.ravel()]
+    savings = yearly_savings[:, 0]
+    npv = finance.npv(np.concatenate([-investment[shortlist, None], yearly_savings], axis=1), discount_rate)
+
+    score = -npv if rank_by == 'npv' else cost_per_kwh[shortlist]
+    order = _best(score, top_n)
+    best, savings, npv = shortlist[order], savings[order], npv[order]
+
+    results = []
+    for k, i in enumerate(best):
+        module = modules[module_of[i]]
+        inverter = inverters[inverter_index[option[i]]]
+        results.append({
+            'module': {'id': module.get('id'), 'name': module.get('name'), 'power_wp': module['power_wp']},
+            'panel_quantity': int(quantity[i]),
+            'inverter': {'id': inverter.get('id'), 'name': inverter.get('name'), 'power_w': inverter['power_w'],
+                         'units': int(inverter_units[option[i]])},
+            'system_power_kwp': round(float(power_kwp[i]), 3),
+            'recommended_inverter_kw': float(ac_kw[option[i]]),
+            'total_investment': round(float(investment[i]), 2),
+            'annual_production_kwh': round(float(production[i]), 1),
+            'estimated_savings_per_year': round(float(savings[k]), 2),
+            'payback_years': float(investment[i] / savings[k]) if savings[k] > 0 else None,
+            'npv': round(float(npv[k]), 2),
+            'cost_per_kwh': round(float(cost_per_kwh[i]), 4),
+        })
+    return results
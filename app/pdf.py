@@ -0,0 +1,118 @@
+# app/pdf.py
+
+import os
+import threading
+
+from flask import render_template, current_app
+from weasyprint import CSS, HTML
+from weasyprint.text.fonts import FontConfiguration
+
+from app import charts_svg, utils
+from app.utils import calculate_risk_profile, risk_profile_options
+from app.metrics import get_metrics
+from app.pdf_cache import get_pdf_cache, proposal_cache_key
+from app.pdf_assets import pdf_url_fetcher
+from app.pdf_optimize import pdf_render_options, check_size_budget
+from app.chart_pool import run_in_parallel
+
+
+PDF_STYLESHEET = os.path.join(os.path.dirname(__file__), 'static', 'css', 'pdf_proposal.css')
+
+
+# --- ESTILO E FONTES COMPARTILHADOS ---
+# O CSS do PDF é grande e não muda entre propostas: é lido uma vez por processo,
+# junto com uma única configuração de fontes reaproveitada em todos os PDFs.
+_font_config = None
+_stylesheets = None
+_stylesheet_lock = threading.Lock()
+
+
+def get_pdf_stylesheets():
+    """Retorna (folhas de estilo já interpretadas, configuração de fontes) deste processo."""
+    global _font_config, _stylesheets
+    with _stylesheet_lock:
+        if _stylesheets is None:
+            _font_config = FontConfiguration()
+            _stylesheets = [CSS(filename=PDF_STYLESHEET, font_config=_font_config, url_fetcher=pdf_url_fetcher)]
+        return _stylesheets, _font_config
+
+
+def pdf_filename(proposal):
+    """Nome do arquivo usado no download do PDF."""
+    return f'proposta_{proposal.client.name.replace(" ", "_")}.pdf'
+
+
+def chart_backend():
+    """
+    Escolhe quem desenha os gráficos, conforme CHART_BACKEND:
+    'matplotlib' (PNG ou SVG, conforme CHART_IMAGE_FORMAT) ou 'svg' (desenho próprio, sem matplotlib).
+    Retorna (módulo com as funções, argumentos extras, tipo MIME da imagem).
+    """
+    if current_app.config['CHART_BACKEND'] == 'svg':
+        return charts_svg, {}, 'image/svg+xml'
+    image_format = current_app.config['CHART_IMAGE_FORMAT']
+    mime = 'image/svg+xml' if image_format == 'svg' else 'image/png'
+    return utils, {'image_format': image_format}, mime
+
+
+def render_proposal_pdf(proposal):
+    """
+    Gera os gráficos, monta o HTML e renderiza o PDF da proposta. Retorna (bytes do PDF, completo):
+    completo é False quando algum gráfico ficou de fora porque o pool demorou demais.
+    """
+    charts, chart_options, chart_mime = chart_backend()
+
+    # Faturas, VPL, TIR e o extrato por ano já estão gravados (ver app/metrics.py)
+    metrics = get_metrics(proposal)
+
+    steps = {
+        'monthly_chart': (charts.generate_monthly_production_chart, (proposal.monthly_production_kwh,), chart_options),
+        'payback_chart': (charts.generate_payback_chart, (proposal.total_investment, proposal.estimated_savings_per_year), chart_options),
+        'cumulative_cost_chart': (charts.generate_cumulative_cost_chart, (proposal.total_investment, metrics.annual_bill_without_solar, metrics.annual_bill_with_solar), chart_options),
+        'risk': (calculate_risk_profile, (proposal.total_investment, proposal.estimated_savings_per_year), risk_profile_options(proposal)),
+    }
+    if charts is utils:
+        # Gráficos do matplotlib e cálculos em paralelo, no pool de processos (ver app/chart_pool.py)
+        results, timed_out = run_in_parallel(steps)
+    else:
+        # O SVG próprio leva menos de 1 ms: não compensa mandar para outro processo
+        results, timed_out = {name: fn(*args, **kwargs) for name, (fn, args, kwargs) in steps.items()}, []
+
+    html_renderizado = render_template(
+        'pdf/proposal_template.html',
+        proposal=proposal,
+        monthly_chart_b64=results['monthly_chart'],
+        payback_chart_b64=results['payback_chart'],
+        cumulative_cost_chart_b64=results['cumulative_cost_chart'],
+        chart_mime=chart_mime,
+        financials=metrics.financials(),
+        risk=results['risk'],
+        old_annual_bill=metrics.old_annual_bill,
+        new_annual_bill=metrics.new_annual_bill
+    )
+
+    # Fontes, ícones e a capa vêm do repositório local (ver app/pdf_assets.py)
+    stylesheets, font_config = get_pdf_stylesheets()
+    pdf = HTML(string=html_renderizado, url_fetcher=pdf_url_fetcher).write_pdf(
+        stylesheets=stylesheets, font_config=font_config, **pdf_render_options())
+
+    check_size_budget(pdf, proposal)
+    return pdf, not timed_out
+
+
+def get_or_render_pdf(proposal, cache_key=None):
+    """
+    Devolve (chave, caminho) do PDF da proposta, usando o cache em disco.
+    Só renderiza quando a proposta mudou desde a última geração.
+    Um PDF incompleto (gráfico fora por demora do pool) é gravado com outra chave, que também
+    serve de ETag: a chave de verdade continua vazia e o próximo pedido renderiza de novo.
+    """
+    cache = get_pdf_cache()
+    cache_key = cache_key or proposal_cache_key(proposal)
+    path = cache.get(cache_key)
+    if path is None:
+        pdf, complete = render_proposal_pdf(proposal)
+        if not complete:
+            cache_key = f'{cache_key}-partial'
+        path = cache.put(cache_key, pdf)
+    return cache_key, path
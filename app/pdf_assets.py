@@ -0,0 +1,164 @@
+# app/pdf_assets.py
+
+"""
+Arquivos externos usados pelo PDF (ícones, fontes e a foto da capa).
+
+O template do PDF aponta para o Font Awesome (cdnjs), a fonte Inter (Google Fonts)
+e a foto da capa (Pexels). Em vez de o WeasyPrint baixar tudo a cada PDF, esses
+arquivos ficam num repositório local versionado, preenchido uma única vez pelo
+comando `flask fetch-pdf-assets`. Qualquer outra URL passa por um cache em disco
+com validade (PDF_ASSET_CACHE_TTL). Com o repositório preenchido, o PDF é gerado
+sem acesso à rede.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from urllib.parse import urljoin
+
+import requests
+from flask import current_app
+from weasyprint import default_url_fetcher
+
+from app.pdf_optimize import optimize_fetched_image
+
+# URLs usadas diretamente pelo template do PDF. As URLs que elas referenciam
+# (arquivos de fonte dentro dos CSS) são baixadas automaticamente.
+PDF_ASSET_URLS = [
+    'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.5.1/css/all.min.css',
+    'https://fonts.googleapis.com/css2?family=Inter:wght@400;500;700&display=swap',
+    'https://images.pexels.com/photos/9893727/pexels-photo-9893727.jpeg',
+]
+
+# O Google Fonts escolhe o formato da fonte pelo navegador: pedimos como um navegador moderno
+USER_AGENT = ('Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/124.0 Safari/537.36')
+
+CSS_URL_RE = re.compile(r'url\(\s*[\'"]?([^\'")]+)[\'"]?\s*\)')
+
+
+def _url_digest(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def _atomic_write(path, data, mode='wb'):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, mode) as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+# --- REPOSITÓRIO LOCAL (VERSIONADO) ---
+
+def asset_store_dir(config=None):
+    config = config or current_app.config
+    return os.path.join(config['PDF_ASSET_DIR'], config['PDF_ASSET_VERSION'])
+
+
+_manifests = {} # store_dir -> (mtime do manifesto, manifesto)
+
+
+def _load_manifest(store_dir):
+    """
+    Manifesto do repositório (URL -> arquivo local). Fica na memória do processo e só é
+    relido quando o arquivo muda, como depois de `flask fetch-pdf-assets` com o servidor no ar.
+    """
+    path = os.path.join(store_dir, 'manifest.json')
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {} # Repositório ainda não preenchido: a falta não é guardada
+    cached = _manifests.get(store_dir)
+    if cached is None or cached[0] != mtime:
+        with open(path) as f:
+            cached = _manifests[store_dir] = (mtime, json.load(f))
+    return cached[1]
+
+
+def populate_asset_store(session=None, log=print):
+    """
+    Baixa as URLs do PDF (e os arquivos que os CSS referenciam) para o repositório local.
+    Retorna o número de arquivos gravados.
+    """
+    session = session or requests.Session()
+    session.headers['User-Agent'] = USER_AGENT
+    store_dir = asset_store_dir()
+    os.makedirs(store_dir, exist_ok=True)
+
+    manifest = {}
+    queue = list(PDF_ASSET_URLS)
+    while queue:
+        url = queue.pop(0)
+        if url in manifest or url.startswith('data:'):
+            continue
+
+        response = session.get(url, timeout=30)
+        response.raise_for_status()
+        mime_type = response.headers.get('Content-Type', 'application/octet-stream').split(';')[0].strip()
+
+        filename = _url_digest(url)
+        _atomic_write(os.path.join(store_dir, filename), response.content)
+        manifest[url] = {'file': filename, 'mime_type': mime_type, 'size': len(response.content)}
+        log(f'  {len(response.content) / 1024:8.1f} KB  {url}')
+
+        if mime_type == 'text/css':
+            for ref in CSS_URL_RE.findall(response.text):
+                queue.append(urljoin(url, ref.strip()))
+
+    _atomic_write(os.path.join(store_dir, 'manifest.json'), json.dumps(manifest, indent=2), mode='w')
+    _manifests.pop(store_dir, None)
+    return len(manifest)
+
+
+# --- CACHE EM DISCO PARA AS DEMAIS URLs ---
+
+def _fetch_with_disk_cache(url, timeout, ssl_context):
+    config = current_app.config
+    cache_dir = config['PDF_ASSET_CACHE_DIR']
+    os.makedirs(cache_dir, exist_ok=True)
+    data_path = os.path.join(cache_dir, _url_digest(url))
+    meta_path = data_path + '.json'
+
+    meta = None
+    if os.path.exists(meta_path) and os.path.exists(data_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if time.time() - meta['fetched_at'] < config['PDF_ASSET_CACHE_TTL']:
+            with open(data_path, 'rb') as f:
+                return {'string': f.read(), 'mime_type': meta['mime_type'], 'redirected_url': url}
+
+    try:
+        result = default_url_fetcher(url, timeout=timeout, ssl_context=ssl_context)
+    except Exception:
+        if meta is None:
+            raise
+        # Sem rede: uma cópia vencida é melhor que nenhuma
+        with open(data_path, 'rb') as f:
+            return {'string': f.read(), 'mime_type': meta['mime_type'], 'redirected_url': url}
+
+    data = result['string'] if 'string' in result else result['file_obj'].read()
+    if 'file_obj' in result:
+        result['file_obj'].close()
+    mime_type = result.get('mime_type') or 'application/octet-stream'
+    _atomic_write(data_path, data)
+    _atomic_write(meta_path, json.dumps({'url': url, 'mime_type': mime_type, 'fetched_at': time.time()}), mode='w')
+    return {'string': data, 'mime_type': mime_type, 'redirected_url': result.get('redirected_url', url)}
+
+
+def pdf_url_fetcher(url, timeout=10, ssl_context=None, **kwargs):
+    """url_fetcher do WeasyPrint: repositório local primeiro, depois cache em disco, depois a rede."""
+    store_dir = asset_store_dir()
+    entry = _load_manifest(store_dir).get(url)
+    if entry is not None:
+        with open(os.path.join(store_dir, entry['file']), 'rb') as f:
+            result = {'string': f.read(), 'mime_type': entry['mime_type'], 'redirected_url': url}
+    elif url.startswith(('http://', 'https://')):
+        result = _fetch_with_disk_cache(url, timeout, ssl_context)
+    else:
+        result = default_url_fetcher(url, timeout=timeout, ssl_context=ssl_context, **kwargs)
+
+    # Fotos e gráficos são reduzidos para a resolução do PDF (ver app/pdf_optimize.py)
+    return optimize_fetched_image(url, result)
@@ -0,0 +1,184 @@
+# app/pdf_cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import event
+
+from app import db
+from app.models import Proposal, ProposalItem
+from app.metrics import CALCULATION_VERSION
+
+# Aumente este número sempre que a lógica de geração do PDF mudar
+# de um jeito que não apareça no template (ex: cores dos gráficos).
+PDF_TEMPLATE_VERSION = '2'
+
+# Configurações que mudam o PDF gerado (entram na chave do cache)
+RENDER_CONFIG_KEYS = [
+    'CHART_BACKEND', 'CHART_IMAGE_FORMAT', 'PDF_ASSET_VERSION',
+    'PDF_IMAGE_DPI', 'PDF_JPEG_QUALITY', 'PDF_OPTIMIZE_IMAGES',
+    'MONTE_CARLO_SCENARIOS',
+]
+
+TEMPLATE_FILES = [
+    os.path.join(os.path.dirname(__file__), 'templates', 'pdf', 'proposal_template.html'),
+    os.path.join(os.path.dirname(__file__), 'static', 'css', 'pdf_proposal.css'),
+]
+
+
+def _row_to_dict(obj):
+    """Converte uma linha do banco em dicionário (somente as colunas)."""
+    if obj is None:
+        return None
+    return {column.key: getattr(obj, column.key) for column in obj.__table__.columns}
+
+
+def _template_digest():
+    """Hash do conteúdo dos templates do PDF, para invalidar o cache quando eles mudam."""
+    digest = hashlib.sha256(PDF_TEMPLATE_VERSION.encode())
+    for path in TEMPLATE_FILES:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def proposal_render_inputs(proposal):
+    """Reúne tudo o que influencia o PDF de uma proposta."""
+    items = proposal.items.order_by(ProposalItem.id).all()
+    return {
+        'template': _template_digest(),
+        'calculation': CALCULATION_VERSION,
+        'config': {key: current_app.config.get(key) for key in RENDER_CONFIG_KEYS},
+        'proposal': _row_to_dict(proposal),
+        'items': [dict(_row_to_dict(item), product=_row_to_dict(item.product)) for item in items],
+        'concessionaria': _row_to_dict(proposal.concessionaria),
+        'client': _row_to_dict(proposal.client),
+        'author': {'username': proposal.author.username, 'email': proposal.author.email} if proposal.author else None,
+    }
+
+
+def proposal_cache_key(proposal):
+    """
+    Chave do cache: id da proposta + hash de todos os dados que entram no PDF.
+    Qualquer alteração na proposta gera uma chave nova automaticamente.
+    """
+    payload = json.dumps(proposal_render_inputs(proposal), sort_keys=True, default=str)
+    digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    return f'{proposal.id}-{digest}'
+
+
+class PdfCache:
+    """Cache em disco dos PDFs gerados, com limite de tamanho total (remove os menos usados)."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f'{key}.pdf')
+
+    def get(self, key):
+        """Retorna o caminho do PDF em cache, ou None se não existir."""
+        path = self.path_for(key)
+        try:
+            # Atualiza a data de modificação para a política de remoção (LRU)
+            os.utime(path, None)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, data):
+        """Grava o PDF de forma atômica e aplica o limite de tamanho."""
+        path = self.path_for(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+        return path
+
+    def invalidate(self, proposal_id):
+        """Remove todas as versões em cache do PDF de uma proposta."""
+        prefix = f'{proposal_id}-'
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name.endswith('.pdf'):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def evict(self):
+        """Remove os arquivos usados há mais tempo até o cache caber no limite."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.pdf'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def get_pdf_cache():
+    """Retorna o cache de PDFs da aplicação atual (criado na primeira chamada)."""
+    cache = current_app.extensions.get('pdf_cache')
+    if cache is None:
+        cache = PdfCache(current_app.config['PDF_CACHE_DIR'], current_app.config['PDF_CACHE_MAX_BYTES'])
+        current_app.extensions['pdf_cache'] = cache
+    return cache
+
+
+# --- INVALIDAÇÃO AUTOMÁTICA ---
+# Qualquer alteração em uma proposta ou nos seus itens apaga o PDF antigo do disco
+# assim que a transação é confirmada.
+
+@event.listens_for(db.session, 'before_flush')
+def _collect_changed_proposals(session, flush_context, instances):
+    changed = session.info.setdefault('pdf_cache_stale', set())
+    for obj in list(session.dirty) + list(session.deleted) + list(session.new):
+        if isinstance(obj, Proposal) and obj.id is not None:
+            changed.add(obj.id)
+        elif isinstance(obj, ProposalItem) and obj.proposal_id is not None:
+            changed.add(obj.proposal_id)
+            # Alterar um item também conta como alteração da proposta (Last-Modified do PDF)
+            proposal = session.get(Proposal, obj.proposal_id)
+            if proposal is not None:
+                proposal.last_modified = datetime.utcnow()
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_changed_proposals(session):
+    changed = session.info.pop('pdf_cache_stale', set())
+    if not changed:
+        return
+    cache = get_pdf_cache()
+    for proposal_id in changed:
+        cache.invalidate(proposal_id)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_changed_proposals(session):
+    session.info.pop('pdf_cache_stale', None)
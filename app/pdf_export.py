@@ -0,0 +1,117 @@
+# app/pdf_export.py
+
+"""
+Exportação em lote dos PDFs de propostas em um arquivo ZIP.
+
+Os PDFs são renderizados em paralelo no pool de processos da fila de PDFs e cada
+um é gravado no ZIP assim que fica pronto. O ZIP é gerado em streaming: os bytes
+saem para a resposta (ou para o arquivo, na linha de comando) pedaço por pedaço,
+então o uso de memória não depende da quantidade de propostas.
+"""
+
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from flask import current_app
+
+from app.models import Proposal
+from app.pdf import get_or_render_pdf
+from app.pdf_cache import get_pdf_cache
+from app.pdf_jobs import render_in_worker, submit
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _StreamBuffer:
+    """Arquivo 'somente escrita' para o zipfile: guarda os bytes até serem enviados."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def select_proposal_ids(client_id=None, start=None, end=None, status=None):
+    """Ids das propostas que entram na exportação, filtradas por cliente, período (data de criação) e status."""
+    query = Proposal.query.with_entities(Proposal.id)
+    if client_id:
+        query = query.filter(Proposal.client_id == client_id)
+    if start:
+        query = query.filter(Proposal.creation_date >= start)
+    if end:
+        query = query.filter(Proposal.creation_date < end)
+    if status:
+        query = query.filter(Proposal.status == status)
+    return [row.id for row in query.order_by(Proposal.id)]
+
+
+def _rendered_pdfs(proposal_ids):
+    """
+    Renderiza as propostas no pool, com no máximo alguns jobs em andamento por vez,
+    e devolve (id, chave do cache, nome do arquivo, erro) na ordem em que ficam prontas.
+    """
+    max_in_flight = max(1, current_app.config['PDF_WORKERS'] * 2)
+    pending = {}
+    remaining = iter(proposal_ids)
+
+    def fill():
+        for proposal_id in remaining:
+            pending[submit(render_in_worker, proposal_id)] = proposal_id
+            if len(pending) >= max_in_flight:
+                break
+
+    fill()
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            proposal_id = pending.pop(future)
+            try:
+                cache_key, filename = future.result()
+                yield proposal_id, cache_key, filename, None
+            except Exception as e:
+                yield proposal_id, None, None, str(e)
+        fill()
+
+
+def iter_proposals_zip(proposal_ids):
+    """Gera os bytes de um ZIP com os PDFs das propostas, em pedaços."""
+    cache = get_pdf_cache()
+    buffer = _StreamBuffer()
+    errors = []
+
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED) as zf:
+        for proposal_id, cache_key, filename, error in _rendered_pdfs(proposal_ids):
+            if error:
+                errors.append(f'Proposta {proposal_id}: {error}')
+                continue
+
+            pdf_path = cache.get(cache_key)
+            if pdf_path is None:
+                # O arquivo saiu do cache antes de ser lido: renderiza de novo aqui mesmo
+                _, pdf_path = get_or_render_pdf(Proposal.query.get(proposal_id))
+
+            with open(pdf_path, 'rb') as src, zf.open(f'{proposal_id}_{filename}', 'w') as dst:
+                while chunk := src.read(CHUNK_SIZE):
+                    dst.write(chunk)
+                    yield buffer.pop()
+            yield buffer.pop()
+
+        if errors:
+            zf.writestr('ERROS.txt', '\n'.join(errors))
+
+    yield buffer.pop()
@@ -0,0 +1,224 @@
+# app/pdf_jobs.py
+
+"""
+Fila local de geração de PDFs.
+
+A renderização roda num pool de processos, fora da thread da requisição. O id do
+job é a própria chave do cache de PDFs, então dois cliques na mesma proposta sem
+alterações compartilham uma única renderização. O estado de cada job fica num
+pequeno arquivo JSON, para que qualquer worker do gunicorn consiga consultá-lo.
+"""
+
+import json
+import multiprocessing
+import os
+import pickle
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+
+from app import db
+from app.models import Proposal
+from app.pdf_cache import get_pdf_cache, proposal_cache_key
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+JOB_ID_RE = re.compile(r'^\d+-[0-9a-f]{64}$')
+
+
+class QueueFullError(Exception):
+    """A fila de renderização atingiu o limite configurado."""
+
+
+# --- ESTADO DOS JOBS (ARQUIVOS JSON) ---
+
+def _state_path(jobs_dir, job_id):
+    return os.path.join(jobs_dir, f'{job_id}.json')
+
+
+def _write_state(jobs_dir, job_id, **fields):
+    state = read_job(job_id, jobs_dir) or {'id': job_id, 'created_at': time.time()}
+    state.update(fields, updated_at=time.time())
+    fd, tmp_path = tempfile.mkstemp(dir=jobs_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, _state_path(jobs_dir, job_id))
+    return state
+
+
+def _claim(jobs_dir, job_id, proposal_id):
+    """Cria o arquivo do job de forma atômica. Retorna False se outro processo já o criou."""
+    try:
+        fd = os.open(_state_path(jobs_dir, job_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    now = time.time()
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'id': job_id, 'proposal_id': proposal_id, 'status': QUEUED,
+                   'created_at': now, 'updated_at': now}, f)
+    return True
+
+
+def read_job(job_id, jobs_dir=None):
+    """Lê o estado de um job. Retorna None se o job não existir."""
+    if not JOB_ID_RE.match(job_id):
+        return None
+    jobs_dir = jobs_dir or current_app.config['PDF_JOBS_DIR']
+    try:
+        with open(_state_path(jobs_dir, job_id)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _prune_jobs(jobs_dir, ttl):
+    """Apaga arquivos de jobs antigos."""
+    limit = time.time() - ttl
+    for entry in os.scandir(jobs_dir):
+        try:
+            if entry.stat().st_mtime < limit:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+# --- POOL DE PROCESSOS ---
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+_worker_app = None
+
+
+def _picklable_config(app):
+    """Copia as configurações da aplicação que podem ser enviadas para outro processo."""
+    config = {}
+    for key, value in app.config.items():
+        if not key.isupper():
+            continue
+        try:
+            pickle.dumps(value)
+        except Exception:
+            continue
+        config[key] = value
+    return config
+
+
+def _init_worker(config):
+    """Executado uma vez em cada processo do pool: cria a aplicação Flask do worker."""
+    global _worker_app
+    from app import create_app
+    # Cada processo da fila já é um PDF em paralelo: os gráficos são desenhados nele mesmo
+    config = dict(config, CHART_WORKERS=0)
+    _worker_app = create_app(type('WorkerConfig', (), config))
+
+
+def render_in_worker(proposal_id):
+    """
+    Roda dentro do processo do pool: garante que o PDF da proposta está no cache.
+    Retorna (chave do cache, nome do arquivo para download).
+    """
+    from app.pdf import get_or_render_pdf, pdf_filename
+
+    with _worker_app.app_context():
+        try:
+            proposal = db.session.get(Proposal, proposal_id)
+            if proposal is None:
+                raise LookupError(f'Proposta {proposal_id} não encontrada.')
+            cache_key, _ = get_or_render_pdf(proposal)
+            return cache_key, pdf_filename(proposal)
+        finally:
+            db.session.remove()
+
+
+def _render_job(job_id, proposal_id):
+    """Roda dentro do processo do pool: executa um job da fila e atualiza o seu estado."""
+    jobs_dir = _worker_app.config['PDF_JOBS_DIR']
+    _write_state(jobs_dir, job_id, status=RUNNING)
+    try:
+        cache_key, _ = render_in_worker(proposal_id)
+        _write_state(jobs_dir, job_id, status=DONE, cache_key=cache_key)
+    except Exception as e:
+        _write_state(jobs_dir, job_id, status=FAILED, error=str(e))
+    return job_id
+
+
+def get_executor(app=None):
+    """Retorna o pool de processos deste worker (criado na primeira chamada)."""
+    global _executor
+    app = app or current_app._get_current_object()
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=app.config['PDF_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(_picklable_config(app),),
+            )
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def submit(fn, *args):
+    """Envia uma tarefa para o pool, recriando-o se algum processo tiver morrido."""
+    try:
+        return get_executor().submit(fn, *args)
+    except BrokenProcessPool:
+        # Um processo do pool morreu: recria o pool e tenta de novo uma vez
+        _reset_executor()
+        return get_executor().submit(fn, *args)
+
+
+# --- API PÚBLICA ---
+
+def _is_active(state, timeout):
+    """Job na fila ou rodando, e atualizado há menos de `timeout` segundos."""
+    return bool(state) and state['status'] in (QUEUED, RUNNING) and \
+        time.time() - state['updated_at'] <= timeout
+
+
+def enqueue_pdf(proposal):
+    """
+    Coloca a renderização do PDF da proposta na fila e retorna o estado do job.
+    Se o PDF já estiver no cache ou o mesmo job já estiver na fila, nada é renderizado de novo.
+    """
+    config = current_app.config
+    jobs_dir = config['PDF_JOBS_DIR']
+    os.makedirs(jobs_dir, exist_ok=True)
+    _prune_jobs(jobs_dir, config['PDF_JOB_TTL'])
+
+    job_id = proposal_cache_key(proposal)
+    if get_pdf_cache().get(job_id) is not None:
+        return _write_state(jobs_dir, job_id, proposal_id=proposal.id, status=DONE, cache_key=job_id)
+
+    # Mesmo job já na fila ou rodando (neste ou em outro worker): compartilha a renderização
+    state = read_job(job_id, jobs_dir)
+    if _is_active(state, config['PDF_JOB_TIMEOUT']):
+        return state
+
+    if len(_pending) >= config['PDF_QUEUE_MAX']:
+        raise QueueFullError('A fila de geração de PDFs está cheia. Tente novamente em instantes.')
+
+    if not _claim(jobs_dir, job_id, proposal.id):
+        state = read_job(job_id, jobs_dir)
+        if _is_active(state, config['PDF_JOB_TIMEOUT']):
+            return state
+        # Job antigo que falhou, travou ou cujo PDF já saiu do cache: roda de novo
+        _write_state(jobs_dir, job_id, proposal_id=proposal.id, status=QUEUED, error=None)
+
+    future = submit(_render_job, job_id, proposal.id)
+    _pending.add(future)
+    future.add_done_callback(_pending.discard)
+    return read_job(job_id, jobs_dir)
@@ -0,0 +1,103 @@
+# app/pdf_optimize.py
+
+"""
+Redução do tamanho dos PDFs gerados.
+
+- Imagens: reduzidas para a resolução alvo (PDF_IMAGE_DPI) considerando a largura
+  de uma folha A4 e recomprimidas (JPEG com PDF_JPEG_QUALITY, PNG otimizado)
+  antes de chegar ao WeasyPrint.
+- O WeasyPrint ainda recebe as próprias opções de otimização de imagem
+  (optimize_images, jpeg_quality e dpi).
+- PDFs acima de PDF_SIZE_BUDGET_BYTES geram um aviso no log.
+"""
+
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+from PIL import Image
+
+A4_WIDTH_INCHES = 210 / 25.4
+
+RASTER_TYPES = {'image/jpeg': 'JPEG', 'image/png': 'PNG'}
+
+_optimized = OrderedDict()
+_optimized_lock = threading.Lock()
+_MAX_MEMO = 64
+
+
+def pdf_render_options():
+    """Opções de tamanho passadas ao write_pdf do WeasyPrint."""
+    config = current_app.config
+    return {
+        'optimize_images': config['PDF_OPTIMIZE_IMAGES'],
+        'jpeg_quality': config['PDF_JPEG_QUALITY'],
+        'dpi': config['PDF_IMAGE_DPI'],
+    }
+
+
+def optimize_image(data, mime_type, dpi, jpeg_quality):
+    """
+    Reduz a imagem para no máximo a largura de uma página A4 na resolução `dpi`
+    e recomprime. Retorna os bytes originais se o resultado não ficar menor.
+    """
+    image_format = RASTER_TYPES.get(mime_type)
+    if image_format is None:
+        return data
+
+    image = Image.open(io.BytesIO(data))
+    max_width = int(A4_WIDTH_INCHES * dpi)
+    if image.width > max_width:
+        height = round(image.height * max_width / image.width)
+        image = image.resize((max_width, height), Image.LANCZOS)
+
+    buf = io.BytesIO()
+    if image_format == 'JPEG':
+        image.convert('RGB').save(buf, format='JPEG', quality=jpeg_quality, optimize=True, progressive=True)
+    else:
+        image.save(buf, format='PNG', optimize=True)
+
+    optimized = buf.getvalue()
+    return optimized if len(optimized) < len(data) else data
+
+
+def optimize_fetched_image(url, result):
+    """
+    Aplica optimize_image ao resultado de um url_fetcher do WeasyPrint.
+    O resultado fica guardado em memória, já que a mesma capa e os mesmos gráficos se repetem.
+    """
+    if result.get('mime_type') not in RASTER_TYPES:
+        return result
+    if 'file_obj' in result:
+        # Ex: gráficos em data: URL, que o WeasyPrint entrega como arquivo
+        with result.pop('file_obj') as f:
+            result['string'] = f.read()
+
+    config = current_app.config
+    dpi, quality = config['PDF_IMAGE_DPI'], config['PDF_JPEG_QUALITY']
+    key = (hashlib.sha256(url.encode('utf-8')).hexdigest(), dpi, quality)
+
+    with _optimized_lock:
+        data = _optimized.get(key)
+        if data is not None:
+            _optimized.move_to_end(key)
+    if data is None:
+        data = optimize_image(result['string'], result['mime_type'], dpi, quality)
+        with _optimized_lock:
+            _optimized[key] = data
+            while len(_optimized) > _MAX_MEMO:
+                _optimized.popitem(last=False)
+
+    return dict(result, string=data)
+
+
+def check_size_budget(pdf, proposal):
+    """Registra um aviso no log quando o PDF passa do tamanho máximo configurado."""
+    budget = current_app.config['PDF_SIZE_BUDGET_BYTES']
+    if budget and len(pdf) > budget:
+        current_app.logger.warning(
+            'PDF da proposta %s tem %.0f KB, acima do limite de %.0f KB.',
+            proposal.id, len(pdf) / 1024, budget / 1024
+        )
@@ -0,0 +1,136 @@
+# app/prefetch.py
+
+"""
+Busca antecipada de coordenadas e irradiação para todos os clientes (`flask prefetch-irradiance`).
+
+Em duas etapas, cada uma com um pool de threads que só faz as chamadas de rede
+(as gravações no banco ficam na thread principal):
+1. geocodifica os clientes sem coordenadas: primeiro pelo índice local de CEPs
+   (app/cep_geocoder.py), depois pelo cache de endereços (app/geocoding.py) e,
+   para o que sobrar, uma consulta ao Nominatim por endereço normalizado distinto.
+   Endereços que o Nominatim não encontra ficam marcados nos clientes
+   (geocode_failed_at) e só voltam a ser consultados depois de GEOCODE_RETRY_DAYS;
+2. baixa a irradiação de cada célula da grade da NASA (app/irradiance.py) que
+   tem clientes e ainda não tem dados válidos: vários clientes na mesma célula
+   geram uma consulta só. Células cobertas pela grade pré-calculada
+   (app/irradiance_grid.py) não precisam da NASA e ficam de fora.
+
+Os limites de cada provedor (1 requisição/s no Nominatim, requisições simultâneas
+na NASA) ficam em app/providers.py e valem para todas as threads. Tudo é gravado
+aos poucos, então o comando pode ser interrompido e rodado de novo: ele continua
+de onde parou. Se o disjuntor de um provedor abrir, a etapa é encerrada.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from app import db
+from app.cep_geocoder import open_index
+from app.geocoding import cached_geocodes, client_address, nominatim_lookup, normalize_address, retry_cutoff, store_geocode
+from app.irradiance import cell_center, cell_of, fetch_nasa_irradiance, fresh_cells, save_cell, NoIrradianceData
+from app.irradiance_grid import open_grid
+from app.models import Client
+from app.providers import ProviderUnavailable
+
+COMMIT_EVERY = 10 # Resultados gravados por commit (e a cada quantos o progresso aparece)
+
+
+def _run_pool(tasks, fetch, store, workers, stage):
+    """
+    Executa `fetch(argumento)` em threads para cada (chave, argumento) de `tasks` e grava cada
+    resultado com `store(chave, resultado)` na thread principal. Gera o progresso da etapa.
+    """
+    progress = {'stage': stage, 'total': len(tasks), 'done': 0, 'failed': 0, 'aborted': None}
+    if not tasks:
+        yield progress
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch, argument): key for key, argument in tasks}
+        for future in as_completed(futures):
+            try:
+                store(futures[future], future.result())
+                progress['done'] += 1
+            except ProviderUnavailable as e:
+                progress['aborted'] = str(e)
+                for pending in futures:
+                    pending.cancel()
+                break
+            except Exception:
+                progress['failed'] += 1
+            if (progress['done'] + progress['failed']) % COMMIT_EVERY == 0:
+                db.session.commit()
+                yield progress
+    db.session.commit()
+    yield progress
+
+
+def _geocode_stage(workers, cep_index_path=None, retry_days=30):
+    clients = Client.query.filter(Client.latitude.is_(None)).all()
+    cutoff = retry_cutoff(retry_days)
+
+    def locate(clients_at, coordinates):
+        now = datetime.utcnow()
+        for client in clients_at:
+            client.latitude, client.longitude = coordinates
+            client.geocoded_at = now
+            client.geocode_failed_at = None
+
+    # Índice de CEPs: local, sem rede
+    cep_index = open_index(cep_index_path)
+    by_key = {}
+    for client in clients:
+        coordinates = cep_index.lookup(client.cep) if cep_index is not None else None
+        if coordinates is not None:
+            locate([client], coordinates)
+        elif client.geocode_failed_at and client.geocode_failed_at > cutoff:
+            continue # Não encontrado há pouco: não vale outra consulta
+        elif client.address and client.city and client.state:
+            by_key.setdefault(normalize_address(client_address(client)), []).append(client)
+
+    # Endereços já no cache não vão para a rede
+    for key, coordinates in cached_geocodes([client_address(c[0]) for c in by_key.values()]).items():
+        locate(by_key.pop(key), coordinates)
+    db.session.commit()
+
+    def store(key, coordinates):
+        if coordinates is None:
+            # Endereço não encontrado: fica gravado para não ser consultado a cada execução
+            now = datetime.utcnow()
+            for client in by_key[key]:
+                client.geocode_failed_at = now
+            raise LookupError(key) # E conta como falha
+        store_geocode(client_address(by_key[key][0]), *coordinates)
+        locate(by_key[key], coordinates)
+
+    tasks = [(key, client_address(clients_at[0])) for key, clients_at in by_key.items()]
+    yield from _run_pool(tasks, nominatim_lookup, store, workers, 'geocoding')
+
+
+def _irradiance_stage(workers, ttl_days, grid_path=None):
+    rows = db.session.query(Client.latitude, Client.longitude).filter(Client.latitude.isnot(None)).all()
+    cells = {cell_of(row.latitude, row.longitude) for row in rows}
+    missing = cells - fresh_cells(cells, ttl_days)
+    grid = open_grid(grid_path)
+    if grid is not None:
+        missing = {cell for cell in missing if grid.lookup(*cell_center(*cell)) is None}
+
+    def fetch(cell):
+        # O centro da célula é o próprio ponto da grade da NASA
+        try:
+            return fetch_nasa_irradiance(*cell_center(*cell))
+        except NoIrradianceData:
+            return None
+
+    def store(cell, result):
+        if result is None:
+            raise LookupError(cell) # Sem dados válidos na NASA: conta como falha
+        save_cell(cell, *result)
+
+    yield from _run_pool([(cell, cell) for cell in sorted(missing)], fetch, store, workers, 'irradiance')
+
+
+def prefetch_irradiance(workers=4, ttl_days=180, grid_path=None, cep_index_path=None, retry_days=30):
+    """Gera o progresso (dicionário com stage, total, done, failed e aborted) das duas etapas."""
+    yield from _geocode_stage(workers, cep_index_path, retry_days)
+    yield from _irradiance_stage(workers, ttl_days, grid_path)
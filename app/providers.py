@@ -0,0 +1,241 @@
+# app/providers.py
+
+"""
+Cliente HTTP compartilhado para os provedores de dados externos (NASA POWER, Nominatim, BrasilAPI).
+
+Cada provedor tem:
+- uma sessão do requests com pool de conexões, criada no primeiro uso em cada
+  processo (o gunicorn cria os workers com fork), reaproveitando a conexão TLS;
+- limite de uso: intervalo mínimo entre requisições (o Nominatim aceita uma por
+  segundo) e máximo de requisições simultâneas, valendo para todas as threads;
+- tentativas limitadas para falhas de rede, 429 e 5xx, com espera exponencial
+  e jitter ("full jitter") e um prazo total por chamada (o timeout de cada
+  tentativa nunca passa do que resta do prazo);
+- um disjuntor (circuit breaker): depois de `breaker_failures` falhas seguidas,
+  as chamadas falham na hora com ProviderUnavailable durante `breaker_reset`
+  segundos; depois disso uma chamada de teste decide se ele fecha de novo;
+- métricas de latência e erros, em `provider_stats()`.
+
+ProviderUnavailable herda de requests.RequestException, então quem já trata
+erros de rede do requests continua funcionando.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+LATENCY_SAMPLES = 200 # Últimas chamadas usadas nos percentis de latência
+
+
+def _cap_timeout(timeout, remaining):
+    """Timeout de uma tentativa, sem passar do que resta do prazo total (conexão e leitura)."""
+    remaining = max(remaining, 0.1)
+    if timeout is None:
+        return remaining
+    if isinstance(timeout, tuple):
+        return tuple(min(t, remaining) for t in timeout)
+    return min(timeout, remaining)
+
+
+class ProviderUnavailable(requests.exceptions.RequestException):
+    """O disjuntor do provedor está aberto: ele falhou seguidamente há pouco."""
+
+
+class CircuitBreaker:
+    """Disjuntor com três estados: fechado (normal), aberto (falha na hora) e meio-aberto (uma chamada de teste)."""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True se a chamada pode seguir. No estado meio-aberto só uma chamada passa."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def retry_in(self):
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class RateLimiter:
+    """Intervalo mínimo entre o início das requisições e máximo de requisições ao mesmo tempo."""
+
+    def __init__(self, min_interval=0.0, max_concurrency=None):
+        self.min_interval = min_interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+
+    def __enter__(self):
+        if self._semaphore:
+            self._semaphore.acquire()
+        if self.min_interval:
+            # Cada chamada reserva o próximo horário livre e espera por ele fora do lock
+            with self._lock:
+                now = time.monotonic()
+                slot = max(self._next_slot, now)
+                self._next_slot = slot + self.min_interval
+            if slot > now:
+                time.sleep(slot - now)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._semaphore:
+            self._semaphore.release()
+
+
+class Provider:
+    """Um provedor externo: sessão com pool, limite de uso, tentativas com jitter, disjuntor e métricas."""
+
+    def __init__(self, name, timeout=(3.05, 15), retries=2, backoff=0.5, max_backoff=4.0, deadline=20.0,
+                 breaker_failures=5, breaker_reset=30.0, pool_size=10, headers=None,
+                 min_interval=0.0, max_concurrency=None):
+        self.name = name
+        self.timeout = timeout # (conexão, leitura) em segundos, por tentativa
+        self.retries = retries # Tentativas extras, além da primeira
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline # Tempo máximo somando todas as tentativas
+        self.pool_size = pool_size
+        self.headers = headers or {}
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset)
+        self.limiter = RateLimiter(min_interval, max_concurrency)
+        self._session = None
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.counters = {'requests': 0, 'successes': 0, 'failures': 0, 'retries': 0, 'short_circuited': 0}
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    session.headers.update(self.headers)
+                    self._session = session
+        return self._session
+
+    def _count(self, name, latency=None):
+        with self._lock:
+            self.counters[name] += 1
+            if latency is not None:
+                self._latencies.append(latency)
+
+    def _sleep_before_retry(self, attempt, started, response=None):
+        """Espera antes da próxima tentativa; False se ela estouraria o prazo total."""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        if time.monotonic() - started + delay >= self.deadline:
+            return False
+        time.sleep(delay)
+        return True
+
+    def get(self, url, **kwargs):
+        """
+        GET com as proteções do provedor. Retorna a resposta (status < 400) ou levanta a exceção
+        do requests da última tentativa, ou ProviderUnavailable se o disjuntor estiver aberto.
+        """
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            raise ProviderUnavailable(
+                f'{self.name} indisponível; nova tentativa em {self.breaker.retry_in():.0f}s.')
+
+        timeout = kwargs.pop('timeout', self.timeout)
+        started = time.monotonic()
+        attempt = 0
+        answered = False
+        try:
+            while True:
+                self._count('requests')
+                response = None
+                t0 = time.monotonic()
+                try:
+                    with self.limiter:
+                        t0 = time.monotonic() # A espera do limite não conta como latência
+                        remaining = self.deadline - (t0 - started)
+                        response = self.session.get(url, timeout=_cap_timeout(timeout, remaining), **kwargs)
+                    if response.status_code not in RETRY_STATUS:
+                        response.raise_for_status() # 4xx: erro nosso, não adianta repetir
+                        self._count('successes', time.monotonic() - t0)
+                        answered = True
+                        return response
+                    error = requests.exceptions.HTTPError(f'{response.status_code} de {self.name}', response=response)
+                except requests.exceptions.HTTPError:
+                    self._count('failures', time.monotonic() - t0)
+                    answered = True # O provedor respondeu; o erro é da requisição
+                    raise
+                except requests.exceptions.RequestException as e:
+                    error = e # Rede, timeout, resposta cortada (ChunkedEncodingError)...
+
+                self._count('failures', time.monotonic() - t0)
+                if attempt >= self.retries or not self._sleep_before_retry(attempt, started, response):
+                    raise error
+                attempt += 1
+                self._count('retries')
+        finally:
+            # Qualquer saída sem resposta do provedor conta como falha, inclusive a chamada de teste
+            # do estado meio-aberto: assim o disjuntor nunca fica preso nesse estado.
+            if answered:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counters = dict(self.counters)
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else None
+
+        return {
+            **counters,
+            'breaker': self.breaker.state,
+            'latency_ms': {'p50': percentile(0.5), 'p95': percentile(0.95), 'max': percentile(1.0)},
+        }
+
+
+nasa_power = Provider('NASA POWER', timeout=(3.05, 15), retries=2, max_concurrency=4)
+nominatim = Provider('Nominatim', timeout=(3.05, 10), retries=1, headers={'User-Agent': 'solucao_solar_app_v1'},
+                     min_interval=1.0, max_concurrency=1) # Política de uso: no máximo 1 requisição por segundo
+brasilapi = Provider('BrasilAPI', timeout=(3.05, 8), retries=1, max_concurrency=8)
+
+PROVIDERS = {'nasa_power': nasa_power, 'nominatim': nominatim, 'brasilapi': brasilapi}
+
+
+def provider_stats():
+    """Latência, erros e estado do disjuntor de cada provedor, desde que o processo subiu."""
+    return {key: provider.stats() for key, provider in PROVIDERS.items()}
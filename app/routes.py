@@ -1,16 +1,24 @@
-from flask import render_template, flash, redirect, url_for, request, Blueprint, Response, jsonify
+from flask import render_template, flash, redirect, url_for, request, Blueprint, Response, jsonify, stream_with_context, send_file, current_app
 from app.forms import LoginForm, ClientForm, ProposalForm, ProposalItemForm, ConcessionariaForm, ProductForm
 from app.models import User, Client, Proposal, ProposalItem, Concessionaria, Product
 from flask_login import current_user, login_user, logout_user, login_required
 
-from app.utils import generate_monthly_production_chart, generate_payback_chart, calculate_advanced_financials, generate_cumulative_cost_chart
+from app.pdf import get_or_render_pdf, pdf_filename
+from app.pdf_cache import get_pdf_cache, proposal_cache_key
+from app.pdf_jobs import enqueue_pdf, read_job, QueueFullError, DONE
+from app.pdf_export import select_proposal_ids, iter_proposals_zip
+from app.chart_cache import chart_cache_stats
+from app.utils import calculate_risk_profile, risk_profile_options
+from app.metrics import get_metrics
+from app.tariffs import recalculate_proposals
+from app.geocoding import locate_client, has_address, geocode_cache_stats
+from app.providers import provider_stats
+from app import sizing, optimizer, solar_sim, irradiance, lookups
 
 from urllib.parse import urlsplit  # <-- LINHA CORRIGIDA
 from datetime import datetime, timedelta
-from geopy.geocoders import Nominatim
-from weasyprint import HTML
 import requests
-import math
+import numpy as np
 from app import db
 
 bp = Blueprint('main', __name__)
@@ -19,55 +27,54 @@ bp = Blueprint('main', __name__)
 
 
 # --- FUNÇÃO HELPER PARA CÁLCULOS ---
-def calculate_proposal_details(form):
+def _to_float(value):
+    """Converte um valor do formulário ou do JSON em float (NaN se vazio ou inválido)."""
+    try:
+        return float(value) if value not in (None, '') else float('nan')
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def calculate_proposal_details(form, latitude=None):
     """
-    Centraliza todos os cálculos automáticos da proposta.
+    Calcula os campos automáticos da proposta a partir do formulário (ver app/sizing.py).
+    Com a latitude do cliente, a produção vem da simulação horária (app/solar_sim.py).
     Retorna um dicionário com os resultados.
     """
-    # 1. CALCULAR PRODUÇÃO MENSAL
-    performance_ratio = 0.80
-    seasonal_factors = [1.1, 1.1, 1.0, 1.0, 0.9, 0.85, 0.85, 0.9, 1.0, 1.1, 1.15, 1.15]
-    days_in_month = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-    monthly_prod_list = []
-    if form.system_power_kwp.data and form.solar_irradiance.data:
-        daily_avg_production = form.system_power_kwp.data * form.solar_irradiance.data * performance_ratio
-        for i in range(12):
-            monthly_production = daily_avg_production * days_in_month[i] * seasonal_factors[i]
-            monthly_prod_list.append(round(monthly_production, 2))
-
-    # 2. CALCULAR ECONOMIA ANUAL
-    annual_savings = 0
-    consumption_kwh = form.avg_consumption_kwh.data
-    if form.kwh_price.data and form.kwh_price.data > 0:
-        if form.consumption_input_type.data == 'brl' and form.avg_bill_brl.data:
-            bill_for_consumption = form.avg_bill_brl.data - (form.public_lighting_fee.data or 0)
-            consumption_kwh = bill_for_consumption / form.kwh_price.data if form.kwh_price.data > 0 else 0
-        
-        if consumption_kwh:
-            grid_cost_kwh = {'monofasica': 30, 'bifasica': 50, 'trifasica': 100}.get(form.grid_type.data, 50)
-            total_annual_production = sum(monthly_prod_list)
-            total_annual_consumption = consumption_kwh * 12
-            energia_a_ser_compensada = max(0, total_annual_production - (grid_cost_kwh * 12))
-            energia_injetada = max(0, total_annual_production - total_annual_consumption)
-            fio_b_price = form.concessionaria.data.fio_b_price if form.concessionaria.data else 0
-            custo_fio_b_anual = energia_injetada * fio_b_price
-            annual_savings = (energia_a_ser_compensada * form.kwh_price.data) - custo_fio_b_anual
-
-    # 3. CALCULAR QUANTIDADE DE PAINÉIS
-    panel_quantity = None
-    if form.system_power_kwp.data and form.panel_power_wp.data and form.panel_power_wp.data > 0:
-        panel_quantity = math.ceil(form.system_power_kwp.data / (form.panel_power_wp.data / 1000))
-
-    # 4. CALCULAR PAYBACK
-    payback_years = None
-    if form.total_investment.data and annual_savings > 0:
-        payback_years = form.total_investment.data / annual_savings
-
+    # Sem consumo (ou tarifa), a economia fica zerada em sizing.evaluate
+    consumption_kwh = _to_float(form.avg_consumption_kwh.data)
+    if form.consumption_input_type.data == 'brl' and form.avg_bill_brl.data:
+        consumption_kwh = sizing.consumption_from_bill(form.avg_bill_brl.data, _to_float(form.kwh_price.data), _to_float(form.public_lighting_fee.data))
+
+    # Quantidade de painéis e inversor escolhidos no formulário (cálculo ou otimizador) são salvos
+    # como vieram; a potência sai da quantidade, sem o arredondamento de 2 casas do campo oculto
+    panel_power_wp = _to_float(form.panel_power_wp.data)
+    panel_quantity = _to_float(form.panel_quantity.data)
+    inverter_kw = _to_float(form.recommended_inverter_kw.data)
+    system_power_kwp = _to_float(form.system_power_kwp.data)
+    if panel_quantity > 0 and panel_power_wp > 0:
+        system_power_kwp = round(panel_quantity) * panel_power_wp / 1000
+
+    result = sizing.to_python(sizing.evaluate(
+        irradiance=_to_float(form.solar_irradiance.data),
+        panel_power_wp=panel_power_wp,
+        consumption_kwh=consumption_kwh,
+        grid_type=form.grid_type.data,
+        kwh_price=_to_float(form.kwh_price.data),
+        fio_b_price=form.concessionaria.data.fio_b_price if form.concessionaria.data else 0,
+        total_investment=_to_float(form.total_investment.data),
+        system_power_kwp=system_power_kwp,
+        latitude=_to_float(latitude),
+    ))
+
+    has_production = result['annual_production_kwh'] is not None
     return {
-        'monthly_production_kwh': monthly_prod_list,
-        'estimated_savings_per_year': round(annual_savings, 2) if annual_savings > 0 else 0,
-        'panel_quantity': panel_quantity,
-        'payback_years': payback_years
+        'system_power_kwp': round(result['system_power_kwp'], 2) if result['system_power_kwp'] else None,
+        'panel_quantity': int(result['panel_quantity']) if result['panel_quantity'] else None,
+        'recommended_inverter_kw': inverter_kw if inverter_kw > 0 else result['recommended_inverter_kw'],
+        'monthly_production_kwh': result['monthly_production_kwh'] if has_production else [],
+        'estimated_savings_per_year': result['estimated_savings_per_year'] or 0,
+        'payback_years': result['payback_years']
     }
 
 
@@ -189,39 +196,11 @@ def delete_client(client_id):
 def add_proposal(client_id):
     client = Client.query.get_or_404(client_id)
     form = ProposalForm()
+    # Latitude do endereço, se o cliente já foi geocodificado; senão, a da capital do estado
+    client_latitude = client.latitude if client.latitude is not None else solar_sim.latitude_for_state(client.state)
     
     if form.validate_on_submit():
-        # --- LÓGICA DE CÁLCULO (sem alterações) ---
-        performance_ratio = 0.80
-        seasonal_factors = [1.1, 1.1, 1.0, 1.0, 0.9, 0.85, 0.85, 0.9, 1.0, 1.1, 1.15, 1.15]
-        days_in_month = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-        monthly_prod_list = []
-        if form.system_power_kwp.data and form.solar_irradiance.data:
-            daily_avg_production = float(form.system_power_kwp.data) * float(form.solar_irradiance.data) * performance_ratio
-            for i in range(12):
-                monthly_production = daily_avg_production * days_in_month[i] * seasonal_factors[i]
-                monthly_prod_list.append(round(monthly_production, 2))
-        
-        annual_savings = 0
-        consumption_kwh = form.avg_consumption_kwh.data or 0
-        if form.kwh_price.data and form.kwh_price.data > 0:
-            if form.consumption_input_type.data == 'brl' and form.avg_bill_brl.data:
-                bill_for_consumption = form.avg_bill_brl.data - (form.public_lighting_fee.data or 0)
-                consumption_kwh = bill_for_consumption / form.kwh_price.data if form.kwh_price.data > 0 else 0
-            
-            grid_cost_kwh = {'monofasica': 30, 'bifasica': 50, 'trifasica': 100}.get(form.grid_type.data, 50)
-            total_annual_production = sum(monthly_prod_list)
-            total_annual_consumption = consumption_kwh * 12
-            energia_a_ser_compensada = max(0, total_annual_production - (grid_cost_kwh * 12))
-            energia_injetada = max(0, total_annual_production - total_annual_consumption)
-            fio_b_price = form.concessionaria.data.fio_b_price if form.concessionaria.data else 0
-            custo_fio_b_anual = energia_injetada * fio_b_price
-            annual_savings = (energia_a_ser_compensada * form.kwh_price.data) - custo_fio_b_anual
-        
-        payback_years = None
-        if form.total_investment.data and annual_savings > 0:
-            payback_years = form.total_investment.data / annual_savings
-        # --- FIM DOS CÁLCULOS ---
+        details = calculate_proposal_details(form, client_latitude)
 
         new_proposal = Proposal(
             title=form.title.data,
@@ -241,14 +220,14 @@ def add_proposal(client_id):
             solar_irradiance=form.solar_irradiance.data or None,
             panel_power_wp=form.panel_power_wp.data or None,
             total_investment=form.total_investment.data or None,
-            system_power_kwp=form.system_power_kwp.data or None,
-            panel_quantity=form.panel_quantity.data or None,
-            recommended_inverter_kw=form.recommended_inverter_kw.data or None,
-            
-            # Dados calculados
-            monthly_production_kwh=monthly_prod_list,
-            estimated_savings_per_year=round(annual_savings, 2) if annual_savings > 0 else 0,
-            payback_years=payback_years
+
+            # Dados calculados (app/sizing.py)
+            system_power_kwp=details['system_power_kwp'],
+            panel_quantity=details['panel_quantity'],
+            recommended_inverter_kw=details['recommended_inverter_kw'],
+            monthly_production_kwh=details['monthly_production_kwh'],
+            estimated_savings_per_year=details['estimated_savings_per_year'],
+            payback_years=details['payback_years']
         )
 
         db.session.add(new_proposal)
@@ -257,7 +236,129 @@ def add_proposal(client_id):
         return redirect(url_for('main.proposal_detail', proposal_id=new_proposal.id))
     
     concessionaria_form = ConcessionariaForm()
-    return render_template('admin/proposal_form.html', title="Nova Proposta", form=form, client=client, concessionaria_form=concessionaria_form)
+    return render_template('admin/proposal_form.html', title="Nova Proposta", form=form, client=client,
+                           concessionaria_form=concessionaria_form, client_latitude=client_latitude)
+
+
+
+
+# --- DIMENSIONAMENTO EM LOTE (JSON) ---
+SIZING_FIELDS = ['solar_irradiance', 'panel_power_wp', 'avg_consumption_kwh', 'avg_bill_brl', 'public_lighting_fee',
+                 'kwh_price', 'total_investment', 'system_power_kwp', 'latitude']
+
+
+@bp.route('/admin/sizing', methods=['POST'])
+@login_required
+def sizing_batch():
+    """
+    Avalia várias configurações candidatas numa só chamada.
+    Corpo: {"defaults": {...}, "configurations": [{...}, ...]}, com os mesmos nomes
+    dos campos do formulário da proposta (mais concessionaria_id e latitude). Cada
+    configuração sobrescreve os valores de "defaults".
+    """
+    payload = request.get_json(silent=True) or {}
+    defaults = payload.get('defaults') or {}
+    configurations = payload.get('configurations', [{}]) # Sem a lista, avalia só "defaults"
+    if not isinstance(defaults, dict) or not isinstance(configurations, list) or not all(isinstance(c, dict) for c in configurations):
+        return jsonify({'success': False, 'error': 'Formato inválido: esperado {"defaults": {...}, "configurations": [...]}.'}), 400
+    if not configurations:
+        return jsonify({'success': False, 'error': 'Informe ao menos uma configuração.'}), 400
+    if len(configurations) > current_app.config['SIZING_MAX_CONFIGURATIONS']:
+        return jsonify({'success': False, 'error': f'Máximo de {current_app.config["SIZING_MAX_CONFIGURATIONS"]} configurações por chamada.'}), 400
+
+    rows = [dict(defaults, **configuration) for configuration in configurations]
+    columns = {field: np.array([_to_float(row.get(field)) for row in rows]) for field in SIZING_FIELDS}
+    grid_type = np.array([row.get('grid_type') or '' for row in rows])
+
+    # Consumo informado em kWh ou estimado pela fatura
+    by_bill = np.array([row.get('consumption_input_type') == 'brl' for row in rows])
+    consumption_kwh = np.where(
+        by_bill,
+        sizing.consumption_from_bill(columns['avg_bill_brl'], columns['kwh_price'], columns['public_lighting_fee']),
+        columns['avg_consumption_kwh'],
+    )
+
+    # Fio B das concessionárias citadas, numa única consulta
+    concessionaria_ids = [int(row['concessionaria_id']) if str(row.get('concessionaria_id') or '').isdigit() else None for row in rows]
+    fio_b_by_id = dict(
+        db.session.query(Concessionaria.id, Concessionaria.fio_b_price).filter(Concessionaria.id.in_(set(concessionaria_ids)))
+    )
+    fio_b_price = np.array([fio_b_by_id.get(concessionaria_id, 0) for concessionaria_id in concessionaria_ids], dtype=float)
+
+    result = sizing.to_python(sizing.evaluate(
+        irradiance=columns['solar_irradiance'],
+        panel_power_wp=columns['panel_power_wp'],
+        consumption_kwh=consumption_kwh,
+        grid_type=grid_type,
+        kwh_price=columns['kwh_price'],
+        fio_b_price=fio_b_price,
+        total_investment=columns['total_investment'],
+        system_power_kwp=columns['system_power_kwp'],
+        latitude=columns['latitude'],
+    ))
+
+    results = []
+    for i, row in enumerate(rows):
+        item = {key: values[i] for key, values in result.items()}
+        if item['panel_quantity'] is not None:
+            item['panel_quantity'] = int(item['panel_quantity'])
+        if item['annual_production_kwh'] is None:
+            item['error'] = 'Informe consumo, irradiação solar e potência do painel.'
+        item['panel_power_wp'] = row.get('panel_power_wp')
+        item['grid_type'] = row.get('grid_type')
+        item['consumption_kwh'] = sizing.to_python(consumption_kwh[i])
+        results.append(item)
+
+    return jsonify({'success': True, 'results': results})
+
+
+
+
+# --- OTIMIZADOR DE CONFIGURAÇÕES (CATÁLOGO) ---
+@bp.route('/admin/optimizer', methods=['POST'])
+@login_required
+def optimize_configuration():
+    """
+    Melhores combinações de módulo, quantidade e inversor do catálogo para um consumo.
+    Corpo: os mesmos campos de /admin/sizing, mais rank_by ('npv' ou 'cost_per_kwh') e top_n.
+    """
+    row = request.get_json(silent=True) or {}
+    rank_by = row.get('rank_by') or 'npv'
+    if rank_by not in optimizer.RANKINGS:
+        return jsonify({'success': False, 'error': 'rank_by deve ser "npv" ou "cost_per_kwh".'}), 400
+    try:
+        top_n = max(1, min(int(row.get('top_n') or current_app.config['OPTIMIZER_TOP_N']), 50))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'top_n deve ser um número inteiro.'}), 400
+
+    kwh_price = _to_float(row.get('kwh_price'))
+    consumption_kwh = _to_float(row.get('avg_consumption_kwh'))
+    if row.get('consumption_input_type') == 'brl':
+        consumption_kwh = float(sizing.consumption_from_bill(_to_float(row.get('avg_bill_brl')), kwh_price, _to_float(row.get('public_lighting_fee'))))
+    irradiance = _to_float(row.get('solar_irradiance'))
+    if not consumption_kwh > 0 or not irradiance > 0:
+        return jsonify({'success': False, 'error': 'Informe o consumo e a irradiação solar.'}), 400
+
+    concessionaria_id = row.get('concessionaria_id')
+    concessionaria = Concessionaria.query.get(int(concessionaria_id)) if str(concessionaria_id or '').isdigit() else None
+
+    catalog = Product.query.filter(Product.category.in_(['Módulo', 'Inversor']), Product.power_wp > 0, Product.price > 0).all()
+    modules = [{'id': p.id, 'name': p.name, 'power_wp': p.power_wp, 'price': p.price} for p in catalog if p.category == 'Módulo']
+    inverters = [{'id': p.id, 'name': p.name, 'power_w': p.power_wp, 'price': p.price} for p in catalog if p.category == 'Inversor']
+
+    results = optimizer.optimize(
+        consumption_kwh, irradiance, modules, inverters,
+        grid_type=row.get('grid_type') or 'bifasica',
+        kwh_price=kwh_price if kwh_price > 0 else 0,
+        fio_b_price=concessionaria.fio_b_price if concessionaria else 0,
+        bos_cost_per_kwp=current_app.config['OPTIMIZER_BOS_COST_PER_KWP'],
+        rank_by=rank_by,
+        top_n=top_n,
+        latitude=_to_float(row.get('latitude')),
+    )
+    if not results:
+        return jsonify({'success': False, 'error': 'Nenhuma combinação possível. Cadastre módulos e inversores com potência e preço no catálogo.'}), 404
+    return jsonify({'success': True, 'rank_by': rank_by, 'results': results})
 
 
 
@@ -285,6 +386,35 @@ def add_concessionaria():
 
 
 
+# --- RECÁLCULO EM MASSA APÓS MUDANÇA DE TARIFA ---
+@bp.route('/admin/concessionarias/<int:concessionaria_id>/recalculate', methods=['POST'])
+@login_required
+def recalculate_concessionaria(concessionaria_id):
+    """
+    Recalcula economia e payback de todas as propostas da concessionária (ver app/tariffs.py).
+    Corpo: {"fio_b_price": novo Fio B (opcional), "kwh_price": novo valor do kWh em R$ (opcional),
+    "dry_run": true para só ver as diferenças}.
+    """
+    Concessionaria.query.get_or_404(concessionaria_id)
+    payload = request.get_json(silent=True) or {}
+    try:
+        fio_b_price = float(payload['fio_b_price']) if payload.get('fio_b_price') not in (None, '') else None
+        kwh_price = float(payload['kwh_price']) if payload.get('kwh_price') not in (None, '') else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'fio_b_price e kwh_price devem ser números.'}), 400
+    if (fio_b_price is not None and fio_b_price < 0) or (kwh_price is not None and kwh_price <= 0):
+        return jsonify({'success': False, 'error': 'Valores de tarifa inválidos.'}), 400
+
+    report = None
+    for report in recalculate_proposals(
+        concessionaria_id=concessionaria_id, fio_b_price=fio_b_price, kwh_price=kwh_price,
+        chunk_size=current_app.config['TARIFF_RECALC_CHUNK_SIZE'], dry_run=bool(payload.get('dry_run')),
+    ):
+        pass
+    return jsonify({'success': True, **report})
+
+
+
 
 # --- ROTA ATUALIZADA ---
 @bp.route('/admin/proposal/<int:proposal_id>')
@@ -293,7 +423,9 @@ def proposal_detail(proposal_id):
     proposal = Proposal.query.get_or_404(proposal_id)
     # Passa a versão correta do item_form para o template
     item_form = ProposalItemForm()
-    return render_template('admin/proposal_detail.html', title=proposal.title, proposal=proposal, item_form=item_form)
+    risk = calculate_risk_profile(proposal.total_investment, proposal.estimated_savings_per_year, **risk_profile_options(proposal, interactive=True))
+    return render_template('admin/proposal_detail.html', title=proposal.title, proposal=proposal, item_form=item_form,
+                           risk=risk, metrics=get_metrics(proposal))
 
 
 
@@ -363,58 +495,27 @@ def delete_item(item_id):
 def get_irradiance(client_id):
     client = Client.query.get_or_404(client_id)
     
-    if not client.address or not client.city or not client.state:
+    if not has_address(client):
         return jsonify({'success': False, 'error': 'Endereço do cliente está incompleto. Por favor, preencha CEP, Cidade e Estado.'})
     
     try:
-        geolocator = Nominatim(user_agent="solucao_solar_app_v1")
-        address_string = f"{client.address}, {client.city}, {client.state}, Brazil"
-        
-        # Dica de depuração: veja o que está sendo enviado para a API
-        print(f"--- Geocodificando endereço: {address_string}")
-        
-        location = geolocator.geocode(address_string, timeout=10)
+        # Coordenadas do cliente, do índice de CEPs ou do cache; o Nominatim só é consultado em último caso
+        coordinates = locate_client(client)
         
-        if location is None:
+        if coordinates is None:
             return jsonify({'success': False, 'error': 'Endereço não encontrado. Tente ser mais específico no cadastro do cliente.'})
         
-        lat, lon = location.latitude, location.longitude
-        print(f"--- Coordenadas encontradas: Lat={lat}, Lon={lon}")
+        lat, lon = coordinates
 
     except Exception as e:
         return jsonify({'success': False, 'error': f'Erro de geocodificação: {e}'})
 
     try:
-        end_date = datetime.now() - timedelta(days=1)
-        start_date = end_date - timedelta(days=365)
-        start = start_date.strftime('%Y%m%d')
-        end = end_date.strftime('%Y%m%d')
-
-        api_url = (
-            "https://power.larc.nasa.gov/api/temporal/daily/point"
-            f"?parameters=ALLSKY_SFC_SW_DWN&community=RE&latitude={lat}&longitude={lon}"
-            f"&format=JSON&start={start}&end={end}"
-        )
-        
-        response = requests.get(api_url, timeout=15)
-        response.raise_for_status()
-        data = response.json()
-        
-        irradiance_data = data['properties']['parameter']['ALLSKY_SFC_SW_DWN']
-        
-        # --- A CORREÇÃO ESTÁ AQUI ---
-        # 1. Filtra valores inválidos (a API da NASA usa -999 para dados ausentes)
-        valid_values = [v for v in irradiance_data.values() if v >= 0]
-
-        if not valid_values:
-            return jsonify({'success': False, 'error': 'A API da NASA não retornou dados válidos para esta localidade.'})
-
-        # 2. Calcula a média apenas com os valores válidos
-        avg_irradiance = sum(valid_values) / len(valid_values)
-        # --- FIM DA CORREÇÃO ---
-        
-        return jsonify({'success': True, 'irradiance': round(avg_irradiance, 2)})
+        # Célula da grade da NASA guardada localmente; a API só é chamada se não houver dados válidos
+        return jsonify({'success': True, **irradiance.get_irradiance(lat, lon)})
 
+    except irradiance.NoIrradianceData as e:
+        return jsonify({'success': False, 'error': str(e)})
     except requests.exceptions.RequestException as e:
         return jsonify({'success': False, 'error': f'Erro ao conectar à API da NASA: {e}'})
     except Exception as e:
@@ -441,7 +542,8 @@ def add_product():
             category=form.category.data,
             manufacturer=form.manufacturer.data,
             power_wp=form.power_wp.data,
-            warranty_years=form.warranty_years.data
+            warranty_years=form.warranty_years.data,
+            price=form.price.data
         )
         db.session.add(new_product)
         db.session.commit()
@@ -456,30 +558,159 @@ def add_product():
 @login_required
 def generate_pdf(proposal_id):
     proposal = Proposal.query.get_or_404(proposal_id)
-    
-    monthly_chart_b64 = generate_monthly_production_chart(proposal.monthly_production_kwh)
-    payback_chart_b64 = generate_payback_chart(proposal.total_investment, proposal.estimated_savings_per_year)
-    financials = calculate_advanced_financials(proposal.total_investment, proposal.estimated_savings_per_year)
-    
-    old_monthly_bill = proposal.avg_bill_brl or ((proposal.avg_consumption_kwh or 0) * (proposal.kwh_price or 0))
-    old_annual_bill = old_monthly_bill * 12
-    new_annual_bill = old_annual_bill - (proposal.estimated_savings_per_year or 0)
-    
-    cumulative_cost_chart_b64 = generate_cumulative_cost_chart(proposal.total_investment, old_annual_bill, new_annual_bill)
-    
-    html_renderizado = render_template(
-        'pdf/proposal_template.html', 
-        proposal=proposal,
-        monthly_chart_b64=monthly_chart_b64,
-        payback_chart_b64=payback_chart_b64,
-        cumulative_cost_chart_b64=cumulative_cost_chart_b64,
-        financials=financials,
-        old_annual_bill=old_annual_bill,
-        new_annual_bill=new_annual_bill
+
+    # A chave do cache é o ETag: se o navegador já tem esta versão, responde 304 sem renderizar nada
+    cache_key = proposal_cache_key(proposal)
+    if request.if_none_match.contains(cache_key):
+        response = Response(status=304)
+        response.set_etag(cache_key)
+        response.last_modified = _pdf_last_modified(proposal)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+    # Se nada mudou desde o último download, o PDF sai direto do cache
+    cache_key, pdf_path = get_or_render_pdf(proposal, cache_key)
+    return _send_pdf(proposal, cache_key, pdf_path)
+
+
+def _pdf_last_modified(proposal):
+    return proposal.last_modified or proposal.creation_date
+
+
+def _send_pdf(proposal, cache_key, pdf_path):
+    """Envia o PDF do cache com ETag e Last-Modified (aceita If-None-Match e Range)."""
+    response = send_file(
+        pdf_path, mimetype='application/pdf', as_attachment=True, download_name=pdf_filename(proposal),
+        etag=cache_key, last_modified=_pdf_last_modified(proposal), conditional=True,
     )
-    
-    pdf = HTML(string=html_renderizado).write_pdf()
+    # O PDF só pode ser guardado pelo navegador de quem baixou, e sempre revalidado
+    response.cache_control.private = True
+    return response
+
+
+
+# --- ROTAS DA FILA DE PDFs ---
+@bp.route('/admin/proposal/<int:proposal_id>/pdf-jobs', methods=['POST'])
+@login_required
+def enqueue_pdf_job(proposal_id):
+    proposal = Proposal.query.get_or_404(proposal_id)
+    try:
+        job = enqueue_pdf(proposal)
+    except QueueFullError as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    return jsonify(_job_response(job))
+
+
+@bp.route('/admin/pdf-jobs/<job_id>')
+@login_required
+def pdf_job_status(job_id):
+    job = read_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job não encontrado.'}), 404
+    return jsonify(_job_response(job))
+
+
+@bp.route('/admin/pdf-jobs/<job_id>/download')
+@login_required
+def pdf_job_download(job_id):
+    job = read_job(job_id)
+    if job is None or job['status'] != DONE:
+        return jsonify({'success': False, 'error': 'O PDF ainda não está pronto.'}), 404
+
+    pdf_path = get_pdf_cache().get(job['cache_key'])
+    if pdf_path is None:
+        return jsonify({'success': False, 'error': 'O PDF expirou do cache. Gere novamente.'}), 410
+
+    proposal = Proposal.query.get_or_404(job['proposal_id'])
+    return _send_pdf(proposal, job['cache_key'], pdf_path)
+
+
+def _job_response(job):
+    """Formato JSON comum às rotas da fila de PDFs."""
+    return {
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'error': job.get('error'),
+        'status_url': url_for('main.pdf_job_status', job_id=job['id']),
+        'download_url': url_for('main.pdf_job_download', job_id=job['id']) if job['status'] == DONE else None,
+    }
 
-    return Response(pdf, mimetype='application/pdf', headers={
-        'Content-Disposition': f'attachment;filename=proposta_{proposal.client.name.replace(" ", "_")}.pdf'
-    })
\ No newline at end of file
+
+
+# --- EXPORTAÇÃO EM LOTE (ZIP) ---
+@bp.route('/admin/proposals/export.zip')
+@login_required
+def export_proposals_zip():
+    """Exporta os PDFs das propostas filtradas por cliente, período (AAAA-MM-DD) e status."""
+    try:
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d') if request.args.get('start') else None
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d') + timedelta(days=1) if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Datas devem estar no formato AAAA-MM-DD.'}), 400
+
+    proposal_ids = select_proposal_ids(
+        client_id=request.args.get('client_id', type=int),
+        start=start, end=end,
+        status=request.args.get('status')
+    )
+    if not proposal_ids:
+        return jsonify({'success': False, 'error': 'Nenhuma proposta encontrada com esses filtros.'}), 404
+
+    return Response(stream_with_context(iter_proposals_zip(proposal_ids)), mimetype='application/zip', headers={
+        'Content-Disposition': f'attachment;filename=propostas_{datetime.now():%Y%m%d_%H%M}.zip'
+    })
+
+
+
+# --- CONSULTA DE CEP E CNPJ (com cache, ver app/lookups.py) ---
+@bp.route('/admin/lookup/<kind>/<code>')
+@login_required
+def lookup_code(kind, code):
+    if kind not in lookups.CODE_LENGTHS:
+        return jsonify({'success': False, 'error': 'Tipo de consulta inválido.'}), 404
+    normalized = lookups.normalize_code(kind, code)
+    if normalized is None:
+        return jsonify({'success': False, 'error': f'{kind.upper()} inválido.'}), 400
+    try:
+        result = lookups.lookup(kind, normalized)
+    except requests.exceptions.RequestException as e:
+        return jsonify({'success': False, 'error': f'Erro ao consultar a BrasilAPI: {e}'}), 502
+    if not result['found']:
+        return jsonify({'success': False, 'error': f'{kind.upper()} não encontrado.', 'source': result['source']}), 404
+    return jsonify({'success': True, **result})
+
+
+@bp.route('/admin/lookup/cep/bulk', methods=['POST'])
+@login_required
+def lookup_ceps_bulk():
+    """Vários CEPs de uma vez, para importações. Corpo: {"ceps": ["01001-000", ...]}."""
+    ceps = (request.get_json(silent=True) or {}).get('ceps')
+    if not isinstance(ceps, list) or not ceps:
+        return jsonify({'success': False, 'error': 'Envie uma lista de CEPs em "ceps".'}), 400
+    if len(ceps) > current_app.config['LOOKUP_BULK_MAX']:
+        return jsonify({'success': False, 'error': f"No máximo {current_app.config['LOOKUP_BULK_MAX']} CEPs por chamada."}), 400
+
+    normalized = {cep: lookups.normalize_code('cep', str(cep)) for cep in ceps}
+    found = lookups.lookup_many('cep', [code for code in normalized.values() if code])
+    results = {cep: found[code] if code else {'error': 'CEP inválido.'} for cep, code in normalized.items()}
+    return jsonify({'success': True, 'results': results})
+
+
+
+# --- MÉTRICAS DOS PROVEDORES EXTERNOS (NASA POWER, NOMINATIM) ---
+@bp.route('/admin/providers/stats')
+@login_required
+def providers_stats():
+    return jsonify(provider_stats())
+
+
+
+# --- ESTATÍSTICAS DOS CACHES ---
+@bp.route('/admin/cache/stats')
+@login_required
+def cache_stats():
+    return jsonify({'charts': chart_cache_stats(), 'geocoding': geocode_cache_stats(),
+                    'irradiance': irradiance.irradiance_cache_stats(),
+                    'lookups': lookups.lookup_cache_stats()})
@@ -0,0 +1,125 @@
+# app/sizing.py
+
+"""
+Dimensionamento do sistema fotovoltaico: a única implementação das contas.
+
+Produção mensal, quantidade de painéis, inversor, economia anual e payback são
+calculados aqui, tanto para salvar a proposta quanto para o botão "Calcular" do
+formulário (via /admin/sizing). As funções são puras e aceitam escalares ou
+arrays (broadcasting do NumPy), então várias configurações candidatas são
+avaliadas de uma vez só. A economia vem do extrato mensal de créditos (app/ledger.py).
+"""
+
+import numpy as np
+
+from app import ledger, solar_sim
+
+PERFORMANCE_RATIO = 0.80 # Perdas do sistema (sujeira, temperatura, cabos, inversor)
+SEASONAL_FACTORS = np.array([1.1, 1.1, 1.0, 1.0, 0.9, 0.85, 0.85, 0.9, 1.0, 1.1, 1.15, 1.15])
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+POWER_TOLERANCE_KWP = 0.01 # Folga ao contar painéis de uma potência digitada/arredondada em 2 casas
+
+
+
+def consumption_from_bill(avg_bill_brl, kwh_price, public_lighting_fee=0):
+    """Consumo mensal estimado (kWh) a partir do valor da fatura, sem a taxa de iluminação pública."""
+    bill = np.asarray(avg_bill_brl, dtype=float) - np.nan_to_num(np.asarray(public_lighting_fee, dtype=float))
+    price = np.asarray(kwh_price, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(price > 0, np.maximum(bill, 0) / price, np.nan)
+
+
+def specific_monthly_yield(irradiance, latitude=np.nan):
+    """
+    Produção mensal (kWh) de 1 kWp instalado, formato (..., 12).
+    Com a latitude, usa a simulação horária (app/solar_sim.py); sem ela, o modelo
+    simplificado (HSP x dias x fator sazonal x PERFORMANCE_RATIO).
+    """
+    irradiance, latitude = np.broadcast_arrays(np.asarray(irradiance, dtype=float), np.asarray(latitude, dtype=float))
+    yields = irradiance[..., None] * PERFORMANCE_RATIO * DAYS_IN_MONTH * SEASONAL_FACTORS
+
+    simulate = np.isfinite(latitude) & (irradiance > 0)
+    if simulate.any():
+        # Cada par (latitude, irradiação) diferente é simulado uma única vez
+        pairs, inverse = np.unique(np.stack([latitude[simulate], irradiance[simulate]], axis=1), axis=0, return_inverse=True)
+        yields[simulate] = solar_sim.monthly_production(pairs[:, 0], pairs[:, 1])[inverse.ravel()]
+    return yields
+
+
+def monthly_production(system_power_kwp, irradiance, latitude=np.nan):
+    """Produção estimada de cada mês (kWh), formato (..., 12)."""
+    return np.asarray(system_power_kwp, dtype=float)[..., None] * specific_monthly_yield(irradiance, latitude)
+
+
+def required_power_kwp(consumption_kwh, irradiance, latitude=np.nan):
+    """Potência (kWp) cuja produção anual cobre o consumo anual."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.asarray(consumption_kwh, dtype=float) * 12 / specific_monthly_yield(irradiance, latitude).sum(axis=-1)
+
+
+def annual_savings(monthly_production_kwh, consumption_kwh, grid_type, kwh_price, fio_b_price=0, start_year=None):
+    """
+    Economia (R$) do primeiro ano, pelo extrato mês a mês: créditos acima do custo de
+    disponibilidade, com validade, menos o Fio B da energia compensada. Nunca negativa.
+    `start_year` é o ano da proposta (por padrão, o atual), que define a parcela do Fio B.
+    """
+    result = ledger.simulate(monthly_production_kwh, consumption_kwh, grid_type, kwh_price, fio_b_price,
+                             start_year=start_year, months=12)
+    return np.maximum(np.nan_to_num(result['annual_savings'][..., 0]), 0)
+
+
+def evaluate(irradiance, panel_power_wp, consumption_kwh, grid_type='bifasica', kwh_price=0,
+             fio_b_price=0, total_investment=np.nan, system_power_kwp=np.nan, latitude=np.nan):
+    """
+    Dimensiona e avalia uma ou várias configurações de uma vez.
+
+    Quando `system_power_kwp` não é informado (NaN), o sistema é dimensionado para
+    cobrir o consumo, arredondando para um número inteiro de painéis. Com a
+    `latitude`, a produção vem da simulação horária. Retorna um dicionário de
+    arrays; valores indisponíveis vêm como NaN.
+    """
+    panel_kw = np.asarray(panel_power_wp, dtype=float) / 1000
+    given_power = np.asarray(system_power_kwp, dtype=float)
+    yields = specific_monthly_yield(irradiance, latitude)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        required = np.asarray(consumption_kwh, dtype=float) * 12 / yields.sum(axis=-1)
+        sized_quantity = np.ceil(required / panel_kw)
+        power = np.where(np.isnan(given_power), sized_quantity * panel_kw, given_power)
+        quantity = np.ceil(np.maximum(power - POWER_TOLERANCE_KWP, 0) / panel_kw)
+
+    monthly = power[..., None] * yields
+    production = monthly.sum(axis=-1)
+    savings = np.round(annual_savings(monthly, consumption_kwh, grid_type, kwh_price, fio_b_price), 2)
+    # Sem consumo ou sem tarifa não há economia a estimar (a produção continua valendo)
+    consumption = np.asarray(consumption_kwh, dtype=float)
+    price = np.asarray(kwh_price, dtype=float)
+    with np.errstate(invalid='ignore'):
+        savings = np.where(np.isfinite(consumption) & (consumption > 0) & (price > 0), savings, 0.0)
+
+    investment = np.asarray(total_investment, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payback = np.where((savings > 0) & (investment > 0), investment / savings, np.nan)
+
+    return {
+        'system_power_kwp': power,
+        'panel_quantity': quantity,
+        'recommended_inverter_kw': np.where(power > 0, np.maximum(1, np.floor(power + 0.5)), np.nan),
+        'monthly_production_kwh': np.round(monthly, 2),
+        'annual_production_kwh': production,
+        'estimated_savings_per_year': savings,
+        'payback_years': payback,
+    }
+
+
+def to_python(value):
+    """Converte um resultado do NumPy para tipos do Python (NaN vira None), para JSON e para o banco."""
+    if isinstance(value, dict):
+        return {key: to_python(item) for key, item in value.items()}
+    if isinstance(value, np.ndarray):
+        return [to_python(v) for v in value] if value.ndim else to_python(value.item())
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
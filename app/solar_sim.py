@@ -0,0 +1,157 @@
+# app/solar_sim.py
+
+"""
+Simulação horária da produção (8.760 horas do ano), vetorizada com NumPy.
+
+Para cada hora do ano calcula a posição do sol, a irradiação de céu claro, a
+separação em direta e difusa (Erbs), a irradiação no plano dos painéis
+(inclinação e azimute, modelo isotrópico) e a perda por temperatura das células
+(NOCT). A curva de céu claro é escalada para a irradiação informada (a média
+anual, ou cada mês quando há os 12 valores mensais), então o resultado continua
+ancorado nos dados da NASA.
+
+Todas as funções aceitam arrays de propostas (formato (N,)) e devolvem (N, 8760)
+ou (N, 12). Lotes grandes são processados em blocos para limitar a memória.
+"""
+
+import numpy as np
+
+HOURS_PER_YEAR = 8760
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+MONTH_START_HOUR = np.concatenate([[0], np.cumsum(DAYS_IN_MONTH)[:-1]]) * 24
+
+SOLAR_CONSTANT = 1367 # W/m²
+ALBEDO = 0.2
+NOCT = 45 # Temperatura nominal de operação da célula (°C)
+TEMPERATURE_COEFFICIENT = -0.004 # Perda de potência por °C acima de 25 °C
+SYSTEM_LOSSES = 0.10 # Sujeira, cabos, inversor e mismatch (a temperatura é calculada à parte)
+AMBIENT_TEMPERATURE = 25.0 # Média anual (°C)
+AMBIENT_DAILY_AMPLITUDE = 5.0 # Variação entre madrugada e início da tarde (°C)
+
+CHUNK_SIZE = 64 # Propostas simuladas por bloco
+
+# Latitude da capital de cada UF, usada enquanto o cliente não tem coordenadas próprias
+UF_LATITUDE = {
+    'AC': -9.97, 'AL': -9.67, 'AP': 0.03, 'AM': -3.12, 'BA': -12.97, 'CE': -3.73, 'DF': -15.79,
+    'ES': -20.32, 'GO': -16.68, 'MA': -2.53, 'MT': -15.60, 'MS': -20.47, 'MG': -19.92, 'PA': -1.46,
+    'PB': -7.12, 'PR': -25.43, 'PE': -8.05, 'PI': -5.09, 'RJ': -22.91, 'RN': -5.79, 'RS': -30.03,
+    'RO': -8.76, 'RR': 2.82, 'SC': -27.60, 'SP': -23.55, 'SE': -10.91, 'TO': -10.18,
+}
+
+# Hora solar (meio da hora) e dia do ano de cada uma das 8.760 horas
+_HOUR = np.arange(HOURS_PER_YEAR) % 24 + 0.5
+_DAY = np.arange(HOURS_PER_YEAR) // 24 + 1
+
+
+def latitude_for_state(state):
+    """Latitude aproximada a partir da UF (capital); None se desconhecida."""
+    return UF_LATITUDE.get((state or '').strip().upper())
+
+
+def _solar_geometry(latitude):
+    """Cosseno do ângulo zenital e azimute solar (graus a partir do norte, horário), formato (N, 8760)."""
+    phi = np.radians(np.asarray(latitude, dtype=float))[:, None]
+    declination = np.radians(23.45) * np.sin(2 * np.pi * (284 + _DAY) / 365)
+    hour_angle = np.radians(15 * (_HOUR - 12))
+
+    cos_zenith = np.sin(phi) * np.sin(declination) + np.cos(phi) * np.cos(declination) * np.cos(hour_angle)
+    cos_zenith = np.clip(cos_zenith, -1, 1)
+    sin_zenith = np.sqrt(1 - cos_zenith ** 2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cos_azimuth = (np.sin(declination) * np.cos(phi) - np.cos(declination) * np.sin(phi) * np.cos(hour_angle)) / sin_zenith
+    azimuth = np.degrees(np.arccos(np.clip(np.nan_to_num(cos_azimuth), -1, 1)))
+    azimuth = np.where(hour_angle > 0, 360 - azimuth, azimuth)
+    return cos_zenith, sin_zenith, azimuth
+
+
+def _monthly_daily_mean(hourly):
+    """Média diária de cada mês (kWh/m²/dia) a partir de valores horários em W/m²."""
+    return np.add.reduceat(hourly, MONTH_START_HOUR, axis=-1) / 1000 / DAYS_IN_MONTH
+
+
+def _simulate_chunk(latitude, irradiance, system_power_kwp, tilt, azimuth, ambient_temperature):
+    cos_zenith, sin_zenith, sun_azimuth = _solar_geometry(latitude)
+    up = cos_zenith > 0.01
+
+    # Céu claro (Haurwitz) e radiação extraterrestre no plano horizontal
+    extraterrestrial = SOLAR_CONSTANT * (1 + 0.033 * np.cos(2 * np.pi * _DAY / 365)) * np.maximum(cos_zenith, 0)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        ghi = np.where(up, 1098 * cos_zenith * np.exp(-0.057 / cos_zenith), 0.0)
+
+    # Escala para a irradiação medida. Com 12 valores mensais, cada mês é ajustado;
+    # com o HSP anual, mantém a variação sazonal da geometria solar.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if irradiance.ndim == 2:
+            scale = np.repeat(np.nan_to_num(irradiance / _monthly_daily_mean(ghi)), DAYS_IN_MONTH * 24, axis=1)
+        else:
+            scale = np.nan_to_num(irradiance / (ghi.sum(axis=1) / 1000 / 365))[:, None]
+    ghi = ghi * scale
+
+    # Separação direta/difusa (Erbs) pelo índice de claridade
+    with np.errstate(divide='ignore', invalid='ignore'):
+        kt = np.clip(np.where(extraterrestrial > 0, ghi / extraterrestrial, 0), 0, 1)
+    diffuse_fraction = np.where(
+        kt <= 0.22, 1 - 0.09 * kt,
+        np.where(kt <= 0.80, 0.9511 - 0.1604 * kt + 4.388 * kt ** 2 - 16.638 * kt ** 3 + 12.336 * kt ** 4, 0.165),
+    )
+    dhi = ghi * diffuse_fraction
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dni = np.where(up, (ghi - dhi) / cos_zenith, 0.0)
+
+    # Irradiação no plano dos painéis (modelo isotrópico)
+    beta = np.radians(tilt)[:, None]
+    cos_incidence = cos_zenith * np.cos(beta) + sin_zenith * np.sin(beta) * np.cos(np.radians(sun_azimuth - azimuth[:, None]))
+    poa = (dni * np.maximum(cos_incidence, 0)
+           + dhi * (1 + np.cos(beta)) / 2
+           + ghi * ALBEDO * (1 - np.cos(beta)) / 2)
+
+    # Temperatura ambiente com ciclo diário e temperatura das células
+    ambient = ambient_temperature[:, None] + AMBIENT_DAILY_AMPLITUDE * np.sin(2 * np.pi * (_HOUR - 9) / 24)
+    cell = ambient + poa / 800 * (NOCT - 20)
+    derate = 1 + TEMPERATURE_COEFFICIENT * (cell - 25)
+
+    return system_power_kwp[:, None] * poa / 1000 * derate * (1 - SYSTEM_LOSSES) # kWh em cada hora
+
+
+def _prepare(latitude, irradiance, system_power_kwp, tilt, azimuth, ambient_temperature):
+    latitude = np.atleast_1d(np.asarray(latitude, dtype=float))
+    n = len(latitude)
+    irradiance = np.asarray(irradiance, dtype=float)
+    irradiance = np.broadcast_to(irradiance, (n, 12) if irradiance.ndim and irradiance.shape[-1] == 12 else (n,))
+
+    def column(value, default):
+        value = default if value is None else np.asarray(value, dtype=float)
+        return np.broadcast_to(value, (n,)).astype(float)
+
+    # Sem inclinação informada: inclinação = latitude, voltado para o equador
+    tilt = column(tilt, np.abs(latitude))
+    azimuth = column(azimuth, np.where(latitude < 0, 0.0, 180.0))
+    return (latitude, irradiance, column(system_power_kwp, 1.0), tilt, azimuth,
+            column(ambient_temperature, AMBIENT_TEMPERATURE))
+
+
+def simulate_hourly(latitude, irradiance, system_power_kwp=1.0, tilt=None, azimuth=None, ambient_temperature=None):
+    """
+    Produção de cada hora do ano (kWh), formato (N, 8760).
+
+    `irradiance`: HSP médio anual (kWh/m²/dia) por proposta, ou 12 valores mensais.
+    `tilt`/`azimuth` em graus (azimute a partir do norte); por padrão, inclinação igual
+    à latitude e painéis voltados para o equador.
+    """
+    args = _prepare(latitude, irradiance, system_power_kwp, tilt, azimuth, ambient_temperature)
+    n = len(args[0])
+    return np.concatenate([
+        _simulate_chunk(*(a[i:i + CHUNK_SIZE] for a in args)) for i in range(0, n, CHUNK_SIZE)
+    ]) if n else np.empty((0, HOURS_PER_YEAR))
+
+
+def monthly_production(latitude, irradiance, system_power_kwp=1.0, tilt=None, azimuth=None, ambient_temperature=None):
+    """Produção de cada mês (kWh), formato (N, 12). Processa em blocos: serve para lotes grandes."""
+    args = _prepare(latitude, irradiance, system_power_kwp, tilt, azimuth, ambient_temperature)
+    n = len(args[0])
+    months = np.empty((n, 12))
+    for i in range(0, n, CHUNK_SIZE):
+        hourly = _simulate_chunk(*(a[i:i + CHUNK_SIZE] for a in args))
+        months[i:i + CHUNK_SIZE] = np.add.reduceat(hourly, MONTH_START_HOUR, axis=1)
+    return months
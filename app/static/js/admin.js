@@ -69,10 +69,12 @@ document.addEventListener("DOMContentLoaded", function() {
         cepInput.addEventListener('blur', function() {
             const cep = this.value.replace(/\D/g, '');
             if (cep.length === 8) {
-                fetch(`https://brasilapi.com.br/api/cep/v1/${cep}`)
+                // Consulta pelo servidor, que guarda as respostas da BrasilAPI em cache
+                fetch(`/admin/lookup/cep/${cep}`)
                     .then(response => response.json())
-                    .then(data => {
-                        if (!data.errors) {
+                    .then(result => {
+                        if (result.success) {
+                            const data = result.data;
                             document.getElementById('logradouro').value = data.street;
                             document.getElementById('bairro').value = data.neighborhood;
                             document.getElementById('cidade').value = data.city;
@@ -87,10 +89,11 @@ document.addEventListener("DOMContentLoaded", function() {
         cnpjInput.addEventListener('blur', function() {
             const cnpj = this.value.replace(/\D/g, '');
             if (cnpj.length === 14) {
-                fetch(`https://brasilapi.com.br/api/cnpj/v1/${cnpj}`)
+                fetch(`/admin/lookup/cnpj/${cnpj}`)
                     .then(response => response.json())
-                    .then(data => {
-                        if (!data.errors) {
+                    .then(result => {
+                        if (result.success) {
+                            const data = result.data;
                             document.getElementById('razao_social').value = data.razao_social;
                             document.getElementById('cep').value = data.cep;
                             // Dispara o evento de 'blur' no CEP para preencher o resto do endereço
@@ -128,7 +131,7 @@ document.addEventListener("DOMContentLoaded", function() {
         const fetchBtn = document.getElementById('fetchIrradianceBtn');
         const irradianceInput = document.getElementById('solar_irradiance');
         
-        fetchBtn.addEventListener('click', function() {
+        if (fetchBtn) fetchBtn.addEventListener('click', function() {
             const clientId = this.dataset.clientId;
             const spinner = this.querySelector('.spinner-border');
             const icon = this.querySelector('.fa-search-location');
@@ -203,56 +206,192 @@ document.addEventListener("DOMContentLoaded", function() {
         // Inicializa o modal de resultados do Bootstrap
         const recommendationModal = new bootstrap.Modal(document.getElementById('recommendationModal'));
 
-        // Adiciona o "ouvinte" de evento ao botão de calcular
-        calculateBtn.addEventListener('click', function() {
-            
-            // 1. COLETA E VALIDA OS DADOS DE ENTRADA DO FORMULÁRIO
-            let consumoMensalKwh = parseFloat(document.getElementById('avg_consumption_kwh').value);
-            const faturaMensalBrl = parseFloat(document.getElementById('avg_bill_brl').value);
-            const tarifaKwh = parseFloat(document.getElementById('kwh_price').value);
-            const irradiacao = parseFloat(document.getElementById('solar_irradiance').value);
-            const potenciaPainelWp = parseInt(document.getElementById('panel_power_wp').value, 10);
-            const tipoConsumo = document.querySelector('input[name="consumption_input_type"]:checked').value;
+        // Potências de painel comparadas no modal, além da escolhida no formulário
+        const painelAlternativasWp = [450, 500, 550, 600, 670];
+        const formatBrl = (valor) => (valor || 0).toLocaleString('pt-BR', { style: 'currency', currency: 'BRL' });
 
-            // Se o input for em R$, estima o consumo em kWh
-            if (tipoConsumo === 'brl') {
-                if (!faturaMensalBrl || !tarifaKwh || tarifaKwh <= 0) {
-                    alert('Para calcular a partir da fatura, preencha o "Valor Médio da Fatura" e o "Valor da Tarifa de Energia".');
-                    return;
-                }
-                consumoMensalKwh = faturaMensalBrl / tarifaKwh;
+        // Dados do formulário usados no dimensionamento (mesmos nomes dos campos no servidor)
+        const valor = (id) => { const el = document.getElementById(id); return el ? el.value : null; };
+        const dadosDimensionamento = () => {
+            const tipoConsumo = document.querySelector('input[name="consumption_input_type"]:checked').value;
+            if (tipoConsumo === 'brl' && (!parseFloat(valor('avg_bill_brl')) || !parseFloat(valor('kwh_price')))) {
+                alert('Para calcular a partir da fatura, preencha o "Valor Médio da Fatura" e o "Valor da Tarifa de Energia".');
+                return null;
             }
+            return {
+                solar_irradiance: valor('solar_irradiance'),
+                consumption_input_type: tipoConsumo,
+                avg_consumption_kwh: valor('avg_consumption_kwh'),
+                avg_bill_brl: valor('avg_bill_brl'),
+                public_lighting_fee: valor('public_lighting_fee'),
+                kwh_price: valor('kwh_price'),
+                grid_type: valor('grid_type'),
+                concessionaria_id: valor('concessionaria_select'),
+                total_investment: valor('total_investment'),
+                latitude: calculateBtn.dataset.latitude, // UF do cliente: ativa a simulação horária
+            };
+        };
 
-            // Validação final dos dados necessários
-            if (!consumoMensalKwh || !irradiacao || !potenciaPainelWp || consumoMensalKwh <= 0 || irradiacao <= 0) {
-                alert('Para calcular, preencha os campos de Consumo, Irradiação Solar e Potência do Painel.');
-                return;
-            }
+        // Adiciona o "ouvinte" de evento ao botão de calcular
+        calculateBtn.addEventListener('click', function() {
+
+            // 1. COLETA OS DADOS DE ENTRADA DO FORMULÁRIO
+            const potenciaPainelWp = parseInt(valor('panel_power_wp'), 10);
+            const dados = dadosDimensionamento();
+            if (!dados) return;
+
+            // 2. PEDE AO SERVIDOR O CÁLCULO DA CONFIGURAÇÃO ESCOLHIDA E DAS ALTERNATIVAS, NUMA SÓ CHAMADA
+            const potencias = [potenciaPainelWp].concat(painelAlternativasWp.filter(wp => wp !== potenciaPainelWp));
+            const payload = {
+                defaults: dados,
+                configurations: potencias.map(wp => ({ panel_power_wp: wp })),
+            };
+
+            fetch(this.dataset.sizingUrl, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(payload),
+            })
+                .then(response => response.json())
+                .then(data => {
+                    if (!data.success) {
+                        alert('Erro: ' + data.error);
+                        return;
+                    }
+                    const escolhido = data.results[0];
+                    if (escolhido.error || !potenciaPainelWp) {
+                        alert('Para calcular, preencha os campos de Consumo, Irradiação Solar e Potência do Painel.');
+                        return;
+                    }
 
-            // 2. REALIZA OS CÁLCULOS
-            const eficiencia = 0.80; // Performance Ratio do sistema (80%)
-            const potenciaSistemaKwp = consumoMensalKwh / (irradiacao * 30 * eficiencia);
-            const qtdPaineis = Math.ceil(potenciaSistemaKwp / (potenciaPainelWp / 1000)); // Converte Wp para kWp para o cálculo
-            const inversorRecomendado = Math.round(potenciaSistemaKwp);
-
-            // 3. PREENCHE OS CAMPOS OCULTOS DO FORMULÁRIO
-            document.getElementById('system_power_kwp').value = potenciaSistemaKwp.toFixed(2);
-            document.getElementById('panel_quantity').value = qtdPaineis;
-            document.getElementById('recommended_inverter_kw').value = inversorRecomendado;
-
-            // 4. PREENCHE OS RESULTADOS NO MODAL
-            document.getElementById('result-system-power').innerText = `${potenciaSistemaKwp.toFixed(2)} kWp`;
-            document.getElementById('result-panel-qty').innerText = `${qtdPaineis} placas de ${potenciaPainelWp} Wp`;
-            document.getElementById('result-inverter').innerText = `${inversorRecomendado} kW`;
-            
-            // 5. EXIBE O MODAL COM OS RESULTADOS
-            recommendationModal.show();
+                    // 3. PREENCHE OS CAMPOS OCULTOS DO FORMULÁRIO
+                    document.getElementById('system_power_kwp').value = escolhido.system_power_kwp.toFixed(2);
+                    document.getElementById('panel_quantity').value = escolhido.panel_quantity;
+                    document.getElementById('recommended_inverter_kw').value = escolhido.recommended_inverter_kw;
+
+                    // 4. PREENCHE OS RESULTADOS NO MODAL
+                    document.getElementById('result-system-power').innerText = `${escolhido.system_power_kwp.toFixed(2)} kWp`;
+                    document.getElementById('result-panel-qty').innerText = `${escolhido.panel_quantity} placas de ${potenciaPainelWp} Wp`;
+                    document.getElementById('result-inverter').innerText = `${escolhido.recommended_inverter_kw} kW`;
+                    document.getElementById('result-alternatives').innerHTML = data.results
+                        .filter(r => !r.error)
+                        .map(r => `<tr${r === escolhido ? ' class="table-primary"' : ''}><td>${r.panel_power_wp} Wp</td><td class="text-center">${r.panel_quantity}</td><td class="text-center">${r.system_power_kwp.toFixed(2)} kWp</td><td class="text-end">${formatBrl(r.estimated_savings_per_year)}</td></tr>`)
+                        .join('');
+
+                    // 5. EXIBE O MODAL COM OS RESULTADOS
+                    recommendationModal.show();
+                })
+                .catch(error => console.error('Erro:', error));
         });
+
+        // --- OTIMIZADOR: MELHORES COMBINAÇÕES DE MÓDULO E INVERSOR DO CATÁLOGO ---
+        const optimizeBtn = document.getElementById('optimizeSystemBtn');
+        if (optimizeBtn) {
+            const optimizerModal = new bootstrap.Modal(document.getElementById('optimizerModal'));
+            const tabela = document.getElementById('optimizer-results');
+            let resultados = [];
+            const escapar = (texto) => String(texto ?? '').replace(/[&<>"']/g, c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c]));
+
+            // Quantidade de módulos e inversor vão como o otimizador escolheu: o servidor os salva sem redimensionar
+            const usarConfiguracao = (r) => {
+                document.getElementById('panel_power_wp').value = r.module.power_wp;
+                document.getElementById('system_power_kwp').value = r.system_power_kwp;
+                document.getElementById('panel_quantity').value = r.panel_quantity;
+                document.getElementById('recommended_inverter_kw').value = r.recommended_inverter_kw;
+                document.getElementById('total_investment').value = r.total_investment.toFixed(2);
+                optimizerModal.hide();
+            };
+
+            const otimizar = () => {
+                const dados = dadosDimensionamento();
+                if (!dados) return;
+                dados.rank_by = document.querySelector('input[name="optimizerRankBy"]:checked').value;
+
+                fetch(optimizeBtn.dataset.optimizerUrl, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify(dados),
+                })
+                    .then(response => response.json())
+                    .then(data => {
+                        if (!data.success) {
+                            alert('Erro: ' + data.error);
+                            return;
+                        }
+                        resultados = data.results;
+                        tabela.innerHTML = resultados.map((r, i) => `<tr>
+                            <td>${r.panel_quantity} x ${escapar(r.module.name)} (${r.module.power_wp} Wp)</td>
+                            <td>${r.inverter.units} x ${escapar(r.inverter.name)}</td>
+                            <td class="text-end">${formatBrl(r.total_investment)}</td>
+                            <td class="text-end">${formatBrl(r.npv)}</td>
+                            <td class="text-end">${r.cost_per_kwh.toFixed(3).replace('.', ',')}</td>
+                            <td class="text-end"><button type="button" class="btn btn-sm btn-success" data-index="${i}">Usar</button></td>
+                        </tr>`).join('');
+                        optimizerModal.show();
+                    })
+                    .catch(error => console.error('Erro:', error));
+            };
+
+            optimizeBtn.addEventListener('click', otimizar);
+            document.querySelectorAll('input[name="optimizerRankBy"]').forEach(radio => radio.addEventListener('change', otimizar));
+            tabela.addEventListener('click', function(e) {
+                const botao = e.target.closest('button[data-index]');
+                if (botao) usarConfiguracao(resultados[botao.dataset.index]);
+            });
+        }
     }
 
 
 
 
+    // --- GERAÇÃO DE PDF EM SEGUNDO PLANO (FILA DE JOBS) ---
+    const generatePdfBtn = document.getElementById('generatePdfBtn');
+    if (generatePdfBtn) {
+        generatePdfBtn.addEventListener('click', function(e) {
+            e.preventDefault();
+            const spinner = this.querySelector('.spinner-border');
+            const icon = this.querySelector('.fa-file-pdf');
+            const setLoading = (loading) => {
+                spinner.classList.toggle('d-none', !loading);
+                icon.classList.toggle('d-none', loading);
+                this.classList.toggle('disabled', loading);
+            };
+
+            // Consulta o status do job até o PDF ficar pronto
+            const poll = (job) => {
+                if (job.status === 'done') {
+                    setLoading(false);
+                    window.location = job.download_url;
+                } else if (job.status === 'failed') {
+                    setLoading(false);
+                    alert('Erro ao gerar o PDF: ' + job.error);
+                } else {
+                    setTimeout(() => {
+                        fetch(job.status_url)
+                            .then(response => response.json())
+                            .then(poll)
+                            .catch(error => { setLoading(false); console.error('Erro:', error); });
+                    }, 1000);
+                }
+            };
+
+            setLoading(true);
+            fetch(this.dataset.enqueueUrl, { method: 'POST' })
+                .then(response => response.json())
+                .then(data => {
+                    if (data.success) {
+                        poll(data);
+                    } else {
+                        setLoading(false);
+                        alert('Erro: ' + data.error);
+                    }
+                })
+                .catch(error => { setLoading(false); console.error('Erro:', error); });
+        });
+    }
+
+
+
     // --- LÓGICA DOS GRÁFICOS DO DASHBOARD (SÓ RODA NO DASHBOARD) ---
     const lineChartCanvas = document.getElementById('proposalsLineChart');
     if (lineChartCanvas) {
@@ -0,0 +1,178 @@
+# app/tariffs.py
+
+"""
+Recálculo em massa das propostas quando a tarifa de uma concessionária muda.
+
+Quando o Fio B da concessionária muda, ou o kWh muda num reajuste, a economia
+anual e o payback gravados nas propostas ficam desatualizados. Aqui as propostas
+afetadas são lidas em blocos (só as colunas necessárias, sem montar objetos do
+ORM), recalculadas em arrays (app/sizing.py e app/ledger.py) e gravadas com um
+UPDATE em lote por bloco, cada bloco na sua própria transação. As métricas
+derivadas (app/metrics.py) das propostas alteradas são refeitas na mesma transação.
+O novo Fio B é gravado com um UPDATE direto, na transação do primeiro bloco, para não
+disparar o recálculo de todas as propostas da concessionária de uma vez ao salvar.
+
+No modo de simulação (dry_run) nada é gravado e o resultado traz a diferença
+antes/depois de cada proposta que mudaria.
+"""
+
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import update
+from sqlalchemy.orm import joinedload
+
+from app import db, sizing
+from app.metrics import refresh_metrics
+from app.models import Concessionaria, Proposal
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_CHANGES = 200 # Diferenças devolvidas no modo de simulação
+
+_COLUMNS = (
+    Proposal.id, Proposal.title, Proposal.monthly_production_kwh, Proposal.consumption_input_type,
+    Proposal.avg_consumption_kwh, Proposal.avg_bill_brl, Proposal.public_lighting_fee, Proposal.kwh_price,
+    Proposal.grid_type, Proposal.total_investment, Proposal.estimated_savings_per_year, Proposal.payback_years,
+    Proposal.creation_date, Concessionaria.fio_b_price,
+)
+
+
+def _floats(rows, name):
+    return np.array([np.nan if getattr(row, name) is None else getattr(row, name) for row in rows], dtype=float)
+
+
+def _recalculate_chunk(rows, fio_b_price, kwh_price):
+    """Novos kwh_price, avg_bill_brl, economia anual e payback de um bloco, em arrays."""
+    old_price = _floats(rows, 'kwh_price')
+    old_bill = _floats(rows, 'avg_bill_brl')
+    fee = np.nan_to_num(_floats(rows, 'public_lighting_fee'))
+
+    # O consumo é físico: quem informou a fatura continua consumindo os mesmos kWh,
+    # então ele é estimado com a tarifa antiga e a fatura sobe junto com a tarifa.
+    by_bill = np.array([row.consumption_input_type == 'brl' and bool(row.avg_bill_brl) for row in rows])
+    consumption = np.where(by_bill, sizing.consumption_from_bill(old_bill, old_price, fee), _floats(rows, 'avg_consumption_kwh'))
+    new_price = old_price if kwh_price is None else np.full(len(rows), float(kwh_price))
+    new_bill = np.where(np.isnan(old_bill), np.nan, (old_bill - fee) * (new_price / old_price) + fee)
+
+    if fio_b_price is None:
+        fio_b = np.nan_to_num(_floats(rows, 'fio_b_price'))
+    else:
+        fio_b = np.full(len(rows), float(fio_b_price))
+
+    production = np.array([row.monthly_production_kwh for row in rows], dtype=float)
+    grid_type = np.array([row.grid_type or 'bifasica' for row in rows])
+    # Mesmo ano de início das métricas (app/metrics.py): a parcela do Fio B é a do ano da proposta
+    start_year = np.array([(row.creation_date or datetime.utcnow()).year for row in rows])
+    savings = np.round(sizing.annual_savings(production, consumption, grid_type, new_price, fio_b, start_year), 2)
+
+    investment = _floats(rows, 'total_investment')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payback = np.where((savings > 0) & (investment > 0), investment / savings, np.nan)
+    return new_price, new_bill, savings, payback
+
+
+def _value(x, digits=None):
+    if x is None or (isinstance(x, float) and np.isnan(x)):
+        return None
+    return round(float(x), digits) if digits is not None else float(x)
+
+
+def _differs(old, new):
+    if old is None or new is None:
+        return (old is None) != (new is None)
+    return abs(old - new) > 0.005
+
+
+def recalculate_proposals(concessionaria_id=None, fio_b_price=None, kwh_price=None,
+                          chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    """
+    Recalcula economia anual e payback das propostas (de uma concessionária, ou todas).
+
+    `fio_b_price`: novo Fio B da concessionária (gravado nela, se não for simulação).
+    `kwh_price`: novo valor do kWh (R$/kWh) das propostas da concessionária; a fatura média de
+    cada proposta muda na mesma proporção. Como o valor é absoluto, repetir a execução não muda nada.
+
+    É um gerador: devolve o progresso após cada bloco (dicionário com rows, changed,
+    skipped, elapsed_s e rows_per_second) e, no modo de simulação, as diferenças em `changes`.
+    """
+    if (fio_b_price is not None or kwh_price is not None) and concessionaria_id is None:
+        raise ValueError('Para mudar o Fio B ou o kWh, informe a concessionária.')
+
+    report = {'rows': 0, 'changed': 0, 'skipped': 0, 'elapsed_s': 0.0, 'rows_per_second': 0.0,
+              'dry_run': dry_run, 'changes': []}
+    start = time.perf_counter()
+    if fio_b_price is not None and not dry_run:
+        # UPDATE direto: não marca a concessionária como alterada na sessão, então o recálculo
+        # das métricas ao salvar (app/metrics.py) não refaz todas as propostas num flush só.
+        # Vai junto com o primeiro bloco; as métricas são refeitas bloco a bloco abaixo.
+        result = db.session.execute(update(Concessionaria).where(Concessionaria.id == concessionaria_id)
+                                    .values(fio_b_price=fio_b_price))
+        if not result.rowcount:
+            db.session.rollback()
+            raise ValueError(f'Concessionária {concessionaria_id} não encontrada.')
+
+    last_id = 0
+    while True:
+        query = (db.session.query(*_COLUMNS)
+                 .outerjoin(Concessionaria, Proposal.concessionaria_id == Concessionaria.id)
+                 .filter(Proposal.id > last_id))
+        if concessionaria_id is not None:
+            query = query.filter(Proposal.concessionaria_id == concessionaria_id)
+        rows = query.order_by(Proposal.id).limit(chunk_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        report['rows'] += len(rows)
+
+        # Sem a produção mensal ou o kWh não há o que recalcular
+        usable = [row for row in rows
+                  if row.monthly_production_kwh and len(row.monthly_production_kwh) == 12 and row.kwh_price]
+        report['skipped'] += len(rows) - len(usable)
+        updates = []
+        if usable:
+            new_price, new_bill, savings, payback = _recalculate_chunk(usable, fio_b_price, kwh_price)
+
+            for i, row in enumerate(usable):
+                new = {
+                    'kwh_price': _value(new_price[i], 4),
+                    'avg_bill_brl': _value(new_bill[i], 2),
+                    'estimated_savings_per_year': _value(savings[i]),
+                    'payback_years': _value(payback[i]),
+                }
+                old = {name: getattr(row, name) for name in new}
+                if not any(_differs(old[name], new[name]) for name in new):
+                    continue
+                updates.append(dict(new, id=row.id))
+                if dry_run and len(report['changes']) < MAX_REPORTED_CHANGES:
+                    report['changes'].append({'id': row.id, 'title': row.title,
+                                              **{name: [old[name], new[name]] for name in new}})
+            report['changed'] += len(updates)
+
+        if not dry_run:
+            if updates:
+                now = datetime.utcnow()
+                db.session.execute(update(Proposal), [dict(values, last_modified=now) for values in updates])
+            # Com o Fio B novo, as métricas de todo o bloco dependem dele, não só as das propostas alteradas
+            refresh_ids = [row.id for row in rows] if fio_b_price is not None else [values['id'] for values in updates]
+            changed = []
+            if refresh_ids:
+                changed = (Proposal.query
+                           .options(joinedload(Proposal.concessionaria), joinedload(Proposal.metrics))
+                           .filter(Proposal.id.in_(refresh_ids))
+                           .populate_existing().all())
+                refresh_metrics(changed)
+            db.session.commit()
+            for proposal in changed:
+                db.session.expunge(proposal) # Mantém a memória estável em lotes grandes
+
+        report['elapsed_s'] = time.perf_counter() - start
+        report['rows_per_second'] = report['rows'] / report['elapsed_s'] if report['elapsed_s'] else 0.0
+        yield report
+
+    if not report['rows']:
+        if not dry_run:
+            db.session.commit() # Só o novo Fio B, sem propostas a recalcular
+        yield report
+    if dry_run:
+        db.session.rollback()
@@ -6,10 +6,15 @@ import matplotlib.pyplot as plt
 import io
 import base64
 import numpy as np
-import numpy_financial as npf
+from flask import current_app
 
-def generate_monthly_production_chart(data):
-    """Gera um gráfico de barras da produção mensal e retorna como imagem base64."""
+from app import finance
+from app.chart_cache import cached_chart, cumulative_cost_series
+
+
+@cached_chart
+def generate_monthly_production_chart(data, image_format='png'):
+    """Gera um gráfico de barras da produção mensal e retorna como imagem base64 (PNG ou SVG)."""
     if not data or len(data) != 12:
         return None # Retorna nada se não houver dados para os 12 meses
 
@@ -33,13 +38,14 @@ def generate_monthly_production_chart(data):
         ax.text(bar.get_x() + bar.get_width()/2.0, yval + 5, f'{int(yval)}', ha='center', va='bottom')
 
     buf = io.BytesIO()
-    fig.savefig(buf, format='png', bbox_inches='tight')
+    fig.savefig(buf, format=image_format, bbox_inches='tight')
     plt.close(fig)
     return base64.b64encode(buf.getvalue()).decode('utf-8')
 
 
-def generate_payback_chart(investment, annual_savings, years=30):
-    """Gera um gráfico de linha do payback e retorna como imagem base64."""
+@cached_chart
+def generate_payback_chart(investment, annual_savings, years=30, image_format='png'):
+    """Gera um gráfico de linha do payback e retorna como imagem base64 (PNG ou SVG)."""
     if not investment or not annual_savings or investment <= 0 or annual_savings <= 0:
         return None
 
@@ -70,7 +76,7 @@ def generate_payback_chart(investment, annual_savings, years=30):
     ax.yaxis.set_major_formatter(formatter)
 
     buf = io.BytesIO()
-    fig.savefig(buf, format='png', bbox_inches='tight')
+    fig.savefig(buf, format=image_format, bbox_inches='tight')
     plt.close(fig)
     return base64.b64encode(buf.getvalue()).decode('utf-8')
 
@@ -78,54 +84,73 @@ def generate_payback_chart(investment, annual_savings, years=30):
 
 
 def calculate_advanced_financials(investment, annual_savings, years=25, energy_inflation_rate=0.08, discount_rate=0.06):
-    """Calcula VPL, TIR e outras métricas financeiras avançadas."""
+    """Calcula VPL, TIR e outras métricas financeiras avançadas (ver app/finance.py)."""
+    if not investment or not annual_savings or investment <= 0 or annual_savings <= 0:
+        return {}
+
+    result = finance.evaluate(investment, annual_savings, years, energy_inflation_rate, discount_rate)
+
+    return {
+        'npv': float(result['npv']),
+        'irr': float(result['irr']) * 100, # Em porcentagem
+        'profit_in_25_years': float(result['profit']),
+        'total_savings_in_25_years': float(result['total_savings'])
+    }
+
+
+
+def calculate_risk_profile(investment, annual_savings, scenarios=10000, time_budget_ms=None, seed=None):
+    """
+    Faixas de risco (Monte Carlo) do retorno: P10/P50/P90 de VPL, TIR e payback.
+    Valores em R$, % a.a. e anos; payback None significa "não se paga em 25 anos".
+    """
     if not investment or not annual_savings or investment <= 0 or annual_savings <= 0:
         return {}
 
-    # Cria o fluxo de caixa anual, considerando a inflação energética
-    cash_flows = [-investment] # Ano 0 é o investimento inicial
-    for i in range(1, years + 1):
-        savings_this_year = annual_savings * ((1 + energy_inflation_rate) ** i)
-        cash_flows.append(savings_this_year)
+    result = finance.monte_carlo(investment, annual_savings, scenarios, time_budget_ms, seed)
 
-    # Calcula as métricas
-    npv = npf.npv(discount_rate, cash_flows)
-    irr = npf.irr(cash_flows) * 100 # Em porcentagem
-    total_savings = sum(cash_flows[1:])
-    profit_in_25_years = total_savings - investment
+    def as_floats(bands, scale=1):
+        return {name: float(value) * scale if np.isfinite(value) else None for name, value in bands.items()}
 
     return {
-        'npv': npv,
-        'irr': irr,
-        'profit_in_25_years': profit_in_25_years,
-        'total_savings_in_25_years': total_savings
+        'scenarios': result['scenarios'],
+        'npv': as_floats(result['npv']),
+        'irr': as_floats(result['irr'], 100) if result['irr'] else None, # Em porcentagem
+        'payback_years': as_floats(result['payback_years']),
+        'payback_probability': result['payback_probability'] * 100, # Em porcentagem
+        'cumulative_cash_flow': {name: band.tolist() for name, band in result['cumulative_cash_flow'].items()},
+    }
+
+
+
+def risk_profile_options(proposal, interactive=False):
+    """
+    Parâmetros do Monte Carlo para uma proposta (semente fixa: o resultado não muda a cada abertura).
+    O limite de tempo só vale na tela (`interactive`): o PDF, que fica em cache, sempre usa todos
+    os cenários, senão o mesmo PDF sairia com números diferentes conforme a carga do servidor.
+    """
+    config = current_app.config
+    return {
+        'scenarios': config['MONTE_CARLO_SCENARIOS'],
+        'time_budget_ms': config['MONTE_CARLO_TIME_BUDGET_MS'] if interactive else None,
+        'seed': proposal.id,
     }
 
 
 
 # SUBSTITUA a função generate_cost_comparison_chart por esta:
-def generate_cumulative_cost_chart(investment, old_annual_bill, new_annual_bill, years=25, energy_inflation_rate=0.08):
-    """Gera um gráfico de linhas comparando os custos acumulados com e sem o sistema solar."""
-    if not investment or not old_annual_bill:
+@cached_chart
+def generate_cumulative_cost_chart(investment, annual_bills_without, annual_bills_with, image_format='png'):
+    """
+    Gera um gráfico de linhas comparando os custos acumulados com e sem o sistema solar (PNG ou SVG).
+    As faturas de cada ano vêm do extrato de créditos (ver app/metrics.py).
+    """
+    if not investment or not annual_bills_without:
         return None
 
+    years = len(annual_bills_without)
     year_axis = np.arange(0, years + 1)
-    cost_without_solar = [0] * (years + 1)
-    cost_with_solar = [investment] * (years + 1)
-
-    cumulative_cost_without = 0
-    cumulative_cost_with = investment
-    
-    for i in range(1, years + 1):
-        # Calcula o custo daquele ano, considerando a inflação
-        current_bill_without = old_annual_bill * ((1 + energy_inflation_rate) ** (i - 1))
-        current_bill_with = new_annual_bill * ((1 + energy_inflation_rate) ** (i - 1))
-        
-        cumulative_cost_without += current_bill_without
-        cumulative_cost_with += current_bill_with
-        
-        cost_without_solar[i] = cumulative_cost_without
-        cost_with_solar[i] = cumulative_cost_with
+    cost_without_solar, cost_with_solar = cumulative_cost_series(investment, annual_bills_without, annual_bills_with)
 
     plt.style.use('seaborn-v0_8-whitegrid')
     fig, ax = plt.subplots(figsize=(10, 5))
@@ -152,6 +177,6 @@ def generate_cumulative_cost_chart(investment, old_annual_bill, new_annual_bill,
     ax.set_xlim(0, years)
 
     buf = io.BytesIO()
-    fig.savefig(buf, format='png', bbox_inches='tight', dpi=150)
+    fig.savefig(buf, format=image_format, bbox_inches='tight', dpi=150)
     plt.close(fig)
     return base64.b64encode(buf.getvalue()).decode('utf-8')
\ No newline at end of file
@@ -0,0 +1,80 @@
+# benchmarks/bench_charts.py
+
+"""
+Compara os gráficos do PDF feitos com matplotlib (PNG e SVG) com o desenho SVG próprio.
+
+Mede o tempo para gerar os três gráficos (sem cache) e o tamanho das imagens em
+base64. Se o WeasyPrint estiver instalado, mede também o tempo de renderização e
+o tamanho de um PDF contendo só os três gráficos.
+
+Uso: python benchmarks/bench_charts.py [repetições]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import charts_svg, utils  # noqa: E402
+
+MONTHLY = [612.4, 580.1, 560.9, 498.3, 455.0, 410.7, 431.2, 470.8, 520.6, 575.3, 598.9, 620.0]
+INVESTMENT, SAVINGS = 24500.0, 5230.0
+# Faturas anuais de 25 anos, corrigidas em 8% a.a. (como sairiam do extrato de créditos)
+OLD_BILLS = [6480.0 * 1.08 ** year for year in range(25)]
+NEW_BILLS = [1250.0 * 1.08 ** year for year in range(25)]
+
+BACKENDS = [
+    ('matplotlib-png', utils, {'image_format': 'png'}, 'image/png'),
+    ('matplotlib-svg', utils, {'image_format': 'svg'}, 'image/svg+xml'),
+    ('svg-nativo', charts_svg, {}, 'image/svg+xml'),
+]
+
+
+def render_charts(module, options):
+    # __wrapped__ pula o cache de gráficos: queremos medir a renderização de verdade
+    return [
+        module.generate_monthly_production_chart.__wrapped__(MONTHLY, **options),
+        module.generate_payback_chart.__wrapped__(INVESTMENT, SAVINGS, **options),
+        module.generate_cumulative_cost_chart.__wrapped__(INVESTMENT, OLD_BILLS, NEW_BILLS, **options),
+    ]
+
+
+def pdf_for(charts, mime):
+    from weasyprint import HTML
+    images = ''.join(f'<img style="width: 100%" src="data:{mime};base64,{chart}">' for chart in charts)
+    start = time.perf_counter()
+    pdf = HTML(string=f'<html><body>{images}</body></html>').write_pdf()
+    return time.perf_counter() - start, len(pdf)
+
+
+def main(repeat=20):
+    try:
+        import weasyprint  # noqa: F401
+        has_weasyprint = True
+    except Exception:
+        has_weasyprint = False
+        print('WeasyPrint indisponível: medindo apenas os gráficos.\n')
+
+    header = f"{'backend':<16}{'ms/3 gráficos':>15}{'KB base64':>12}"
+    if has_weasyprint:
+        header += f"{'ms PDF':>10}{'KB PDF':>10}"
+    print(header)
+
+    for name, module, options, mime in BACKENDS:
+        render_charts(module, options)  # aquecimento (imports, fontes)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            charts = render_charts(module, options)
+        elapsed_ms = (time.perf_counter() - start) / repeat * 1000
+        size_kb = sum(len(c) for c in charts) / 1024
+
+        line = f'{name:<16}{elapsed_ms:>15.1f}{size_kb:>12.1f}'
+        if has_weasyprint:
+            pdf_seconds, pdf_bytes = pdf_for(charts, mime)
+            line += f'{pdf_seconds * 1000:>10.0f}{pdf_bytes / 1024:>10.1f}'
+        print(line)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
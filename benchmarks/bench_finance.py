@@ -0,0 +1,62 @@
+# benchmarks/bench_finance.py
+
+"""
+Compara o cálculo financeiro antigo (laço em Python + npf.irr, uma proposta por vez)
+com o motor vetorizado de app/finance.py.
+
+- Lote: VPL, TIR e lucro de N propostas aleatórias.
+- Grade: 20 inflações x 20 taxas de desconto para uma única proposta.
+
+Uso: python benchmarks/bench_finance.py [propostas]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import numpy_financial as npf
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import finance  # noqa: E402
+
+
+def loop_financials(investment, annual_savings, years=25, energy_inflation_rate=0.08, discount_rate=0.06):
+    """A implementação original de calculate_advanced_financials."""
+    cash_flows = [-investment]
+    for i in range(1, years + 1):
+        cash_flows.append(annual_savings * ((1 + energy_inflation_rate) ** i))
+    return npf.npv(discount_rate, cash_flows), npf.irr(cash_flows)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main(count=5000):
+    rng = np.random.default_rng(42)
+    investment = rng.uniform(8000, 250000, count)
+    savings = investment / rng.uniform(2.5, 9, count)
+
+    old, old_ms = timed(lambda: np.array([loop_financials(i, s) for i, s in zip(investment, savings)]))
+    new, new_ms = timed(lambda: finance.evaluate(investment, savings))
+    print(f'Lote de {count} propostas')
+    print(f'  laço + npf.irr   {old_ms:8.1f} ms')
+    print(f'  vetorizado       {new_ms:8.1f} ms  ({old_ms / new_ms:.0f}x)')
+    print(f'  maior diferença: VPL {np.max(np.abs(new["npv"] - old[:, 0])):.2e}, '
+          f'TIR {np.max(np.abs(new["irr"] - old[:, 1])):.2e}')
+
+    inflation = np.linspace(0.02, 0.12, 20)
+    discount = np.linspace(0.02, 0.14, 20)
+    _, loop_ms = timed(lambda: [loop_financials(24500, 5230, 25, i, d) for i in inflation for d in discount])
+    _, grid_ms = timed(lambda: finance.sensitivity_grid(24500, 5230, inflation, discount))
+    print('\nGrade 20 x 20 (uma proposta)')
+    print(f'  laço + npf.irr   {loop_ms:8.1f} ms')
+    print(f'  vetorizado       {grid_ms:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,46 @@
+# benchmarks/bench_optimizer.py
+
+"""
+Mede o otimizador de configurações (app/optimizer.py) com catálogos sintéticos
+de tamanhos crescentes.
+
+Uso: python benchmarks/bench_optimizer.py [repetições]
+
+Medido (ms por chamada, 500 / 5000 kWh/mês): 20x10: 0,2 / 12; 200x100: 9 / 9;
+500x300: 9 / 8; 2000x1000: 12 / 11. Antes da lista curta do extrato, os casos de
+5000 kWh/mês levavam de 60 a 80 ms (um extrato por potência distinta).
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import optimizer  # noqa: E402
+
+
+def synthetic_catalog(n_modules, n_inverters, seed=42):
+    rng = np.random.default_rng(seed)
+    modules = [{'id': i, 'name': f'Módulo {i}', 'power_wp': int(rng.choice(np.arange(330, 720, 5))),
+                'price': float(rng.uniform(450, 1300))} for i in range(n_modules)]
+    inverters = [{'id': i, 'name': f'Inversor {i}', 'power_w': int(rng.choice(np.arange(1500, 75000, 500))),
+                  'price': float(rng.uniform(2500, 40000))} for i in range(n_inverters)]
+    return modules, inverters
+
+
+def main(repeat=20):
+    for n_modules, n_inverters in [(20, 10), (200, 100), (500, 300), (2000, 1000)]:
+        modules, inverters = synthetic_catalog(n_modules, n_inverters)
+        for consumption in (500, 5000):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                optimizer.optimize(consumption, 5.2, modules, inverters, 'bifasica', 0.92, 0.25, 1200, 'npv', 5)
+            elapsed = (time.perf_counter() - start) / repeat * 1000
+            print(f'{n_modules:>5} módulos, {n_inverters:>5} inversores, {consumption:>5} kWh/mês: {elapsed:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,84 @@
+# benchmarks/bench_pdf_render.py
+
+"""
+Mede quanto custa cada PDF num worker já aquecido, com e sem o CSS compartilhado.
+
+- "css inline": o jeito antigo. O CSS vai dentro do HTML e cada PDF cria uma nova
+  configuração de fontes, então tudo é interpretado de novo a cada renderização.
+- "css compartilhado": o CSS e as fontes são preparados uma vez por processo
+  (app.pdf.get_pdf_stylesheets) e cada PDF só interpreta o HTML da proposta.
+
+Rode antes `flask fetch-pdf-assets` para não medir downloads.
+
+Uso: python benchmarks/bench_pdf_render.py [repetições]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import render_template  # noqa: E402
+from weasyprint import HTML  # noqa: E402
+from weasyprint.text.fonts import FontConfiguration  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import User, Client, Concessionaria, Proposal  # noqa: E402
+from app.pdf import PDF_STYLESHEET, get_pdf_stylesheets  # noqa: E402
+from app.pdf_assets import pdf_url_fetcher  # noqa: E402
+from config import Config  # noqa: E402
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+def sample_html():
+    """HTML de uma proposta de exemplo, já renderizado pelo Jinja."""
+    user = User(username='bench', email='bench@solucaosolar.com')
+    client = Client(name='Cliente de Teste', cpf_cnpj='000.000.000-00')
+    concessionaria = Concessionaria(name='Concessionária de Teste', fio_b_price=0.25)
+    proposal = Proposal(
+        title='Sistema Fotovoltaico 6,6 kWp', client=client, author=user, concessionaria=concessionaria,
+        system_power_kwp=6.6, panel_power_wp=550, panel_quantity=12, recommended_inverter_kw=6,
+        total_investment=24500, estimated_savings_per_year=5230, payback_years=4.7,
+        avg_consumption_kwh=750, kwh_price=0.92, monthly_production_kwh=[700] * 12,
+    )
+    db.session.add(proposal)
+    db.session.commit()
+    return render_template('pdf/proposal_template.html', proposal=proposal, financials={},
+                           chart_mime='image/png', old_annual_bill=8280, new_annual_bill=3050)
+
+
+def main(repeat=10):
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        html = sample_html()
+        with open(PDF_STYLESHEET) as f:
+            inline_html = html.replace('</head>', f'<style>{f.read()}</style></head>')
+
+        def render_inline():
+            return HTML(string=inline_html, url_fetcher=pdf_url_fetcher).write_pdf(font_config=FontConfiguration())
+
+        def render_shared():
+            stylesheets, font_config = get_pdf_stylesheets()
+            return HTML(string=html, url_fetcher=pdf_url_fetcher).write_pdf(
+                stylesheets=stylesheets, font_config=font_config)
+
+        results = {}
+        for name, render in [('css inline', render_inline), ('css compartilhado', render_shared)]:
+            render()  # aquecimento: imports, cache de arquivos, primeira leitura do CSS
+            start = time.perf_counter()
+            for _ in range(repeat):
+                pdf = render()
+            results[name] = (time.perf_counter() - start) / repeat * 1000
+            print(f'{name:<20}{results[name]:>8.0f} ms/PDF  ({len(pdf) / 1024:.0f} KB)')
+
+        saving = results['css inline'] - results['css compartilhado']
+        print(f'\nEconomia por PDF: {saving:.0f} ms ({saving / results["css inline"]:.0%})')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
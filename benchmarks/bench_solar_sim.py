@@ -0,0 +1,35 @@
+# benchmarks/bench_solar_sim.py
+
+"""
+Mede a simulação horária (app/solar_sim.py): uma proposta e lotes de propostas
+com latitudes e irradiações diferentes, como num recálculo em massa.
+
+Uso: python benchmarks/bench_solar_sim.py [repetições]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import solar_sim  # noqa: E402
+
+
+def main(repeat=10):
+    rng = np.random.default_rng(42)
+    for n in (1, 100, 1000):
+        latitude = rng.uniform(-30, 2, n)
+        irradiance = rng.uniform(4.2, 6.2, n)
+        power = rng.uniform(2, 50, n)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            solar_sim.monthly_production(latitude, irradiance, power)
+        elapsed = (time.perf_counter() - start) / repeat * 1000
+        print(f'{n:>5} propostas x 8760 h: {elapsed:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -8,4 +8,61 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'voce-nunca-vai-adivinhar'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # --- CACHE DE PDFs GERADOS ---
+    PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR') or os.path.join(basedir, 'cache', 'pdf')
+    PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES') or 500 * 1024 * 1024)
+
+    # --- FILA DE GERAÇÃO DE PDFs ---
+    PDF_JOBS_DIR = os.environ.get('PDF_JOBS_DIR') or os.path.join(basedir, 'cache', 'jobs')
+    PDF_WORKERS = int(os.environ.get('PDF_WORKERS') or 2) # Processos renderizando PDFs em paralelo
+    PDF_QUEUE_MAX = int(os.environ.get('PDF_QUEUE_MAX') or 20) # Máximo de jobs pendentes por worker
+    PDF_JOB_TIMEOUT = int(os.environ.get('PDF_JOB_TIMEOUT') or 600) # Segundos até um job ser considerado travado
+    PDF_JOB_TTL = int(os.environ.get('PDF_JOB_TTL') or 24 * 3600) # Segundos que o estado do job fica guardado
+
+    # --- CACHE DOS GRÁFICOS ---
+    CHART_CACHE_SIZE = int(os.environ.get('CHART_CACHE_SIZE') or 256) # Gráficos guardados em memória por processo
+    CHART_CACHE_DIR = os.environ.get('CHART_CACHE_DIR', os.path.join(basedir, 'cache', 'charts')) # Vazio desativa o disco
+    CHART_CACHE_MAX_BYTES = int(os.environ.get('CHART_CACHE_MAX_BYTES') or 100 * 1024 * 1024) # Limite do cache em disco
+
+    # --- GRÁFICOS DO PDF ---
+    CHART_BACKEND = os.environ.get('CHART_BACKEND') or 'matplotlib' # 'matplotlib' ou 'svg' (sem matplotlib)
+    CHART_IMAGE_FORMAT = os.environ.get('CHART_IMAGE_FORMAT') or 'png' # Formato do matplotlib: 'png' ou 'svg'
+    CHART_WORKERS = int(os.environ.get('CHART_WORKERS') or 0) # Processos desenhando gráficos em paralelo, por worker (0 desativa)
+    CHART_POOL_TIMEOUT = int(os.environ.get('CHART_POOL_TIMEOUT') or 30) # Segundos; depois disso o PDF sai sem o gráfico
+
+    # --- ARQUIVOS EXTERNOS DO PDF (FONTES, ÍCONES, CAPA) ---
+    PDF_ASSET_DIR = os.environ.get('PDF_ASSET_DIR') or os.path.join(basedir, 'pdf_assets') # Preenchido por 'flask fetch-pdf-assets'
+    PDF_ASSET_VERSION = os.environ.get('PDF_ASSET_VERSION') or 'v1' # Mude para baixar um conjunto novo sem apagar o antigo
+    PDF_ASSET_CACHE_DIR = os.environ.get('PDF_ASSET_CACHE_DIR') or os.path.join(basedir, 'cache', 'assets')
+    PDF_ASSET_CACHE_TTL = int(os.environ.get('PDF_ASSET_CACHE_TTL') or 7 * 24 * 3600) # Segundos
+
+    # --- TAMANHO DOS PDFs ---
+    PDF_IMAGE_DPI = int(os.environ.get('PDF_IMAGE_DPI') or 150) # Resolução máxima das imagens no PDF
+    PDF_JPEG_QUALITY = int(os.environ.get('PDF_JPEG_QUALITY') or 80)
+    PDF_OPTIMIZE_IMAGES = (os.environ.get('PDF_OPTIMIZE_IMAGES') or '1') == '1'
+    PDF_SIZE_BUDGET_BYTES = int(os.environ.get('PDF_SIZE_BUDGET_BYTES') or 2 * 1024 * 1024) # Acima disso, aviso no log
+
+    # --- DIMENSIONAMENTO ---
+    SIZING_MAX_CONFIGURATIONS = int(os.environ.get('SIZING_MAX_CONFIGURATIONS') or 200) # Configurações por chamada em /admin/sizing
+    OPTIMIZER_BOS_COST_PER_KWP = float(os.environ.get('OPTIMIZER_BOS_COST_PER_KWP') or 1200) # Estrutura, cabos e mão de obra (R$/kWp)
+    OPTIMIZER_TOP_N = int(os.environ.get('OPTIMIZER_TOP_N') or 5)
+    TARIFF_RECALC_CHUNK_SIZE = int(os.environ.get('TARIFF_RECALC_CHUNK_SIZE') or 1000) # Propostas por transação no recálculo em massa
+
+    # --- IRRADIAÇÃO (NASA POWER) ---
+    IRRADIANCE_TTL_DAYS = int(os.environ.get('IRRADIANCE_TTL_DAYS') or 180) # Validade dos dados guardados de cada célula
+    IRRADIANCE_NEIGHBOR_KM = float(os.environ.get('IRRADIANCE_NEIGHBOR_KM') or 30) # Reaproveita a célula vizinha a até essa distância
+    IRRADIANCE_GRID_PATH = os.environ.get('IRRADIANCE_GRID_PATH') or os.path.join(basedir, 'data', 'irradiance_brazil.grid') # Gerado por 'flask build-irradiance-grid'
+    CEP_INDEX_PATH = os.environ.get('CEP_INDEX_PATH') or os.path.join(basedir, 'data', 'cep_centroids.idx') # Gerado por 'flask build-cep-index'
+    GEOCODE_RETRY_DAYS = int(os.environ.get('GEOCODE_RETRY_DAYS') or 30) # Espera antes de consultar de novo um endereço não encontrado
+
+    # --- CONSULTAS DE CEP E CNPJ (BRASILAPI) ---
+    LOOKUP_CEP_TTL_DAYS = int(os.environ.get('LOOKUP_CEP_TTL_DAYS') or 180) # Validade de um CEP guardado
+    LOOKUP_CNPJ_TTL_DAYS = int(os.environ.get('LOOKUP_CNPJ_TTL_DAYS') or 30) # Razão social e endereço mudam mais
+    LOOKUP_NEGATIVE_TTL_HOURS = int(os.environ.get('LOOKUP_NEGATIVE_TTL_HOURS') or 24) # Validade de um "não encontrado"
+    LOOKUP_BULK_MAX = int(os.environ.get('LOOKUP_BULK_MAX') or 500) # CEPs por chamada em /admin/lookup/cep/bulk
+
+    # --- ANÁLISE DE RISCO (MONTE CARLO) ---
+    MONTE_CARLO_SCENARIOS = int(os.environ.get('MONTE_CARLO_SCENARIOS') or 10000) # Cenários por proposta
+    MONTE_CARLO_TIME_BUDGET_MS = int(os.environ.get('MONTE_CARLO_TIME_BUDGET_MS') or 300) # Tempo máximo na tela da proposta (o PDF usa todos os cenários)
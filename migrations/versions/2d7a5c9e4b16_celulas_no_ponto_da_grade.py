@@ -0,0 +1,26 @@
+"""Células de irradiação centradas nos pontos da grade da NASA
+
+Revision ID: 2d7a5c9e4b16
+Revises: 8f2b7d4e6c13
+Create Date: 2026-10-18 21:04:18.512930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d7a5c9e4b16'
+down_revision = '8f2b7d4e6c13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # As células gravadas usavam outra numeração (a partir de -90°/-180°, sem arredondar
+    # para o ponto da grade). A tabela é só um cache: é esvaziada e preenchida de novo.
+    op.execute('DELETE FROM irradiance_cell')
+
+
+def downgrade():
+    op.execute('DELETE FROM irradiance_cell')
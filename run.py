@@ -1,6 +1,8 @@
 from app import create_app, db
 from app.models import User
+import os
 import click # Flask usa a biblioteca Click para criar comandos
+from datetime import timedelta
 
 app = create_app()
 
@@ -46,5 +48,149 @@ def init_db_command():
 
 
 
+# --- COMANDO PARA EXPORTAR PDFs EM LOTE ---
+@app.cli.command("export-pdfs")
+@click.argument("output", type=click.Path(dir_okay=False, writable=True))
+@click.option("--client-id", type=int, help="Apenas propostas deste cliente.")
+@click.option("--start", type=click.DateTime(formats=["%Y-%m-%d"]), help="Criadas a partir desta data (AAAA-MM-DD).")
+@click.option("--end", type=click.DateTime(formats=["%Y-%m-%d"]), help="Criadas até esta data, inclusive (AAAA-MM-DD).")
+@click.option("--status", help="Apenas propostas com este status (ex: Rascunho).")
+def export_pdfs_command(output, client_id, start, end, status):
+    """Gera os PDFs das propostas selecionadas em paralelo e grava tudo num arquivo ZIP."""
+    from app.pdf_export import select_proposal_ids, iter_proposals_zip
+
+    proposal_ids = select_proposal_ids(
+        client_id=client_id, start=start,
+        end=end + timedelta(days=1) if end else None, status=status
+    )
+    if not proposal_ids:
+        print("Nenhuma proposta encontrada com esses filtros.")
+        return
+
+    print(f"Exportando {len(proposal_ids)} proposta(s) para '{output}'...")
+    with open(output, 'wb') as f:
+        for chunk in iter_proposals_zip(proposal_ids):
+            f.write(chunk)
+    print("Exportação concluída!")
+
+
+# --- COMANDO PARA BAIXAR OS ARQUIVOS EXTERNOS DO PDF ---
+@app.cli.command("fetch-pdf-assets")
+def fetch_pdf_assets_command():
+    """Baixa fontes, ícones e a imagem da capa do PDF para o repositório local."""
+    from app.pdf_assets import populate_asset_store, asset_store_dir
+
+    print(f"Baixando arquivos do PDF para '{asset_store_dir()}'...")
+    total = populate_asset_store()
+    print(f"{total} arquivo(s) salvos. O PDF agora pode ser gerado sem acesso à internet.")
+
+
+# --- COMANDO PARA CALCULAR AS MÉTRICAS GRAVADAS DAS PROPOSTAS ---
+@app.cli.command("refresh-metrics")
+@click.option("--force", is_flag=True, help="Recalcula todas, mesmo as que estão em dia.")
+@click.option("--batch-size", default=500, show_default=True, help="Propostas calculadas por lote.")
+def refresh_metrics_command(force, batch_size):
+    """Preenche e revalida as métricas financeiras gravadas (VPL, TIR, faturas) de todas as propostas."""
+    from app.metrics import refresh_all_metrics, CALCULATION_VERSION
+
+    print(f"Verificando as métricas das propostas (cálculo v{CALCULATION_VERSION})...")
+    checked = updated = 0
+    for checked, updated in refresh_all_metrics(force=force, batch_size=batch_size):
+        print(f"  {checked} verificada(s), {updated} recalculada(s)")
+    print(f"Concluído: {updated} de {checked} proposta(s) recalculada(s).")
+
+
+# --- COMANDO PARA RECALCULAR AS PROPOSTAS APÓS MUDANÇA DE TARIFA ---
+@app.cli.command("recalculate-tariffs")
+@click.option("--concessionaria-id", type=int, help="Apenas propostas desta concessionária.")
+@click.option("--fio-b-price", type=float, help="Novo Fio B da concessionária (R$/kWh).")
+@click.option("--kwh-price", type=float, help="Novo valor do kWh das propostas da concessionária (R$/kWh).")
+@click.option("--chunk-size", type=int, help="Propostas por lote (padrão: TARIFF_RECALC_CHUNK_SIZE).")
+@click.option("--dry-run", is_flag=True, help="Só mostra o que mudaria, sem gravar.")
+def recalculate_tariffs_command(concessionaria_id, fio_b_price, kwh_price, chunk_size, dry_run):
+    """Recalcula economia anual e payback das propostas após um reajuste de tarifa ou de Fio B."""
+    from app.tariffs import recalculate_proposals
+
+    try:
+        for report in recalculate_proposals(
+            concessionaria_id=concessionaria_id, fio_b_price=fio_b_price, kwh_price=kwh_price,
+            chunk_size=chunk_size or app.config['TARIFF_RECALC_CHUNK_SIZE'], dry_run=dry_run,
+        ):
+            print(f"  {report['rows']} lida(s), {report['changed']} alterada(s) - {report['rows_per_second']:.0f} propostas/s")
+    except ValueError as e:
+        print(f"Erro: {e}")
+        return
+
+    if dry_run:
+        for change in report['changes']:
+            print(f"  #{change['id']} {change['title']}: economia {change['estimated_savings_per_year'][0]} -> "
+                  f"{change['estimated_savings_per_year'][1]}, payback {change['payback_years'][0]} -> {change['payback_years'][1]}")
+        if report['changed'] > len(report['changes']):
+            print(f"  ... e mais {report['changed'] - len(report['changes'])} proposta(s).")
+    action = "mudariam" if dry_run else "foram atualizadas"
+    print(f"Concluído em {report['elapsed_s']:.1f}s: {report['changed']} de {report['rows']} proposta(s) {action} "
+          f"({report['skipped']} sem produção mensal ou tarifa).")
+
+
+# --- COMANDO PARA BUSCAR COORDENADAS E IRRADIAÇÃO DE TODOS OS CLIENTES ---
+@app.cli.command("prefetch-irradiance")
+@click.option("--workers", default=4, show_default=True, help="Threads fazendo as consultas externas.")
+def prefetch_irradiance_command(workers):
+    """Geocodifica os clientes sem coordenadas e baixa a irradiação das células da NASA que faltam."""
+    from app.prefetch import prefetch_irradiance
+
+    names = {'geocoding': 'Geocodificação', 'irradiance': 'Irradiação'}
+    stage = None
+    for progress in prefetch_irradiance(workers=workers, ttl_days=app.config['IRRADIANCE_TTL_DAYS'],
+                                        grid_path=app.config['IRRADIANCE_GRID_PATH'],
+                                        cep_index_path=app.config['CEP_INDEX_PATH'],
+                                        retry_days=app.config['GEOCODE_RETRY_DAYS']):
+        if progress['stage'] != stage:
+            stage = progress['stage']
+            print(f"{names[stage]}: {progress['total']} consulta(s) a fazer")
+        print(f"  {progress['done'] + progress['failed']}/{progress['total']} ({progress['failed']} falha(s))")
+        if progress['aborted']:
+            print(f"  Interrompido: {progress['aborted']} Rode o comando de novo para continuar.")
+    print("Concluído!")
+
+
+# --- COMANDO PARA GERAR A GRADE DE IRRADIAÇÃO DO BRASIL ---
+@app.cli.command("build-irradiance-grid")
+@click.argument("source", type=click.Path(exists=True, dir_okay=False))
+@click.option("--output", help="Arquivo gerado (padrão: IRRADIANCE_GRID_PATH).")
+def build_irradiance_grid_command(source, output):
+    """Gera a grade binária de irradiação a partir do CSV da climatologia regional da NASA POWER."""
+    from app.irradiance_grid import build_grid
+
+    output = output or app.config['IRRADIANCE_GRID_PATH']
+    print(f"Gerando a grade de irradiação em '{output}'...")
+    try:
+        rows, cols, points = build_grid(source, output)
+    except (ValueError, KeyError) as e:
+        print(f"Erro ao ler '{source}': {e}")
+        return
+    print(f"Grade de {rows} x {cols} gerada ({points} ponto(s) com dado, {os.path.getsize(output) / 1024:.0f} KB).")
+    print("Reinicie os workers para que eles usem a grade nova.")
+
+
+# --- COMANDO PARA GERAR O ÍNDICE LOCAL DE CEPs ---
+@app.cli.command("build-cep-index")
+@click.argument("source", type=click.Path(exists=True, dir_okay=False))
+@click.option("--output", help="Arquivo gerado (padrão: CEP_INDEX_PATH).")
+def build_cep_index_command(source, output):
+    """Gera o índice de centroides por prefixo de CEP a partir de um CSV com cep, latitude e longitude."""
+    from app.cep_geocoder import build_index
+
+    output = output or app.config['CEP_INDEX_PATH']
+    print(f"Gerando o índice de CEPs em '{output}'...")
+    try:
+        total = build_index(source, output)
+    except ValueError as e:
+        print(f"Erro ao ler '{source}': {e}")
+        return
+    print(f"{total} prefixo(s) gravados ({os.path.getsize(output) / 1024:.0f} KB).")
+    print("Reinicie os workers para que eles usem o índice novo.")
+
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
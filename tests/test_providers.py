@@ -0,0 +1,160 @@
+# tests/test_providers.py
+
+"""
+Testes do cliente HTTP dos provedores (app/providers.py) contra um servidor HTTP local.
+
+Rodar com: python -m unittest discover tests  (ou pytest tests)
+"""
+
+import threading
+import time
+import unittest
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from app.providers import CircuitBreaker, Provider, ProviderUnavailable
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Responde com a próxima resposta da fila do servidor: (status, atraso em s, corpo cortado?)."""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits += 1
+            status, delay, truncated = server.responses.popleft() if server.responses else (200, 0, False)
+        if delay:
+            time.sleep(delay)
+        body = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        # Corpo cortado: anuncia mais bytes do que envia e fecha a conexão
+        self.send_header('Content-Length', str(len(body) + (100 if truncated else 0)))
+        self.end_headers()
+        self.wfile.write(body)
+        if truncated:
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ProviderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.responses = deque()
+        self.server.hits = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def respond(self, *responses):
+        for response in responses:
+            self.server.responses.append(response if isinstance(response, tuple) else (response, 0, False))
+
+    def provider(self, **kwargs):
+        options = {'timeout': (1, 2), 'retries': 2, 'backoff': 0.01, 'max_backoff': 0.02,
+                   'deadline': 5.0, 'breaker_failures': 3, 'breaker_reset': 60.0}
+        options.update(kwargs)
+        return Provider('Stub', **options)
+
+    def test_503_is_retried(self):
+        self.respond(503, 503, 200)
+        provider = self.provider()
+
+        response = provider.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.hits, 3)
+        self.assertEqual(provider.counters['retries'], 2)
+        self.assertEqual(provider.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_retries_exhausted_raise_last_error(self):
+        self.respond(503, 503, 503)
+        provider = self.provider()
+
+        with self.assertRaises(requests.exceptions.HTTPError) as raised:
+            provider.get(self.url)
+
+        self.assertEqual(raised.exception.response.status_code, 503)
+        self.assertEqual(self.server.hits, 3)
+        self.assertEqual(provider.breaker.failures, 1)
+
+    def test_4xx_is_not_retried(self):
+        self.respond(404)
+        provider = self.provider()
+
+        with self.assertRaises(requests.exceptions.HTTPError) as raised:
+            provider.get(self.url)
+
+        self.assertEqual(raised.exception.response.status_code, 404)
+        self.assertEqual(self.server.hits, 1)
+        # O provedor respondeu: o disjuntor não conta a falha
+        self.assertEqual(provider.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(provider.breaker.failures, 0)
+
+    def test_breaker_opens_and_short_circuits(self):
+        self.respond(503, 503)
+        provider = self.provider(retries=0, breaker_failures=2)
+
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.HTTPError):
+                provider.get(self.url)
+        self.assertEqual(provider.breaker.state, CircuitBreaker.OPEN)
+
+        with self.assertRaises(ProviderUnavailable):
+            provider.get(self.url)
+        self.assertEqual(self.server.hits, 2) # A terceira chamada nem chegou ao servidor
+        self.assertEqual(provider.counters['short_circuited'], 1)
+
+    def test_half_open_trial_success_closes(self):
+        self.respond(503, 200)
+        provider = self.provider(retries=0, breaker_failures=1, breaker_reset=0.05)
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            provider.get(self.url)
+        self.assertEqual(provider.breaker.state, CircuitBreaker.OPEN)
+        time.sleep(0.06)
+
+        self.assertEqual(provider.get(self.url).status_code, 200)
+        self.assertEqual(provider.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_trial_failure_reopens(self):
+        # Resposta cortada (ChunkedEncodingError) na chamada de teste: o disjuntor volta a abrir
+        self.respond(503, (200, 0, True))
+        provider = self.provider(retries=0, breaker_failures=1, breaker_reset=0.05)
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            provider.get(self.url)
+        time.sleep(0.06)
+
+        with self.assertRaises(requests.exceptions.RequestException):
+            provider.get(self.url)
+        self.assertEqual(provider.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(ProviderUnavailable):
+            provider.get(self.url)
+
+    def test_deadline_caps_each_attempt(self):
+        self.respond((200, 2, False), (200, 2, False), (200, 2, False))
+        provider = self.provider(timeout=(1, 10), retries=5, deadline=0.5)
+
+        started = time.monotonic()
+        with self.assertRaises(requests.exceptions.Timeout):
+            provider.get(self.url)
+        elapsed = time.monotonic() - started
+
+        # Sem o limite, a primeira tentativa sozinha esperaria os 2 s do servidor
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(provider.breaker.failures, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()